@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the research-memory handlers
+
+Generates synthetic memory directories (devlog sessions, decisions,
+experiments and TODOs with mixed Chinese/English text) at several sizes and
+times the entry points against each of them:
+- bootstrap_context, cold (no derived data in memory/.cache/) and warm
+- query_history, with count and BM25 ranking; count-ranked queries both
+  scan the files (the default) and use the search index (query_index[...])
+- log_session
+- keyword matching over the devlog lines: the per-line loop the linear scan
+  used to run against handlers.KeywordMatcher
+
+For every case it reports latency percentiles and peak Python memory, and
+writes all results to a JSON file; pass a previous file with --compare to see
+how each case changed.
+
+Usage:
+    python benchmark_handlers.py --sizes 1000 10000 --output bench.json
+    python benchmark_handlers.py --sizes 1000 10000 --compare bench.json
+    python benchmark_handlers.py --sizes 100000 --keep /tmp/corpus-100k
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import handlers  # noqa: E402
+
+# Vocabulary for the synthetic text, in the register of a real project log
+CJK_WORDS = [
+    "数字化技能", "教育回报", "工具变量", "稳健性检验", "异质性分析", "样本选择偏差",
+    "城乡差异", "面板数据", "交互效应", "机制分析", "政策含义", "主成分分析",
+    "收入对数", "回归结果", "数据清洗", "变量构造", "文献综述", "理论框架"
+]
+LATIN_WORDS = [
+    "regression", "2SLS", "heckman", "CFPS", "robustness", "baseline", "income",
+    "education", "skills", "cluster", "fixed-effects", "bootstrap", "variance",
+    "instrument", "sample", "cohort", "estimate", "pipeline", "script", "table"
+]
+DATASETS = ["CFPS_2018", "CFPS_2020", "CHARLS_2015", "CGSS_2017"]
+MODELS = ["OLS", "2SLS", "Heckman", "FixedEffects", "Logit"]
+
+# Queries timed against every corpus: (question, filters)
+BENCHMARK_QUERIES = [
+    ("数字化技能 教育回报", {}),
+    ("robustness regression", {}),
+    ("工具变量 2SLS", {"ranking": "bm25"}),
+    ("异质性分析", {"unit": "entry", "ranking": "bm25"}),
+]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    """A phrase mixing CJK and Latin words."""
+    return " ".join(rng.choice(CJK_WORDS if rng.random() < 0.6 else LATIN_WORDS) for _ in range(words))
+
+
+def _payload(rng: random.Random, session: int, experiments: int, decision: bool) -> dict:
+    """A log_session payload for one synthetic session."""
+    phases = rng.sample(handlers.RESEARCH_PHASES, rng.randint(1, 3))
+    return {
+        "session_goal": f"{_sentence(rng, 4)} #{session}",
+        "changes_summary": _sentence(rng, 12),
+        "phases": {phase: _sentence(rng, rng.randint(8, 30)) for phase in phases},
+        "experiments": [{
+            "hypothesis": _sentence(rng, 6),
+            "dataset": rng.choice(DATASETS),
+            "model": rng.choice(MODELS),
+            "spec": f"y ~ x{rng.randint(1, 9)} + controls",
+            "metrics": {"r_squared": round(rng.uniform(0.1, 0.9), 4), "n_obs": rng.randint(500, 50000)},
+            "notes": _sentence(rng, 5)
+        } for _ in range(experiments)],
+        "decisions": [{
+            "decision": _sentence(rng, 6),
+            "rationale": _sentence(rng, 15),
+            "alternatives_considered": [_sentence(rng, 3), _sentence(rng, 3)]
+        }] if decision else []
+    }
+
+
+def _todos_content(rng: random.Random, todos: int, start: datetime) -> str:
+    """todos.md with `todos` items in dated blocks, about a third of them completed."""
+    lines = ["# TODO Items and Open Questions", ""]
+    for i in range(todos):
+        if i % 10 == 0:
+            stamp = start + timedelta(hours=i)
+            lines += ["", f"### {stamp:%Y-%m-%d %H:%M}", ""]
+        text = f"{_sentence(rng, 5)} #{i}"
+        if rng.random() < 0.33:
+            lines.append(f"- [x] {text} (completed: {start:%Y-%m-%d})")
+            continue
+        tags = ""
+        if rng.random() < 0.3:
+            tags += f" [{rng.choice(['HIGH', 'LOW'])}]"
+        if rng.random() < 0.5:
+            tags += f" [{rng.choice(['analysis', 'writing', 'robustness', 'data'])}]"
+        lines.append(f"- [ ]{tags} {text}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(project_dir: Path, sessions: int, experiments: int, todos: int, seed: int = 0) -> dict:
+    """
+    Write a synthetic memory directory under `project_dir`.
+
+    Sessions, decisions (one per five sessions) and experiments are rendered
+    exactly as log_session() writes them, spread over consecutive hours;
+    todos.md is written directly.
+
+    Returns:
+        Dictionary with the generated counts and the size of each file in bytes
+    """
+    rng = random.Random(seed)
+    backend = handlers.MemoryBackend(str(project_dir / "memory"))
+    backend.ensure_memory_directory()
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    per_session = [experiments // sessions + (1 if i < experiments % sessions else 0)
+                   for i in range(sessions)] if sessions else []
+
+    handles = {filename: open(backend.memory_dir / filename, 'a', encoding=backend.encoding, newline='')
+               for filename in ("devlog.md", "decisions.md", "experiments.csv")}
+    try:
+        for session in range(sessions):
+            stamp = start + timedelta(hours=session)
+            record = {
+                "timestamp": stamp.isoformat(),
+                "experiment_ids": [f"exp_{stamp:%Y%m%d_%H%M%S}_{session:06d}{i}" for i in range(per_session[session])],
+                "payload": _payload(rng, session, per_session[session], session % 5 == 0)
+            }
+            appends, _ = handlers._render_session(backend, record)
+            for filename, text in appends.items():
+                handles[filename].write(text)
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    with open(backend.memory_dir / "todos.md", 'w', encoding=backend.encoding) as f:
+        f.write(_todos_content(rng, todos, start))
+
+    return {
+        "sessions": sessions,
+        "experiments": experiments,
+        "todos": todos,
+        "bytes": {path.name: path.stat().st_size for path in sorted(backend.memory_dir.iterdir()) if path.is_file()}
+    }
+
+
+def _reset_caches(memory_dir: Path) -> None:
+    """Drop all derived data, on disk and in this process."""
+    shutil.rmtree(memory_dir / handlers.CACHE_DIRNAME, ignore_errors=True)
+    handlers.ParsedMemoryCache._instances.clear()
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def time_case(run, repeat: int, setup=None) -> dict:
+    """
+    Time `run()` `repeat` times (calling `setup()` untimed before each), then
+    once more under tracemalloc for its peak memory.
+
+    Returns:
+        Latency statistics in milliseconds and the peak traced memory in bytes
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "runs": repeat,
+        "min_ms": round(timings[0], 3),
+        "p50_ms": round(_percentile(timings, 0.50), 3),
+        "p90_ms": round(_percentile(timings, 0.90), 3),
+        "p99_ms": round(_percentile(timings, 0.99), 3),
+        "max_ms": round(timings[-1], 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "peak_memory_bytes": peak
+    }
+
+
+def benchmark_corpus(project_dir: Path, repeat: int, seed: int = 0) -> dict:
+    """Time every entry point against the corpus in `project_dir` (the working directory)."""
+    memory_dir = project_dir / "memory"
+    rng = random.Random(seed + 1)
+    cases = {}
+
+    def backend(**search):
+        memory_backend = handlers.MemoryBackend(str(memory_dir))
+        memory_backend.config["search"].update(search)
+        return memory_backend
+
+    cases["bootstrap_cold"] = time_case(lambda: handlers.bootstrap_context(backend=backend()), repeat,
+                                        setup=lambda: _reset_caches(memory_dir))
+    cases["bootstrap_warm"] = time_case(lambda: handlers.bootstrap_context(backend=backend()), repeat)
+
+    _reset_caches(memory_dir)
+    cases["build_index"] = time_case(lambda: handlers.update_search_index(backend()), 1,
+                                     setup=lambda: _reset_caches(memory_dir))
+
+    for question, filters in BENCHMARK_QUERIES:
+        name = "query[" + ",".join([question] + [f"{k}={v}" for k, v in filters.items()]) + "]"
+        cases[name] = time_case(lambda: handlers.query_history(question, dict(filters), backend=backend()), repeat)
+        if not filters:
+            cases["query_index" + name[len("query"):]] = time_case(
+                lambda: handlers.query_history(question, dict(filters), backend=backend(use_index=True)), repeat)
+
+    cases.update(benchmark_matching(memory_dir / "devlog.md", repeat))
+
+    # Last: it grows the corpus
+    payloads = iter([_payload(rng, -1, 1, True) for _ in range(repeat + 1)])
+    cases["log_session"] = time_case(lambda: handlers.log_session(next(payloads), backend=backend()), repeat)
+
+    return cases
+
+
+def benchmark_matching(devlog_path: Path, repeat: int) -> dict:
+    """
+    Micro-benchmark keyword matching alone over the lines of `devlog_path`,
+    for the BENCHMARK_QUERIES: "match_loop" lowercases every line and tests
+    every keyword against it; "match_matcher" runs KeywordMatcher.line_hits()
+    on the lowered document (built once, as the parsed cache keeps it).
+    """
+    with open(devlog_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    document = handlers._lowered_document(lines)
+    cases = {}
+
+    for question, _ in BENCHMARK_QUERIES:
+        keywords = handlers._query_keywords(question)
+        matcher = handlers.KeywordMatcher(keywords)
+
+        def loop():
+            return {i: n for i, n in ((i, sum(1 for kw in keywords if kw in line.lower()))
+                                      for i, line in enumerate(lines)) if n}
+
+        if loop() != matcher.line_hits(document):
+            raise AssertionError(f"KeywordMatcher disagrees with the per-line loop for {question!r}")
+        cases[f"match_loop[{question}]"] = time_case(loop, repeat)
+        cases[f"match_matcher[{question}]"] = time_case(lambda: matcher.line_hits(document), repeat)
+
+    return cases
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).resolve().parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """Return (size, case, baseline p50, current p50, ratio) for cases present in both runs."""
+    previous = {(run["corpus"]["sessions"], name): stats
+                for run in baseline.get("runs", []) for name, stats in run["cases"].items()}
+    rows = []
+    for run in results["runs"]:
+        for name, stats in run["cases"].items():
+            old = previous.get((run["corpus"]["sessions"], name))
+            if old and old["p50_ms"] > 0:
+                rows.append((run["corpus"]["sessions"], name, old["p50_ms"], stats["p50_ms"],
+                             stats["p50_ms"] / old["p50_ms"]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the research-memory handlers on synthetic corpora')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                        help='Numbers of devlog sessions to generate (one corpus per size)')
+    parser.add_argument('--experiments', type=float, default=1.0,
+                        help='Experiment rows per session')
+    parser.add_argument('--todos', type=float, default=0.5,
+                        help='TODO items per session')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic text')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Results JSON of an earlier run to compare against')
+    parser.add_argument('--keep', help='Generate the corpora under this directory and keep them')
+    args = parser.parse_args()
+
+    print("⏱️ Research Memory Benchmark")
+    print("=" * 50)
+
+    results = {
+        "revision": _git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "runs": []
+    }
+
+    original_cwd = os.getcwd()
+    root = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix="research-memory-bench-"))
+    try:
+        for size in args.sizes:
+            project_dir = root / f"sessions-{size}"
+            shutil.rmtree(project_dir, ignore_errors=True)
+            project_dir.mkdir(parents=True)
+            # Run with default configuration, whatever config/config.json the caller has
+            os.chdir(project_dir)
+
+            started = time.perf_counter()
+            corpus = generate_corpus(project_dir, size, round(size * args.experiments),
+                                     round(size * args.todos), args.seed)
+            corpus["generate_seconds"] = round(time.perf_counter() - started, 3)
+            print(f"\n📚 {size} sessions, {corpus['experiments']} experiments, {corpus['todos']} TODOs "
+                  f"({sum(corpus['bytes'].values()) / 1e6:.1f} MB, generated in {corpus['generate_seconds']}s)")
+
+            cases = benchmark_corpus(project_dir, args.repeat, args.seed)
+            for name, stats in cases.items():
+                print(f"  {name:<48} p50 {stats['p50_ms']:>10.2f} ms  p90 {stats['p90_ms']:>10.2f} ms  "
+                      f"peak {stats['peak_memory_bytes'] / 1e6:>8.1f} MB")
+            results["runs"].append({"corpus": corpus, "cases": cases})
+            os.chdir(original_cwd)
+    finally:
+        os.chdir(original_cwd)
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n📊 Compared with {args.compare} (revision {baseline.get('revision') or 'unknown'}):")
+        for size, name, old, new, ratio in compare(results, baseline):
+            marker = "🔺" if ratio > 1.1 else "🔻" if ratio < 0.9 else "  "
+            print(f"  {marker} {size:>7} {name:<48} {old:>10.2f} -> {new:>10.2f} ms  x{ratio:.2f}")
+
+
+if __name__ == '__main__':
+    main()
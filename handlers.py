@@ -10,15 +10,52 @@ Version: 0.1.0
 """
 
 import os
+import io
 import json
 import csv
 import re
-from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional, Union
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterator, List, Optional, Union
 from pathlib import Path
 import argparse
+import asyncio
 import sys
 import uuid
+import base64
+import codecs
+import copy
+import gzip
+import hashlib
+import heapq
+import shutil
+from collections import OrderedDict, deque
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+import math
+import mmap
+import signal
+import threading
+import time
+import weakref
+import cProfile
+import socket
+import socketserver
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial, wraps
+from itertools import accumulate, chain, islice
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
 
 # Research phases supported by the skill
 RESEARCH_PHASES = [
@@ -26,42 +63,410 @@ RESEARCH_PHASES = [
     "robustness", "writing", "infra", "notes"
 ]
 
+# Configuration file (relative to the project root)
+CONFIG_PATH = Path("config/config.json")
+
 # Default configuration
 DEFAULT_CONFIG = {
     "memory_directory": "memory",
+    "backend": "files",
     "timestamp_format": "ISO8601",
     "csv_delimiter": ",",
     "encoding": "utf-8",
     "bootstrap": {
         "recent_entries_count": 5,
         "include_todos": True,
-        "suggest_work_plan": True
+        "suggest_work_plan": True,
+        "recent_experiments_count": 3,
+        "snapshot": True,
+        "max_chars": None,
+        "max_tokens": None
     },
     "logging": {
         "auto_timestamp": True,
+        "journal": False,
+        "journal_flush_threshold": 20,
         "phase_sections": RESEARCH_PHASES,
         "experiment_schema": ["hypothesis", "dataset", "model", "metrics", "notes"]
     },
     "search": {
         "max_results": 10,
         "include_context": True,
-        "context_lines": 3
+        "context_lines": 3,
+        "use_index": False,
+        "ranking": "count",
+        "unit": "line",
+        "scan_workers": None,
+        "parallel_scan_bytes": 8 * 1024 * 1024
+    },
+    "cache": {
+        "parsed_memory": True,
+        "persistent": True,
+        "max_entries": 32,
+        "mmap_bytes": 32 * 1024 * 1024
+    },
+    "archive": {
+        "auto": False,
+        "keep_days": 365,
+        "compress": False
+    },
+    "projects": {
+        "registry": "~/.research-memory/projects.json",
+        "workers": 8,
+        "pool": "process"
     }
 }
 
+# Advisory lock serializing writers, and the record that lets a writer roll
+# back a session interrupted half-way (both inside the memory directory)
+LOCK_FILENAME = ".lock"
+ROLLBACK_FILENAME = ".session-rollback.json"
+
+# TODO line patterns, compiled once for the per-line loops
+TODO_LINE_PATTERN = re.compile(r'^\s*-\s*\[[ x]\]')
+OPEN_TODO_PATTERN = re.compile(r'^-\s*\[\s*\]')
+OPEN_TODO_PREFIX_PATTERN = re.compile(r'^-\s*\[\s*\]\s*')
+
+# Sidecar mapping open TODO text to the byte offsets of its lines in todos.md
+TODOS_INDEX_FILENAME = "todos-index.json"
+
+# Write-ahead journal of logged sessions not yet rendered into the memory files
+JOURNAL_FILENAME = "journal.jsonl"
+
+# Directory (inside the memory directory) for derived data that can always be
+# rebuilt from the human-readable memory files
+CACHE_DIRNAME = ".cache"
+
+# Searchable memory files, keyed by the source type reported in matches
+SEARCH_SOURCES = {
+    "devlog": "devlog.md",
+    "decisions": "decisions.md",
+    "experiments": "experiments.csv"
+}
+
+# Inverted index over the memory files: one SQLite database whose rows are
+# appended to as sessions are logged and read back per queried term
+SEARCH_INDEX_FILENAME = "search-index.sqlite"
+SEARCH_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (filename TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, header TEXT,
+    units INTEGER NOT NULL, total_length INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS units (filename TEXT NOT NULL, unit INTEGER NOT NULL, start INTEGER NOT NULL,
+    length INTEGER NOT NULL, date TEXT, phases TEXT, PRIMARY KEY (filename, unit)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS blocks (filename TEXT NOT NULL, block INTEGER NOT NULL, first_unit INTEGER NOT NULL,
+    timestamp TEXT, length INTEGER NOT NULL, PRIMARY KEY (filename, block)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, filename TEXT NOT NULL, term TEXT NOT NULL);
+CREATE UNIQUE INDEX IF NOT EXISTS terms_term ON terms (filename, term);
+CREATE TABLE IF NOT EXISTS postings (term_ref INTEGER NOT NULL, units BLOB NOT NULL);
+CREATE INDEX IF NOT EXISTS postings_term ON postings (term_ref);
+"""
+
+# Snapshot of parsed memory files, reused by later CLI invocations
+PARSED_CACHE_FILENAME = "parsed-memory.json"
+PARSED_CACHE_VERSION = 2
+
+# Memory directories whose parsed caches one process keeps (daemon, --all-projects)
+PARSED_CACHE_MAX_DIRECTORIES = 8
+
+# Pre-digested bootstrap result kept in step with the memory files by
+# log_session(), and the files whose fingerprints decide whether it is fresh
+BOOTSTRAP_SNAPSHOT_FILENAME = "bootstrap-snapshot.json"
+BOOTSTRAP_SNAPSHOT_VERSION = 1
+BOOTSTRAP_SOURCES = ["project-overview.md", "devlog.md", "todos.md", "experiments.csv"]
+TODO_TAGS_PATTERN = re.compile(r'^-\s*\[\s*\]\s*(?:\[([A-Z]+)\]\s*)?(?:\[([^\]]+)\])?')
+
+# Sidecar with the byte offsets of dated devlog session headers
+DEVLOG_SECTIONS_FILENAME = "devlog-sections.json"
+DEVLOG_HEADER_PATTERN = re.compile(rb'^## \d{4}-\d{2}-\d{2}', re.MULTILINE)
+TAIL_SCAN_CHUNK_SIZE = 64 * 1024
+
+# SQLite sidecar mirroring experiments.csv, one typed column per metric key
+EXPERIMENT_STORE_FILENAME = "experiments.sqlite"
+EXPERIMENT_CSV_HEADER = ["timestamp", "experiment_id", "hypothesis", "dataset", "model",
+                         "spec", "metrics", "notes", "research_phase"]
+EXPERIMENT_COLUMNS = ["timestamp", "experiment_id", "hypothesis", "dataset", "model",
+                      "spec", "notes", "research_phase"]
+METRIC_COLUMN_PREFIX = "metric."
+EXPERIMENT_CONDITION_PATTERN = re.compile(r'^\s*(.+?)\s*(>=|<=|!=|=|<|>)\s*(.*?)\s*$')
+
+# SQLite storage backend: one database in the memory directory holding what
+# the markdown/CSV files hold, with an FTS5 index for query_history
+MEMORY_DATABASE_FILENAME = "memory.sqlite"
+MEMORY_DATABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (name TEXT PRIMARY KEY, content TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, timestamp TEXT, date TEXT,
+    goal TEXT, changes_summary TEXT, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS phases (session_id INTEGER NOT NULL, phase TEXT NOT NULL, text TEXT);
+CREATE TABLE IF NOT EXISTS decisions (id INTEGER PRIMARY KEY, timestamp TEXT, date TEXT,
+    decision TEXT, rationale TEXT, alternatives TEXT, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS experiments (id INTEGER PRIMARY KEY, timestamp TEXT, date TEXT,
+    experiment_id TEXT, hypothesis TEXT, dataset TEXT, model TEXT, spec TEXT, metrics TEXT,
+    notes TEXT, research_phase TEXT, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS experiment_metrics (experiment_ref INTEGER NOT NULL, key TEXT NOT NULL, value);
+CREATE TABLE IF NOT EXISTS todo_lines (id INTEGER PRIMARY KEY, line TEXT NOT NULL, text TEXT, done INTEGER);
+CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, source TEXT NOT NULL, ref INTEGER NOT NULL, date TEXT);
+CREATE TABLE IF NOT EXISTS entry_phases (entry_id INTEGER NOT NULL, phase TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS sessions_date ON sessions (date);
+CREATE INDEX IF NOT EXISTS phases_phase ON phases (phase, session_id);
+CREATE INDEX IF NOT EXISTS decisions_date ON decisions (date);
+CREATE INDEX IF NOT EXISTS experiments_date ON experiments (date);
+CREATE INDEX IF NOT EXISTS experiment_metrics_key ON experiment_metrics (key, value, experiment_ref);
+CREATE INDEX IF NOT EXISTS todo_lines_open ON todo_lines (text) WHERE done = 0;
+CREATE INDEX IF NOT EXISTS entries_date ON entries (date, source);
+CREATE INDEX IF NOT EXISTS entry_phases_phase ON entry_phases (phase, entry_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(content, tokenize = 'unicode61');
+"""
+
+# Stored as PRAGMA user_version; 1: FTS text holds _tokenize() tokens,
+# 2: experiment metrics are typed rows of experiment_metrics
+MEMORY_DATABASE_VERSION = 2
+
+DATED_HEADER_PATTERN = re.compile(r'^## \d{4}-\d{2}-\d{2}', re.MULTILINE)
+
+# Opt-in instrumentation: set to a non-empty value other than "0" to record
+# per-stage timings, optionally appended as JSON lines to a metrics log, and
+# the path of a cProfile dump for CLI runs
+PROFILE_ENV_VAR = "RESEARCH_MEMORY_PROFILE"
+METRICS_LOG_ENV_VAR = "RESEARCH_MEMORY_METRICS_LOG"
+PROFILE_DUMP_ENV_VAR = "RESEARCH_MEMORY_PROFILE_DUMP"
+
+# Archived entries: memory/archive/<YYYYQn>/ holds the devlog sessions,
+# decisions and experiment rows of one quarter in files named like the
+# memory files, plus a summary of the segment and its own search index
+ARCHIVE_DIRNAME = "archive"
+SEGMENT_SUMMARY_FILENAME = "segment.json"
+ARCHIVE_HEAD_SIZE = 64 * 1024
+
+# Compressed segments keep their files gzipped (devlog.md.gz, ...) and are
+# scanned by streaming decompression. The summary of every segment holds a
+# Bloom filter of the character 1- to 3-grams of its tokens, so a query
+# whose keywords cannot occur in it skips the segment unread.
+COMPRESSED_SUFFIX = ".gz"
+BLOOM_GRAM_SIZE = 3
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+# Registry of project roots searched by query --all-projects (path from the
+# projects.registry config option, or this environment variable), and the
+# pools the projects can be searched in
+REGISTRY_ENV_VAR = "RESEARCH_MEMORY_REGISTRY"
+PROJECT_POOLS = {"process": ProcessPoolExecutor, "thread": ThreadPoolExecutor}
+
+# asyncio locks of the async API, per event loop: one per memory directory,
+# shared by all backends on it, serializing the calls that use it
+_ASYNC_LOCKS: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, asyncio.Lock]]' = \
+    weakref.WeakKeyDictionary()
+
+# Storage backends selectable with the "backend" config option
+STORAGE_BACKENDS = ["files", "sqlite"]
+
+# Unix socket of the long-lived memory daemon (relative to the project root);
+# override with the RESEARCH_MEMORY_SOCKET environment variable
+DEFAULT_DAEMON_SOCKET = ".research-memory.sock"
+DAEMON_COMMANDS = ["bootstrap", "log-session", "query", "query-experiments"]
+DAEMON_TIMEOUT_SECONDS = 30
+# Stored as PRAGMA user_version of the search index database
+SEARCH_INDEX_VERSION = 6
+# Terms looked up per statement, below SQLite's limit on bound parameters
+SEARCH_INDEX_BATCH_SIZE = 500
+# Postings are stored as flat unit, frequency, unit, ... arrays of this type
+POSTINGS_TYPECODE = 'I'
+
+# Ranking modes for query_history: keyword hit counts or Okapi BM25
+RANKING_MODES = ["count", "bm25"]
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Parallel scan of the files a query cannot answer from the search index:
+# once they total search.parallel_scan_bytes, markdown files are split at
+# section headers into chunks of at least this size and scored, like
+# experiments.csv, by search.scan_workers processes (default: CPU count)
+PARALLEL_SCAN_MIN_CHUNK = 256 * 1024
+# Slice size for counting lines in memory-mapped files
+MAPPED_COUNT_CHUNK_SIZE = 1024 * 1024
+
+# Search units for query_history: single lines/rows, or whole dated entries
+# (a devlog session or a decision block, each starting with "## YYYY-MM-DD")
+SEARCH_UNITS = ["line", "entry"]
+SECTION_HEADER_PATTERN = re.compile(r'## (\d{4}-\d{2}-\d{2}\S*(?: \d{2}:\d{2}(?::\d{2})?)?)?')
+SECTION_START_PATTERN = re.compile(r'^## ', re.MULTILINE)
+
+# A devlog session: from its dated header to the next "## " line
+RECENT_SESSION_PATTERN = re.compile(r'^## \d{4}-\d{2}-\d{2}.*?(?=^## |\Z)', re.MULTILINE | re.DOTALL)
+
+# Tokenizer shared by documents and queries: runs of CJK characters (kana,
+# CJK ideographs, Hangul) become overlapping character bigrams, other word
+# characters form whole word tokens
+CJK_CHARACTERS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+WORD_RUN_PATTERN = re.compile(rf'(?P<cjk>[{CJK_CHARACTERS}]+)|[^\W{CJK_CHARACTERS}]+')
+CJK_NGRAM_PATTERN = re.compile(rf'[{CJK_CHARACTERS}]{{2}}')
+
+# Size budget for bootstrap_context: max_tokens is converted to characters
+# with this rough ratio, and truncated text ends with the marker
+BOOTSTRAP_CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "\n[...]\n"
+MARKDOWN_HEADING_PATTERN = re.compile(r'^#{1,6} ')
+
+
+def _temporary_path(path: Path) -> Path:
+    """Return a hidden sibling of path for writing before an atomic rename.
+
+    The name carries both the process and the thread id, so concurrent
+    writers of the same file (daemon threads included) never share one.
+    """
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _write_file_atomic(file_path: Path, content: str, encoding: str = 'utf-8') -> None:
+    """Replace a file's content via a temporary file and rename, so readers never see a partial write."""
+    tmp_path = _temporary_path(file_path)
+    with open(tmp_path, 'w', encoding=encoding) as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def _lock_file(lock_file) -> None:
+    """Block until the exclusive advisory lock on an open file is held."""
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        lock_file.seek(0)
+        while True:
+            try:
+                # LK_LOCK itself retries for about ten seconds before giving up
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+
+def _unlock_file(lock_file) -> None:
+    """Release a lock taken with _lock_file()."""
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class Profiler:
+    """
+    Opt-in per-stage timing and read accounting for the handlers.
+
+    Instrumented code runs inside stage(name). While a profile is recorded
+    (between start() and stop()), each stage accumulates its number of
+    calls, wall time and the bytes read from disk while it ran; both include
+    nested stages. Otherwise stage() only checks a flag.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.bytes_read = 0
+        self._stack: List[str] = []
+        self._started = 0.0
+
+    def start(self) -> None:
+        """Start recording a new profile."""
+        self.active = True
+        self.stages = {}
+        self.bytes_read = 0
+        self._stack = []
+        self._started = time.perf_counter()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop recording and return the report."""
+        self.active = False
+        return {
+            "total_seconds": round(time.perf_counter() - self._started, 6),
+            "bytes_read": self.bytes_read,
+            "stages": {
+                name: {"calls": stats["calls"], "seconds": round(stats["seconds"], 6),
+                       "bytes_read": stats["bytes_read"]}
+                for name, stats in self.stages.items()
+            }
+        }
+
+    @contextmanager
+    def stage(self, name: str):
+        """Account the enclosed code to stage `name`."""
+        if not self.active:
+            yield
+            return
+
+        stats = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes_read": 0})
+        stats["calls"] += 1
+        # Time of a stage re-entered from within itself is already being counted
+        reentered = name in self._stack
+        self._stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            if not reentered:
+                stats["seconds"] += time.perf_counter() - started
+
+    def add_bytes(self, count: int) -> None:
+        """Record `count` bytes read by the current stages."""
+        if not self.active:
+            return
+        self.bytes_read += count
+        for name in set(self._stack):
+            self.stages[name]["bytes_read"] += count
+
+
+# Records the stages of the request being executed (see execute_request())
+PROFILER = Profiler()
+
+
+def _profiled(name: str):
+    """Decorator running a function as profiler stage `name`."""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            # Cheap enough for per-section and per-row checks while not profiling
+            if not PROFILER.active:
+                return function(*args, **kwargs)
+            with PROFILER.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _profiling_requested(request: Dict[str, Any]) -> bool:
+    """Whether a request asks for a profile, directly or through the environment."""
+    return bool(request.get("profile")) or os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0")
+
 
 class MemoryBackend:
     """
     Abstract memory backend interface for future extensibility.
     v0 implementation uses local files, but this allows easy migration to v1.
+
+    Other storage backends subclass it, set `storage` and implement
+    bootstrap_context(), log_session(), query_candidates() and
+    query_experiments() as methods; the
+    module-level entry points hand requests to them (see create_backend()).
     """
 
-    def __init__(self, memory_dir: Optional[str] = None):
-        self.config = self._load_config()
+    # Key of this backend in STORAGE_BACKENDS / the "backend" config option
+    storage = "files"
+
+    @_profiled("backend_init")
+    def __init__(self, memory_dir: Optional[str] = None, project_root: Optional[str] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        # Paths in a project's config are relative to its root (by default the CWD)
+        self.project_root = Path(project_root) if project_root is not None else None
+        self.config_path = self.project_root / CONFIG_PATH if self.project_root is not None else CONFIG_PATH
+        # An already loaded configuration (e.g. of the project owning an archive segment)
+        self.config = config if config is not None else self._load_config()
 
         # Use configured memory directory or parameter
         if memory_dir is None:
             memory_dir = self.config.get("memory_directory", "memory")
+            if self.project_root is not None:
+                memory_dir = self.project_root / memory_dir
 
         self.memory_dir = Path(memory_dir)
 
@@ -70,15 +475,27 @@ class MemoryBackend:
         self.csv_delimiter = self.config.get("csv_delimiter", ",")
         self.timestamp_format = self.config.get("timestamp_format", "ISO8601")
 
+        # Loaded search index and the fingerprint of the file it came from
+        self._search_index = None
+        self._search_index_fingerprint = None
+
+        # Parsed memory files, shared by all backends on this directory
+        self.parsed_cache = ParsedMemoryCache.for_backend(self)
+
+    @_profiled("load_config")
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from config.json or use defaults."""
-        config_path = Path("config/config.json")
-        config = DEFAULT_CONFIG.copy()
+        config_path = self.config_path
+        # Deep copy: merging writes into the nested sections, which other
+        # backends in this process (daemon, --all-projects) must not see
+        config = copy.deepcopy(DEFAULT_CONFIG)
 
         if config_path.exists():
             try:
                 with open(config_path, 'r', encoding='utf-8') as f:
-                    user_config = json.load(f)
+                    text = f.read()
+                PROFILER.add_bytes(len(text.encode('utf-8')))
+                user_config = json.loads(text)
 
                 # Deep merge user config with defaults
                 self._deep_merge(config, user_config)
@@ -86,6 +503,7 @@ class MemoryBackend:
 
             except Exception as e:
                 print(f"Warning: Could not load config from {config_path}, using defaults. Error: {e}")
+                config = copy.deepcopy(DEFAULT_CONFIG)
 
         return config
 
@@ -97,6 +515,7 @@ class MemoryBackend:
             else:
                 base[key] = value
 
+    @_profiled("ensure_memory_directory")
     def ensure_memory_directory(self):
         """Create memory directory and files if they don't exist."""
         self.memory_dir.mkdir(exist_ok=True)
@@ -110,10 +529,11 @@ class MemoryBackend:
             "experiments.csv": self._get_default_experiments_csv()
         }
 
+        # One directory listing instead of a stat per file
+        existing = set(os.listdir(self.memory_dir))
         for filename, content in default_files.items():
-            file_path = self.memory_dir / filename
-            if not file_path.exists():
-                with open(file_path, 'w', encoding=self.encoding) as f:
+            if filename not in existing:
+                with open(self.memory_dir / filename, 'w', encoding=self.encoding) as f:
                     f.write(content)
 
     def _get_default_project_overview(self) -> str:
@@ -185,50 +605,70 @@ class MemoryBackend:
 
         return new_todos, completed_todos
 
+    @_profiled("update_todos")
     def _update_todos_file(self, new_todos: List[Dict[str, Any]], completed_todos: List[Dict[str, Any]], timestamp: str) -> None:
         """
         Update todos.md with new and completed items.
 
+        Only the file from the first completed item onwards is rewritten (see
+        _patch_todos_file); callers must hold lock() so concurrent updates
+        are not lost.
+
         Args:
             new_todos: List of new TODO items to add
             completed_todos: List of TODO items to mark as completed
             timestamp: Current timestamp for marking completion time
         """
+        self._patch_todos_file([(new_todos, completed_todos, timestamp)])
+
+    def _read_todos_file(self) -> str:
+        """Return the content of todos.md, or an empty string if it does not exist."""
         todos_path = self.memory_dir / "todos.md"
+        if not todos_path.exists():
+            return ""
+        with open(todos_path, 'r', encoding=self.encoding) as f:
+            return f.read()
+
+    def _apply_todo_changes(self, existing_content: str, new_todos: List[Dict[str, Any]],
+                            completed_todos: List[Dict[str, Any]], timestamp: str) -> str:
+        """
+        Apply new and completed TODO items to todos.md content.
 
-        # Read existing todos if file exists
-        existing_content = ""
-        if todos_path.exists():
-            with open(todos_path, 'r', encoding=self.encoding) as f:
-                existing_content = f.read()
+        Args:
+            existing_content: Current todos.md content (or a tail of it starting at a line)
+            new_todos: List of new TODO items to add
+            completed_todos: List of TODO items to mark as completed
+            timestamp: Timestamp of the session making the changes
 
+        Returns:
+            Updated todos.md content
+        """
         # Process completed todos - find and mark them as complete
         if completed_todos:
+            # First completion record wins for each TODO text
+            completions = {}
+            for completed_todo in completed_todos:
+                completions.setdefault(completed_todo.get('text', '').strip(), completed_todo)
+
             lines = existing_content.split('\n')
             updated_lines = []
 
             for line in lines:
                 line_stripped = line.strip()
-                is_todo_item = re.match(r'^-\s*\[\s*\]', line_stripped)
 
-                if is_todo_item:
-                    # Extract TODO text
-                    todo_text = re.sub(r'^-\s*\[\s*\]\s*', '', line_stripped)
+                if OPEN_TODO_PATTERN.match(line_stripped):
+                    # Extract TODO text and check if it should be marked as completed
+                    todo_text = OPEN_TODO_PREFIX_PATTERN.sub('', line_stripped, count=1)
+                    completed_todo = completions.get(todo_text)
 
-                    # Check if this TODO should be marked as completed
-                    for completed_todo in completed_todos:
-                        completed_text = completed_todo.get('text', '').strip()
+                    if completed_todo is not None:
+                        # Mark as completed with timestamp
                         completion_note = completed_todo.get('completion_note', '')
-
-                        if todo_text == completed_text:
-                            # Mark as completed with timestamp
-                            timestamp_short = timestamp[:10]
-                            completion_entry = f"- [x] {todo_text} (completed: {timestamp_short}"
-                            if completion_note:
-                                completion_entry += f" - {completion_note}"
-                            completion_entry += ")"
-                            updated_lines.append(completion_entry)
-                            break
+                        completion_entry = f"- [x] {todo_text} (completed: {timestamp[:10]}"
+                        if completion_note:
+                            completion_entry += f" - {completion_note}"
+                        completion_entry += ")"
+                        updated_lines.append(completion_entry)
                     else:
                         # No match found, keep original line
                         updated_lines.append(line)
@@ -263,466 +703,5199 @@ class MemoryBackend:
             # Append to existing content
             existing_content += new_todos_section
 
-        # Write updated content back to file
-        with open(todos_path, 'w', encoding=self.encoding) as f:
-            f.write(existing_content)
+        return existing_content
 
-    def _generate_experiment_id(self) -> str:
+    def _load_todos_index(self) -> Dict[str, List[int]]:
         """
-        Generate collision-resistant experiment ID using timestamp + UUID.
+        Return the open-TODO index: stripped TODO text -> byte offsets of its lines.
 
-        Returns:
-            Unique experiment ID in format: exp_YYYYMMDD_HHMMSS_UUID
+        The sidecar is rebuilt with a full scan of todos.md if it is missing
+        or does not match the file.
         """
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S%f')
-        unique_suffix = uuid.uuid4().hex[:8]  # Use 8 characters for better uniqueness
-        return f"exp_{timestamp}_{unique_suffix}"
+        todos_path = self.memory_dir / "todos.md"
+        index_path = self.memory_dir / CACHE_DIRNAME / TODOS_INDEX_FILENAME
+        fingerprint = _file_fingerprint(todos_path)
+        if fingerprint is None:
+            return {}
 
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get("fingerprint") == fingerprint:
+                return index["open"]
+        except (OSError, ValueError, AttributeError, KeyError):
+            pass
+
+        with open(todos_path, 'rb') as f:
+            return self._scan_open_todos(f.read(), 0)
+
+    def _save_todos_index(self, open_todos: Dict[str, List[int]]) -> None:
+        """Store the open-TODO index for the current state of todos.md."""
+        index_path = self.memory_dir / CACHE_DIRNAME / TODOS_INDEX_FILENAME
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        index = {"fingerprint": _file_fingerprint(self.memory_dir / "todos.md"), "open": open_todos}
+        _write_file_atomic(index_path, json.dumps(index, ensure_ascii=False), 'utf-8')
+
+    def _scan_open_todos(self, data: bytes, base_offset: int,
+                         open_todos: Optional[Dict[str, List[int]]] = None) -> Dict[str, List[int]]:
+        """Add the open TODO lines found in a chunk of todos.md to an index."""
+        if open_todos is None:
+            open_todos = {}
+
+        position = base_offset
+        for raw_line in data.split(b'\n'):
+            line_stripped = raw_line.decode(self.encoding, errors='replace').strip()
+            if OPEN_TODO_PATTERN.match(line_stripped):
+                todo_text = OPEN_TODO_PREFIX_PATTERN.sub('', line_stripped, count=1)
+                open_todos.setdefault(todo_text, []).append(position)
+            position += len(raw_line) + 1
+
+        return open_todos
+
+    @_profiled("update_todos")
+    def _patch_todos_file(self, todos_updates: List[tuple], rollback_record: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Apply TODO updates by rewriting todos.md only from the first affected line.
 
-def bootstrap_context(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """
-    Bootstrap project context from memory files.
+        Completed items are looked up in the open-TODO index instead of being
+        compared against every line. Everything before the earliest completed
+        line is left untouched; with no completions the new items are simply
+        appended.
 
-    Args:
-        config: Optional configuration dictionary
+        Args:
+            todos_updates: (new_todos, completed_todos, timestamp) tuples, applied in order
+            rollback_record: If given, the original tail is stored in it (and
+                the record rewritten) before the file is modified
+        """
+        todos_path = self.memory_dir / "todos.md"
+        open_todos = self._load_todos_index()
+        size = (_file_fingerprint(todos_path) or [0])[0]
+
+        start = size
+        for _, completed_todos, _ in todos_updates:
+            for completed_todo in completed_todos:
+                offsets = open_todos.get(completed_todo.get('text', '').strip())
+                if offsets:
+                    start = min(start, offsets[0])
+
+        original_tail = b''
+        if size:
+            with open(todos_path, 'rb') as f:
+                f.seek(start)
+                original_tail = f.read()
+            PROFILER.add_bytes(len(original_tail))
+
+        tail = original_tail.decode(self.encoding)
+        for new_todos, completed_todos, timestamp in todos_updates:
+            tail = self._apply_todo_changes(tail, new_todos, completed_todos, timestamp)
+        new_tail = tail.encode(self.encoding)
+
+        if rollback_record is not None:
+            rollback_record["todos_patch"] = {
+                "offset": start,
+                "original": base64.b64encode(original_tail).decode('ascii')
+            }
+            _write_file_atomic(self.memory_dir / ROLLBACK_FILENAME, json.dumps(rollback_record), 'utf-8')
+
+        with open(todos_path, 'r+b' if todos_path.exists() else 'w+b') as f:
+            f.seek(start)
+            f.write(new_tail)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Offsets before the patch are unchanged; rescan only the rewritten tail
+        open_todos = {text: kept for text, offsets in open_todos.items()
+                      if (kept := [offset for offset in offsets if offset < start])}
+        self._save_todos_index(self._scan_open_todos(new_tail, start, open_todos))
+
+    @contextmanager
+    def lock(self):
+        """
+        Hold the exclusive advisory lock on the memory directory.
 
-    Returns:
-        Dictionary containing project context, recent progress, and suggestions
-    """
-    backend = MemoryBackend()
-    backend.ensure_memory_directory()
+        Every writer takes it, so sessions from concurrent processes are
+        applied one after another. A session left half-written by a crashed
+        writer is rolled back before the lock is handed on.
+        """
+        self.memory_dir.mkdir(exist_ok=True)
 
-    recent_entries_count = backend.config["bootstrap"]["recent_entries_count"]
-    include_todos = backend.config["bootstrap"]["include_todos"]
-    suggest_work_plan = backend.config["bootstrap"]["suggest_work_plan"]
+        with open(self.memory_dir / LOCK_FILENAME, 'a+b') as lock_file:
+            _lock_file(lock_file)
+            try:
+                self._recover_interrupted_session()
+                yield
+            finally:
+                _unlock_file(lock_file)
+
+    @_profiled("write_session")
+    def _write_session(self, appends: Dict[str, str], todos_updates: Optional[List[tuple]] = None,
+                       consume_journal: bool = False) -> None:
+        """
+        Apply file changes for one or more sessions all-or-nothing. Caller must hold lock().
 
-    result = {
-        "project_context": "",
-        "recent_progress": [],
-        "current_todos": [],
-        "work_plan_suggestions": [],
-        "timestamp": backend._get_timestamp()
-    }
+        A rollback record with the original file sizes is written first, then
+        the appends, then the patched tail of todos.md (its original bytes are
+        added to the record first), then the consumed journal is emptied.
+        Emptying the journal (or, without one, deleting the record) is the
+        commit point.
 
-    # Read project overview
-    overview_path = backend.memory_dir / "project-overview.md"
-    if overview_path.exists():
-        with open(overview_path, 'r', encoding=backend.encoding) as f:
-            result["project_context"] = f.read()
+        Args:
+            appends: Text to append, keyed by memory filename
+            todos_updates: (new_todos, completed_todos, timestamp) tuples, applied in order
+            consume_journal: Empty the session journal as part of the commit
+        """
+        rollback_path = self.memory_dir / ROLLBACK_FILENAME
+        journal_path = self.memory_dir / JOURNAL_FILENAME
 
-    # Read recent devlog entries
-    devlog_path = backend.memory_dir / "devlog.md"
-    if devlog_path.exists():
-        with open(devlog_path, 'r', encoding=backend.encoding) as f:
-            content = f.read()
+        record = {
+            "appends": {filename: (_file_fingerprint(self.memory_dir / filename) or [None])[0]
+                        for filename in appends},
+            "journal_size": (_file_fingerprint(journal_path) or [0])[0] if consume_journal else None
+        }
+        _write_file_atomic(rollback_path, json.dumps(record), 'utf-8')
 
-        # Extract recent entries (simplified - looks for date headers)
-        entries = re.findall(r'^## \d{4}-\d{2}-\d{2}.*?(?=^## |\Z)', content, re.MULTILINE | re.DOTALL)
-        result["recent_progress"] = entries[-recent_entries_count:] if entries else []
+        try:
+            for filename, text in appends.items():
+                file_path = self.memory_dir / filename
+                data = (self._append_separator(file_path) + text).encode(self.encoding)
+                with open(file_path, 'ab') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            if todos_updates:
+                self._patch_todos_file(todos_updates, record)
+
+            if consume_journal:
+                os.truncate(journal_path, 0)
+        except BaseException:
+            self._recover_interrupted_session()
+            raise
+
+        os.unlink(rollback_path)
+
+    def _append_separator(self, file_path: Path) -> str:
+        """Text needed so an appended record starts on a fresh line (or paragraph for markdown)."""
+        size = (_file_fingerprint(file_path) or [0])[0]
+        if size == 0:
+            return ""
+
+        with open(file_path, 'rb') as f:
+            f.seek(max(0, size - 2))
+            tail = f.read()
+
+        if file_path.suffix == '.md':
+            return "" if tail.endswith(b'\n\n') else "\n"
+        return "" if tail.endswith(b'\n') else "\n"
+
+    def _recover_interrupted_session(self) -> None:
+        """Undo the appends of a session whose writer died before committing."""
+        rollback_path = self.memory_dir / ROLLBACK_FILENAME
+        if not rollback_path.exists():
+            return
 
-    # Read current todos
-    if include_todos:
-        todos_path = backend.memory_dir / "todos.md"
-        if todos_path.exists():
-            with open(todos_path, 'r', encoding=backend.encoding) as f:
-                content = f.read()
+        try:
+            with open(rollback_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            record = {"appends": {}}
+
+        journal_path = self.memory_dir / JOURNAL_FILENAME
+        journal_size = (_file_fingerprint(journal_path) or [0])[0]
+        consumed_journal = record.get("journal_size") is not None
+        committed = consumed_journal and journal_size < record["journal_size"]
+
+        if committed:
+            # Finish the commit: the journal sessions are now in the files
+            if consumed_journal and journal_size:
+                os.truncate(journal_path, 0)
+        else:
+            for filename, size in record.get("appends", {}).items():
+                file_path = self.memory_dir / filename
+                if not file_path.exists():
+                    continue
+                if size is None:
+                    file_path.unlink()
+                elif file_path.stat().st_size > size:
+                    os.truncate(file_path, size)
+
+            todos_patch = record.get("todos_patch")
+            todos_path = self.memory_dir / "todos.md"
+            if todos_patch is not None and todos_path.exists():
+                with open(todos_path, 'r+b') as f:
+                    f.seek(todos_patch["offset"])
+                    f.write(base64.b64decode(todos_patch["original"]))
+                    f.truncate()
+
+            # stderr: stdout carries the JSON result of the command that recovered
+            print("Warning: Rolled back a session that was interrupted while being logged", file=sys.stderr)
+
+        os.unlink(rollback_path)
+
+    def load_search_index(self) -> Optional['SearchIndex']:
+        """
+        Return the on-disk search index, or None if there is none.
 
-            # Extract TODO items (lines with - [ ] or - [x])
-            todo_lines = []
-            for line in content.split('\n'):
-                if re.match(r'^\s*-\s*\[[ x]\]', line):
-                    todo_lines.append(line.strip())
-            result["current_todos"] = todo_lines
+        The loaded index is kept on the backend and reused while the index
+        file is unchanged, so a long-lived backend parses it only once.
+        """
+        index_path = self.memory_dir / CACHE_DIRNAME / SEARCH_INDEX_FILENAME
+        fingerprint = _file_fingerprint(index_path)
+        if fingerprint is None:
+            return None
 
-    # Generate work plan suggestions (basic implementation)
-    if suggest_work_plan:
-        suggestions = []
+        if self._search_index is None or fingerprint != self._search_index_fingerprint:
+            index = SearchIndex(self)
+            if not index.load():
+                return None
+            self._remember_search_index(index)
 
-        # Analyze recent progress for patterns
-        if result["recent_progress"]:
-            suggestions.append("Review and analyze recent experimental results")
+        return self._search_index
 
-        # Check for open todos
-        incomplete_todos = [todo for todo in result["current_todos"] if "[ ]" in todo]
-        if incomplete_todos:
-            suggestions.append(f"Address {len(incomplete_todos)} open TODO items")
+    def _remember_search_index(self, index: 'SearchIndex') -> None:
+        """Keep a loaded or freshly saved index for reuse by later calls."""
+        self._search_index = index
+        self._search_index_fingerprint = _file_fingerprint(index.path)
 
-        if not suggestions:
-            suggestions.append("Continue with planned research activities")
+    def query_candidates(self, query: str, filters: Dict[str, Any]) -> Iterator[Any]:
+        """Yield match builders for a query in relevance order (see query_history())."""
+        return _query_candidates(self, query, filters)
 
-        result["work_plan_suggestions"] = suggestions
+    def _generate_experiment_id(self) -> str:
+        """
+        Generate collision-resistant experiment ID using timestamp + UUID.
 
-    return result
+        Returns:
+            Unique experiment ID in format: exp_YYYYMMDD_HHMMSS_UUID
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S%f')
+        unique_suffix = uuid.uuid4().hex[:8]  # Use 8 characters for better uniqueness
+        return f"exp_{timestamp}_{unique_suffix}"
 
 
-def log_session(payload: Dict[str, Any]) -> None:
+def _tokenize(text: str) -> List[str]:
     """
-    Log a research session to memory files.
+    Split text into lowercase tokens (the same rule used for queries).
 
-    Args:
-        payload: Dictionary containing session information including:
-            - session_goal: Main objective
-            - changes_summary: Summary of changes
-            - experiments: List of experiment records
-            - decisions: List of decisions with rationale
-            - todos: List of TODO items
-            - phases: Dict mapping research phases to descriptions
+    Latin, digit and other word runs are single tokens; CJK runs, which have
+    no spaces between words, become overlapping character bigrams
+    ("数字化" -> "数字", "字化"), or one token if only one character long.
     """
-    backend = MemoryBackend()
-    backend.ensure_memory_directory()
-
-    timestamp = backend._get_timestamp()
-    date_header = f"## {timestamp[:10]} {timestamp[11:16]}"
-
-    # Update devlog.md
-    devlog_path = backend.memory_dir / "devlog.md"
-
-    # Ensure devlog.md exists and has proper format
-    if not devlog_path.exists():
-        with open(devlog_path, 'w', encoding=backend.encoding) as f:
-            f.write("# Development Log\n\n")
+    tokens = []
+    for run in WORD_RUN_PATTERN.finditer(text.lower()):
+        word = run.group()
+        if run.lastgroup == "cjk" and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
 
-    # Read existing content to check ending
-    with open(devlog_path, 'r', encoding=backend.encoding) as f:
-        existing_content = f.read()
 
-    # Create session entry with proper separation
-    session_entry = f"{date_header}\n\n"
-    session_entry += f"**Session Goal**: {payload.get('session_goal', 'Not specified')}\n\n"
-    session_entry += f"**Changes Summary**: {payload.get('changes_summary', 'No changes recorded')}\n\n"
+def _query_keywords(query: str) -> List[str]:
+    """Tokenize a query, keeping the first occurrence of each token."""
+    return list(dict.fromkeys(_tokenize(query)))
 
-    # Add research phase sections
-    phases = payload.get('phases', {})
-    for phase in backend.config["logging"]["phase_sections"]:
-        if phase in phases and phases[phase]:
-            session_entry += f"### {phase.upper()}\n{phases[phase]}\n\n"
 
-    session_entry += "---\n\n"
+def _is_cjk_ngram(keyword: str) -> bool:
+    """
+    Whether a keyword is a CJK bigram. Every bigram of the indexed CJK text
+    is itself a token, so such keywords are looked up exactly instead of
+    being compared against the whole vocabulary.
+    """
+    return CJK_NGRAM_PATTERN.fullmatch(keyword) is not None
 
-    # Ensure proper separation from existing content
-    if existing_content and not existing_content.endswith('\n\n'):
-        # Add separation if needed
-        with open(devlog_path, 'a', encoding=backend.encoding) as f:
-            f.write('\n' + session_entry)
-    else:
-        # Append normally
-        with open(devlog_path, 'a', encoding=backend.encoding) as f:
-            f.write(session_entry)
 
-    # Update experiments.csv
-    experiments = payload.get('experiments', [])
-    if experiments:
-        experiments_path = backend.memory_dir / "experiments.csv"
-
-        with open(experiments_path, 'a', newline='', encoding=backend.encoding) as csvfile:
-            writer = csv.writer(csvfile, delimiter=backend.csv_delimiter)
-
-            for exp in experiments:
-                row = [
-                    timestamp,
-                    backend._generate_experiment_id(),
-                    exp.get('hypothesis', ''),
-                    exp.get('dataset', ''),
-                    exp.get('model', ''),
-                    exp.get('spec', ''),
-                    json.dumps(exp.get('metrics', {})),
-                    exp.get('notes', ''),
-                    ','.join(phases.keys()) if phases else ''
-                ]
-                writer.writerow(row)
-
-    # Update decisions.md
-    decisions = payload.get('decisions', [])
-    if decisions:
-        decisions_path = backend.memory_dir / "decisions.md"
+class KeywordMatcher:
+    """
+    Keyword matching of the linear scans, compiled once per query.
+
+    A scanned line or row's relevance is the number of distinct keywords
+    it contains as substrings (of its lowercased text). line_hits() finds
+    them in a whole lowercased document: each keyword is located with
+    str.find, jumping to the next line after a hit, so Python-level work is
+    proportional to the matching lines, not to all lines. count() checks a
+    single line of a stream; one search for the alternation of all
+    keywords rejects the typical line that contains none.
+    """
 
-        with open(decisions_path, 'a', encoding=backend.encoding) as f:
-            for decision in decisions:
-                decision_entry = f"""## {timestamp}
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(map(re.escape, ordered))) if ordered else None
 
-**Decision**: {decision.get('decision', '')}
+    def count(self, text_lower: str) -> int:
+        """Number of keywords in one lowercased line or row."""
+        if self.pattern is None or self.pattern.search(text_lower) is None:
+            return 0
+        return sum(1 for kw in self.keywords if kw in text_lower)
 
-**Rationale**: {decision.get('rationale', '')}
+    def byte_pattern(self, encoding: str) -> Optional['re.Pattern']:
+        """
+        A bytes pattern matching wherever a keyword may occur in file data,
+        for searching memory-mapped files without decoding them (see
+        _search_mapped_lines()).
 
-**Alternatives Considered**: {', '.join(decision.get('alternatives_considered', []))}
+        Every line containing a keyword once lowercased has a match: each
+        keyword character also matches the characters lowercasing to it
+        ("É" for "é", the Kelvin sign for "k"). Matches are candidates only,
+        confirmed with count() on the decoded line.
 
----
+        Returns:
+            The pattern, or None for encodings other than UTF-8 and keywords
+            it cannot express (see _lowercase_sources())
+        """
+        if not self.keywords or codecs.lookup(encoding).name != 'utf-8':
+            return None
+
+        sources, trailing = _lowercase_sources()
+        alternatives = []
+        for keyword in self.keywords:
+            if any(char in trailing for char in keyword):
+                return None
+            parts = []
+            for char in keyword:
+                # IGNORECASE covers ASCII; other sources are spelled out
+                variants = [re.escape(char.encode(encoding))]
+                variants.extend(re.escape(source.encode(encoding)) for source in sources.get(char, ())
+                                if not source.isascii())
+                parts.append(variants[0] if len(variants) == 1 else b'(?:' + b'|'.join(variants) + b')')
+            alternatives.append(b''.join(parts))
+        return re.compile(b'|'.join(alternatives), re.IGNORECASE)
+
+    def line_hits(self, document: Dict[str, Any]) -> Dict[int, int]:
+        """
+        Count the keywords in every unit of a lowered document (see
+        _lowered_document()).
 
-"""
-                f.write(decision_entry)
+        Returns:
+            Mapping of unit index to the number of keywords it contains, for
+            units containing at least one
+        """
+        text = document["text"]
+        starts = document["starts"]
+        last = len(starts) - 2
+        hits: Dict[int, int] = {}
 
-    # Update todos.md with unified TODO management
-    todos = payload.get('todos', [])
-    if todos:
-        # Handle both old format (list of strings) and new format (list of dicts)
-        if todos and isinstance(todos[0], str):
-            # Convert old format to new unified format
-            unified_todos = [{"text": todo, "status": "pending"} for todo in todos]
-        else:
-            # Already in new format
-            unified_todos = todos
+        for kw in self.keywords:
+            position = text.find(kw)
+            while position >= 0:
+                unit = bisect_right(starts, position) - 1
+                hits[unit] = hits.get(unit, 0) + 1
+                position = text.find(kw, starts[unit + 1]) if unit < last else -1
 
-        # Process todos and update file
-        new_todos, completed_todos = backend._process_todos(unified_todos)
-        backend._update_todos_file(new_todos, completed_todos, timestamp)
+        return hits
 
 
-def query_history(query: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+@lru_cache(maxsize=None)
+def _lowercase_sources() -> tuple:
     """
-    Query research history for relevant information.
+    Invert str.lower() over all of Unicode.
 
-    Args:
-        query: Search query string
-        filters: Optional filters (date_range, phase, content_type, limit)
+    Returns:
+        ({character: characters whose lowercase contains it}, characters
+        that only occur after the first position of a multi-character
+        lowercase, e.g. the combining dot of "İ".lower(); a keyword
+        containing one has no byte pattern)
+    """
+    sources: Dict[str, List[str]] = {}
+    trailing = set()
+    for code in range(sys.maxunicode + 1):
+        char = chr(code)
+        lower = char.lower()
+        if lower != char and not 0xD800 <= code <= 0xDFFF:
+            for position, target in enumerate(lower):
+                sources.setdefault(target, []).append(char)
+                if position > 0:
+                    trailing.add(target)
+    return sources, frozenset(trailing)
+
+
+def _lowered_document(units: List[str]) -> Dict[str, Any]:
+    """
+    Lowercase lines (or row texts) into one string for KeywordMatcher.line_hits().
 
     Returns:
-        Dictionary containing search results and summaries
+        {"text": the units lowercased and joined, "starts": offset of every
+        unit in text, followed by len(text)}
     """
-    backend = MemoryBackend()
-    backend.ensure_memory_directory()
+    lowered = [unit.lower() for unit in units]
+    starts = [0]
+    starts.extend(accumulate(len(unit) for unit in lowered))
+    return {"text": ''.join(lowered), "starts": starts}
 
-    # Apply filters or use defaults
-    if filters is None:
-        filters = {}
 
-    max_results = filters.get('limit', backend.config["search"]["max_results"])
-    include_context = backend.config["search"]["include_context"]
-    context_lines = backend.config["search"]["context_lines"]
+def _row_text(row: Dict[str, Any]) -> str:
+    """The text of an experiments.csv row that keywords are matched against."""
+    return ' '.join(str(value) for value in row.values())
 
-    # Parse date filters
-    from_date = filters.get('from_date')
-    to_date = filters.get('to_date')
-    phase_filter = filters.get('phase')
-    type_filter = filters.get('type')
 
-    # Simple keyword-based search (v0 implementation)
-    keywords = re.findall(r'\w+', query.lower())
+def _file_fingerprint(file_path: Path) -> Optional[List[int]]:
+    """Return [size, mtime_ns] for a file, or None if it does not exist."""
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
 
-    results = {
-        "query": query,
-        "matches": [],
-        "summary": "",
-        "timestamp": backend._get_timestamp()
-    }
 
-    # Search based on type filter
-    if not type_filter or type_filter == "devlog":
-        devlog_path = backend.memory_dir / "devlog.md"
-        if devlog_path.exists():
-            matches = _search_in_file(devlog_path, keywords, "devlog", include_context, context_lines, backend.encoding)
-            # Apply date and phase filters to devlog results
-            filtered_matches = _apply_filters_to_matches(matches, from_date, to_date, phase_filter)
-            results["matches"].extend(filtered_matches)
-
-    if not type_filter or type_filter == "decisions":
-        decisions_path = backend.memory_dir / "decisions.md"
-        if decisions_path.exists():
-            matches = _search_in_file(decisions_path, keywords, "decisions", include_context, context_lines, backend.encoding)
-            filtered_matches = _apply_filters_to_matches(matches, from_date, to_date, phase_filter)
-            results["matches"].extend(filtered_matches)
-
-    if not type_filter or type_filter == "experiments":
-        experiments_path = backend.memory_dir / "experiments.csv"
-        if experiments_path.exists():
-            matches = _search_in_csv(experiments_path, keywords, "experiments", backend.encoding, backend.csv_delimiter)
-            filtered_matches = _apply_filters_to_matches(matches, from_date, to_date, phase_filter)
-            results["matches"].extend(filtered_matches)
-
-    # Sort by relevance (simplified - count keyword matches)
-    results["matches"].sort(key=lambda x: x.get("relevance", 0), reverse=True)
-    results["matches"] = results["matches"][:max_results]
-
-    # Generate summary
-    if results["matches"]:
-        results["summary"] = f"Found {len(results['matches'])} relevant entries for '{query}'"
-    else:
-        results["summary"] = f"No entries found matching '{query}'"
+def _iter_byte_lines(data: bytes, base_offset: int, encoding: str):
+    """Yield (byte_offset, decoded_line) for every line in a chunk of file data."""
+    position = base_offset
+    for raw_line in data.splitlines(keepends=True):
+        yield position, raw_line.decode(encoding, errors='replace')
+        position += len(raw_line)
 
-    return results
 
+@contextmanager
+def _mapped_file(file_path: Path):
+    """Map a file read-only (b'' if it is empty, which mmap cannot map)."""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
 
-def _search_in_file(file_path: Path, keywords: List[str], source_type: str,
-                   include_context: bool, context_lines: int, encoding: str = 'utf-8') -> List[Dict[str, Any]]:
-    """Search for keywords in a text file."""
-    matches = []
 
+def _maps_file(backend: MemoryBackend, file_path: Path) -> bool:
+    """
+    Whether a memory file is at least cache.mmap_bytes large: such files are
+    searched in place and streamed instead of being parsed whole into the
+    parsed-file cache.
+    """
+    threshold = backend.config["cache"].get("mmap_bytes")
     try:
-        with open(file_path, 'r', encoding=encoding) as f:
-            lines = f.readlines()
-
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
-            keyword_matches = sum(1 for kw in keywords if kw in line_lower)
-
-            if keyword_matches > 0:
-                match = {
-                    "source": source_type,
-                    "line_number": i + 1,
-                    "relevance": keyword_matches,
-                    "content": line.strip()
-                }
+        return threshold is not None and file_path.stat().st_size >= threshold
+    except OSError:
+        return False
 
-                if include_context:
-                    start = max(0, i - context_lines)
-                    end = min(len(lines), i + context_lines + 1)
-                    context = ''.join(lines[start:end]).strip()
-                    match["context"] = context
 
-                matches.append(match)
+def _decode_span(data, start: int, end: int, encoding: str) -> str:
+    """Decode data[start:end] with newlines translated as in text mode."""
+    return data[start:end].decode(encoding).replace('\r\n', '\n').replace('\r', '\n')
 
-    except Exception as e:
-        print(f"Warning: Could not search {file_path}: {e}")
 
-    return matches
+def _count_newlines(data, start: int, end: int) -> int:
+    """Count the newlines in data[start:end] a slice at a time."""
+    if end - start <= MAPPED_COUNT_CHUNK_SIZE:
+        return data[start:end].count(b'\n')
+    return sum(data[offset:min(end, offset + MAPPED_COUNT_CHUNK_SIZE)].count(b'\n')
+               for offset in range(start, end, MAPPED_COUNT_CHUNK_SIZE))
 
 
-def _search_in_csv(file_path: Path, keywords: List[str], source_type: str,
-                   encoding: str = 'utf-8', csv_delimiter: str = ',') -> List[Dict[str, Any]]:
-    """Search for keywords in a CSV file."""
-    matches = []
+def _parse_text(backend: MemoryBackend, file_path: Path) -> str:
+    """Read the whole file as text."""
+    with open(file_path, 'r', encoding=backend.encoding) as f:
+        PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+        return f.read()
 
-    try:
-        with open(file_path, 'r', encoding=encoding) as f:
-            reader = csv.DictReader(f, delimiter=csv_delimiter)
 
-            for i, row in enumerate(reader):
-                # Search all fields for keywords
-                row_text = ' '.join(str(value) for value in row.values()).lower()
-                keyword_matches = sum(1 for kw in keywords if kw in row_text)
+def _parse_lines(backend: MemoryBackend, file_path: Path) -> List[str]:
+    """Read the file as a list of lines, line endings included."""
+    with open(file_path, 'r', encoding=backend.encoding) as f:
+        PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+        return f.readlines()
 
-                if keyword_matches > 0:
-                    match = {
-                        "source": source_type,
-                        "row_number": i + 2,  # +2 because CSV reader is 0-indexed and header is row 1
-                        "relevance": keyword_matches,
-                        "content": f"Experiment: {row.get('experiment_id', 'N/A')} - {row.get('hypothesis', 'N/A')}"
-                    }
 
-                    # Add relevant fields as context
-                    relevant_fields = ['timestamp', 'hypothesis', 'dataset', 'model', 'metrics', 'notes']
-                    context = {field: row.get(field, '') for field in relevant_fields if row.get(field)}
-                    match["context"] = context
+def _parse_csv_rows(backend: MemoryBackend, file_path: Path) -> List[Dict[str, Any]]:
+    """Read a CSV file as one dict per row, keyed by the header."""
+    with open(file_path, 'r', encoding=backend.encoding) as f:
+        PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+        return list(csv.DictReader(f, delimiter=backend.csv_delimiter))
 
-                    matches.append(match)
 
-    except Exception as e:
-        print(f"Warning: Could not search {file_path}: {e}")
+def _parse_lowered_lines(backend: MemoryBackend, file_path: Path) -> Dict[str, Any]:
+    """Lowercase the cached lines of the file for keyword matching."""
+    return _lowered_document(backend.parsed_cache.get(file_path, "lines"))
 
-    return matches
 
+def _parse_lowered_rows(backend: MemoryBackend, file_path: Path) -> Dict[str, Any]:
+    """
+    Lowercase the cached CSV rows for keyword matching, one line per row so
+    no keyword spans two of them.
+    """
+    return _lowered_document([_row_text(row) + '\n' for row in backend.parsed_cache.get(file_path, "csv_rows")])
 
-# CLI interface
-def main():
-    """Command-line interface for the research memory skill."""
-    parser = argparse.ArgumentParser(description='Research Memory Skill CLI')
-    subparsers = parser.add_subparsers(dest='command', help='Available commands')
 
-    # Bootstrap command
-    subparsers.add_parser('bootstrap', help='Bootstrap project context')
+def _parse_todo_lines(backend: MemoryBackend, file_path: Path) -> List[str]:
+    """Extract the TODO item lines of todos.md."""
+    return _todo_lines(_parse_text(backend, file_path))
 
-    # Log session command
-    log_parser = subparsers.add_parser('log-session', help='Log a research session')
-    log_parser.add_argument('--payload-json', required=True, help='JSON payload for session logging')
 
-    # Query command
-    query_parser = subparsers.add_parser('query', help='Query research history')
-    query_parser.add_argument('--question', required=True, help='Search query')
-    query_parser.add_argument('--from-date', help='Filter from date (YYYY-MM-DD)')
-    query_parser.add_argument('--to-date', help='Filter to date (YYYY-MM-DD)')
-    query_parser.add_argument('--phase', choices=RESEARCH_PHASES, help='Filter by research phase')
-    query_parser.add_argument('--type', choices=['devlog', 'decisions', 'experiments'], help='Filter by content type')
-    query_parser.add_argument('--limit', type=int, help='Maximum number of results')
+def _parse_recent_sessions(backend: MemoryBackend, file_path: Path, count: int) -> List[str]:
+    """
+    Return the last `count` session blocks of the devlog, reading from the
+    first of them instead of parsing the whole file.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(_devlog_tail_offset(backend, count))
+        data = f.read()
+    PROFILER.add_bytes(len(data))
+    content = data.decode(backend.encoding).replace('\r\n', '\n')
+
+    # Extract recent entries (simplified - looks for date headers)
+    return RECENT_SESSION_PATTERN.findall(content)
+
+
+# Parsers available to ParsedMemoryCache.get()
+MEMORY_PARSERS = {
+    "text": _parse_text,
+    "lines": _parse_lines,
+    "csv_rows": _parse_csv_rows,
+    "lowered_lines": _parse_lowered_lines,
+    "lowered_rows": _parse_lowered_rows,
+    "todo_lines": _parse_todo_lines,
+    "recent_sessions": _parse_recent_sessions
+}
 
-    args = parser.parse_args()
+# Parsers whose results are written to the persistent snapshot; they must be
+# JSON-serialisable. Whole files and their lowercased copies are cheaper to
+# read again than to load from JSON, so those stay in memory only.
+PERSISTED_PARSERS = {"csv_rows", "todo_lines", "recent_sessions"}
 
-    if args.command == 'bootstrap':
-        result = bootstrap_context()
-        print(json.dumps(result, indent=2, ensure_ascii=False))
 
-    elif args.command == 'log-session':
-        try:
-            payload = json.loads(args.payload_json)
-            log_session(payload)
-            print("Session logged successfully")
-        except json.JSONDecodeError as e:
-            print(f"Error: Invalid JSON payload - {e}")
-            sys.exit(1)
+class ParsedMemoryCache:
+    """
+    LRU cache of parsed memory files (recent session blocks, TODO lines,
+    CSV rows, ...).
+
+    Entries are keyed by file, parser and parser arguments and hold the
+    size/mtime fingerprint of the file they were parsed from; a changed
+    fingerprint means the file is parsed again. One cache is shared by all
+    backends on the same memory directory, so a long-lived process (e.g. the
+    daemon) parses each file once; only the PARSED_CACHE_MAX_DIRECTORIES most
+    recently used directories keep theirs. With cache.persistent, the
+    PERSISTED_PARSERS entries are also written to
+    memory/.cache/parsed-memory.json so the next CLI invocation starts warm.
+    """
 
-    elif args.command == 'query':
-        # Build filters from arguments
-        filters = {}
-        if hasattr(args, 'from_date') and args.from_date:
-            filters['from_date'] = args.from_date
-        if hasattr(args, 'to_date') and args.to_date:
-            filters['to_date'] = args.to_date
-        if hasattr(args, 'phase') and args.phase:
-            filters['phase'] = args.phase
-        if hasattr(args, 'type') and args.type:
-            filters['type'] = args.type
-        if hasattr(args, 'limit') and args.limit:
-            filters['limit'] = args.limit
-
-        result = query_history(args.question, filters)
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+    _instances: 'OrderedDict[str, ParsedMemoryCache]' = OrderedDict()
+    _instances_mutex = threading.Lock()
+
+    def __init__(self, backend: MemoryBackend):
+        settings = backend.config.get("cache", {})
+        self.backend = backend
+        self.enabled = settings.get("parsed_memory", True)
+        self.persistent = settings.get("persistent", True)
+        self.max_entries = settings.get("max_entries", 32)
+        self.path = backend.memory_dir / CACHE_DIRNAME / PARSED_CACHE_FILENAME
+        self.entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.dirty = False
+        self._loaded = False
+        # Guards the entries; files are parsed outside it, so threads parse concurrently
+        self._mutex = threading.Lock()
+
+    @classmethod
+    def for_backend(cls, backend: MemoryBackend) -> 'ParsedMemoryCache':
+        """Return the cache shared by backends on this memory directory."""
+        key = str(backend.memory_dir.resolve())
+        with cls._instances_mutex:
+            cache = cls._instances.get(key)
+            if cache is None or cache.backend.config != backend.config:
+                cache = cls._instances[key] = cls(backend)
+            cls._instances.move_to_end(key)
+            while len(cls._instances) > PARSED_CACHE_MAX_DIRECTORIES:
+                _, evicted = cls._instances.popitem(last=False)
+                evicted.save()
+        return cache
+
+    def get(self, file_path: Path, parser: str, *args) -> Any:
+        """
+        Return `file_path` parsed with one of MEMORY_PARSERS, from the cache if
+        the file is unchanged.
 
-    else:
-        parser.print_help()
-        sys.exit(1)
+        The caller must check that the file exists.
+        """
+        parse = MEMORY_PARSERS[parser]
+        if not self.enabled:
+            with PROFILER.stage("parse_memory"):
+                return parse(self.backend, file_path, *args)
+
+        key = json.dumps([file_path.name, parser, list(args)], ensure_ascii=False)
+        fingerprint = _file_fingerprint(file_path)
+
+        with self._mutex:
+            self._load()
+            cached = self.entries.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self.entries.move_to_end(key)
+                return cached[1]
+
+        with PROFILER.stage("parse_memory"):
+            value = parse(self.backend, file_path, *args)
+        # Stat again so a file changing while it was parsed is not cached as fresh
+        if _file_fingerprint(file_path) == fingerprint:
+            with self._mutex:
+                self.entries[key] = (fingerprint, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                if parser in PERSISTED_PARSERS:
+                    self.dirty = True
+        return value
+
+    def _load(self) -> None:
+        """Load the persistent snapshot once. Caller must hold _mutex."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.persistent:
+            return
 
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") == PARSED_CACHE_VERSION:
+                for key, fingerprint, value in snapshot["entries"][-self.max_entries:]:
+                    if json.loads(key)[1] in PERSISTED_PARSERS:
+                        self.entries[key] = (fingerprint, value)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+
+    def save(self) -> None:
+        """Write the snapshot if entries changed since it was loaded."""
+        if not (self.enabled and self.persistent and self.dirty):
+            return
+
+        with self._mutex:
+            snapshot = {
+                "version": PARSED_CACHE_VERSION,
+                "entries": [[key, fingerprint, value] for key, (fingerprint, value) in self.entries.items()
+                            if json.loads(key)[1] in PERSISTED_PARSERS]
+            }
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                _write_file_atomic(self.path, json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')), 'utf-8')
+                self.dirty = False
+            except OSError as e:
+                print(f"Warning: Could not save parsed memory cache: {e}")
 
-def _apply_filters_to_matches(matches: List[Dict[str, Any]], from_date: Optional[str],
-                             to_date: Optional[str], phase_filter: Optional[str]) -> List[Dict[str, Any]]:
-    """
-    Apply date and phase filters to search matches.
 
-    Args:
-        matches: List of search matches
-        from_date: Filter start date (YYYY-MM-DD format)
-        to_date: Filter end date (YYYY-MM-DD format)
-        phase_filter: Filter by research phase
+def _todo_lines(content: str) -> List[str]:
+    """Extract TODO items (lines with - [ ] or - [x]) from todos.md content."""
+    todo_lines = []
+    for line in content.split('\n'):
+        if TODO_LINE_PATTERN.match(line):
+            todo_lines.append(line.strip())
+    return todo_lines
 
-    Returns:
-        Filtered list of matches
+
+class SearchIndex:
+    """
+    On-disk inverted index over the searchable memory files.
+
+    Maps every token to the lines (devlog/decisions) or rows (experiments)
+    that contain it and keeps the byte offset of each unit, so query_history()
+    can seek straight to the candidates instead of rescanning whole files.
+    Postings carry term frequencies and every unit its token count, which
+    are the statistics BM25 ranking needs. Markdown files also record their
+    "## " section headers as blocks of lines, so whole entries can be
+    searched without re-parsing the file; CSV rows record their date and
+    research phases. Both let date/phase filters be resolved per section or
+    row before any match is built.
+    Each file entry carries a size/mtime fingerprint; an entry whose
+    fingerprint no longer matches the file on disk is stale and ignored.
+
+    The index is a SQLite database. Loading it reads only the file entries;
+    the postings of a term, unit offsets and the other per-unit data are
+    queried when a search needs them (see _StoredEntry). refresh() indexes
+    what changed and save() writes just that: appended units and their
+    postings are inserted, so logging a session does not rewrite the index.
     """
-    filtered_matches = []
 
-    for match in matches:
-        # Extract date from match
-        match_date = None
-
-        if 'timestamp' in match:
-            # For experiments.csv matches
-            match_date = match['timestamp'][:10]
-        elif 'context' in match:
-            # For devlog/decisions matches, try to extract date from context
-            context = match['context'] if isinstance(match['context'], str) else str(match['context'])
-            # Look for date patterns like "## 2025-11-27" or "2025-11-27T"
-            date_match = re.search(r'##\s*(\d{4}-\d{2}-\d{2})|(\d{4}-\d{2}-\d{2})T', context)
-            if date_match:
-                match_date = date_match.group(1) or date_match.group(2)
-
-        # Apply date filter
-        if from_date and match_date:
-            if match_date < from_date:
-                continue
+    def __init__(self, backend: MemoryBackend):
+        self.backend = backend
+        self.path = backend.memory_dir / CACHE_DIRNAME / SEARCH_INDEX_FILENAME
+        self.files: Dict[str, Any] = {}
+        # In-memory entries for text still waiting in the journal (never saved)
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        # Entries indexed by refresh() and not saved yet, with the fingerprint
+        # of the stored entry they extend (None for a rebuild); None deletes
+        self._changes: Dict[str, Optional[tuple]] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        # Guards the connection, which lazy entries share across threads
+        self._mutex = threading.Lock()
+
+    @_profiled("load_search_index")
+    def load(self) -> bool:
+        """Open the index and read its file entries. Returns False if missing, unreadable or outdated."""
+        if not self.path.exists():
+            return False
 
-        if to_date and match_date:
-            if match_date > to_date:
-                continue
+        try:
+            connection = sqlite3.connect(self.path, timeout=DAEMON_TIMEOUT_SECONDS, check_same_thread=False)
+            if connection.execute('PRAGMA user_version').fetchone()[0] != SEARCH_INDEX_VERSION:
+                connection.close()
+                return False
+            self._connection = connection
+            self._load_files()
+        except sqlite3.Error:
+            self._connection = None
+            return False
+        return True
+
+    def _load_files(self) -> None:
+        """Replace the file entries with lazy views of the stored ones."""
+        self.files = {
+            filename: _StoredEntry(self, filename, json.loads(fingerprint),
+                                   json.loads(header) if header is not None else None, units, total_length)
+            for filename, fingerprint, header, units, total_length in self.query(
+                'SELECT filename, fingerprint, header, units, total_length FROM files')
+        }
 
-        # Apply phase filter
-        if phase_filter:
-            content = match.get('content', '')
-            context = match.get('context', '')
-            if not isinstance(context, str):
-                context = str(context)
-            content += context
-            if phase_filter.lower() not in content.lower():
-                continue
+    def query(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        """Run a read-only statement on the index database."""
+        with self._mutex:
+            return self._connection.execute(sql, parameters).fetchall()
 
-        filtered_matches.append(match)
+    def save(self) -> None:
+        """
+        Write the entries refresh() changed, in one transaction.
+
+        A new database is built in a private file and swapped in atomically.
+        An extension whose stored entry changed meanwhile (another process
+        saved first) is dropped; the entry is refreshed again when next used.
+        """
+        tmp_path = None
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = _temporary_path(self.path)
+            if tmp_path.exists():
+                tmp_path.unlink()
+            connection = sqlite3.connect(tmp_path, check_same_thread=False)
+            connection.executescript(SEARCH_INDEX_SCHEMA)
+            connection.execute(f'PRAGMA user_version = {SEARCH_INDEX_VERSION}')
+        else:
+            connection = self._connection
+
+        try:
+            with self._mutex, connection:
+                for filename, change in self._changes.items():
+                    if change is None:
+                        self._delete_entry(connection, filename)
+                    else:
+                        self._write_entry(connection, filename, *change)
+        finally:
+            if tmp_path is not None:
+                connection.close()
+        self._changes.clear()
+
+        if tmp_path is not None:
+            os.replace(tmp_path, self.path)
+            self._connection = sqlite3.connect(self.path, timeout=DAEMON_TIMEOUT_SECONDS,
+                                               check_same_thread=False)
+        self._load_files()
+        self.backend._remember_search_index(self)
+
+    def _delete_entry(self, connection: sqlite3.Connection, filename: str) -> None:
+        """Remove everything stored for a file."""
+        connection.execute('DELETE FROM postings WHERE term_ref IN (SELECT id FROM terms WHERE filename = ?)',
+                           (filename,))
+        for table in ("terms", "units", "blocks", "files"):
+            connection.execute(f'DELETE FROM {table} WHERE filename = ?', (filename,))
+
+    def _write_entry(self, connection: sqlite3.Connection, filename: str, entry: Dict[str, Any],
+                     base: Optional[List[int]]) -> None:
+        """Store an entry built by refresh(): a whole file, or the units appended to it since `base`."""
+        first_unit = entry.get("first_unit", 0)
+        header = json.dumps(entry["header"], ensure_ascii=False) if entry.get("header") is not None else None
+        row = (json.dumps(entry["fingerprint"]), header, first_unit + len(entry["offsets"]), entry["total_length"])
+
+        if base is not None:
+            updated = connection.execute(
+                'UPDATE files SET fingerprint = ?, header = ?, units = ?, total_length = ? '
+                'WHERE filename = ? AND fingerprint = ?', row + (filename, json.dumps(base)))
+            if updated.rowcount != 1:
+                return
+        else:
+            self._delete_entry(connection, filename)
+            connection.execute('INSERT INTO files VALUES (?, ?, ?, ?, ?)', (filename,) + row)
+
+        dates = entry.get("dates") or [None] * len(entry["offsets"])
+        phases = entry.get("phases") or [None] * len(entry["offsets"])
+        connection.executemany('INSERT INTO units VALUES (?, ?, ?, ?, ?, ?)', (
+            (filename, first_unit + i, start, length, date, phase)
+            for i, (start, length, date, phase) in enumerate(zip(entry["offsets"], entry["lengths"], dates, phases))))
+
+        # The first block of an extension is the stored last block, grown
+        first_block = entry.get("first_block", 0)
+        connection.executemany('INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?)', (
+            (filename, first_block + i, first, timestamp, length)
+            for i, (first, timestamp, length) in enumerate(entry.get("blocks") or [])))
+
+        postings = entry["postings"]
+        connection.executemany('INSERT OR IGNORE INTO terms (filename, term) VALUES (?, ?)',
+                               ((filename, term) for term in postings))
+        term_ids = {}
+        terms = list(postings)
+        for i in range(0, len(terms), SEARCH_INDEX_BATCH_SIZE):
+            batch = terms[i:i + SEARCH_INDEX_BATCH_SIZE]
+            term_ids.update(connection.execute(
+                f'SELECT term, id FROM terms WHERE filename = ? AND term IN ({", ".join("?" * len(batch))})',
+                [filename] + batch).fetchall())
+        connection.executemany('INSERT INTO postings VALUES (?, ?)', (
+            (term_ids[term], array(POSTINGS_TYPECODE, chain.from_iterable(term_postings)).tobytes())
+            for term, term_postings in postings.items()))
+
+    def entry(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Return the index entry for a file if it is fresh, otherwise None."""
+        entry = self.files.get(filename)
+        if entry is None:
+            return None
+        if entry["fingerprint"] != _file_fingerprint(self.backend.memory_dir / filename):
+            return None
+        return entry
+
+    def refresh(self, previous_fingerprints: Optional[Dict[str, Optional[List[int]]]] = None) -> bool:
+        """
+        Index every file whose entry is out of date; save() stores the result.
+
+        Args:
+            previous_fingerprints: Fingerprints taken before the caller appended
+                to the memory files. Entries matching them are extended with the
+                appended bytes only; anything else is rebuilt from scratch.
+
+        Returns:
+            True if any entry changed, i.e. the index needs saving
+        """
+        previous_fingerprints = previous_fingerprints or {}
+
+        for filename in SEARCH_SOURCES.values():
+            file_path = self.backend.memory_dir / filename
+            current = _file_fingerprint(file_path)
+
+            entry = self.files.get(filename)
+            if current is None:
+                if entry is not None:
+                    self._changes[filename] = None
+                continue
+
+            if entry is not None and entry["fingerprint"] == current:
+                continue
+
+            previous = previous_fingerprints.get(filename)
+            if (entry is not None and previous is not None
+                    and entry["fingerprint"] == previous
+                    and current[0] >= previous[0]
+                    and self._ends_with_newline(file_path, previous[0])):
+                self._index_file(filename, entry, previous[0])
+            else:
+                self._index_file(filename, None, 0)
+
+        return bool(self._changes)
+
+    def _ends_with_newline(self, file_path: Path, size: int) -> bool:
+        """Check that the first `size` bytes of a file end on a line boundary."""
+        if size == 0:
+            return True
+        with open(file_path, 'rb') as f:
+            f.seek(size - 1)
+            return f.read(1) in (b'\n', b'\r')
+
+    def _index_file(self, filename: str, entry: Optional[Dict[str, Any]], start: int) -> None:
+        """Index a file from byte offset `start`, as an extension of `entry` if given."""
+        file_path = self.backend.memory_dir / filename
+
+        # Stat before reading so a concurrent append leaves the entry stale
+        mtime_ns = _file_fingerprint(file_path)[1]
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+
+        extension = None
+        if entry is not None:
+            # Units are numbered on from the stored ones, and the last stored
+            # block keeps collecting the lines appended to it
+            extension = {"offsets": [], "lengths": [], "total_length": entry["total_length"], "postings": {},
+                         "first_unit": len(entry["offsets"])}
+            if "blocks" in entry:
+                blocks = entry["blocks"]
+                extension["blocks"] = [list(blocks[-1])] if blocks else []
+                extension["first_block"] = max(len(blocks) - 1, 0)
+            else:
+                extension["header"] = entry["header"]
+
+        extension = self._index_data(filename, extension, data, start)
+        extension["fingerprint"] = [start + len(data), mtime_ns]
+        self._changes[filename] = (extension, entry["fingerprint"] if entry is not None else None)
+
+    def index_pending(self, filename: str, text: str) -> None:
+        """Index text that will be appended to a file but is still in the journal."""
+        data = text.encode(self.backend.encoding)
+        if filename.endswith('.csv'):
+            header = self.files[filename]["header"] if filename in self.files else None
+            if header is None:
+                header = self.backend._get_default_experiments_csv().strip().split(',')
+            entry = {"offsets": [], "lengths": [], "total_length": 0, "postings": {}, "header": header}
+        else:
+            entry = None
+
+        entry = self._index_data(filename, entry, data, 0)
+        entry["data"] = data
+        entry["fingerprint"] = [len(data), None]
+        self.pending[filename] = entry
+
+    def _index_data(self, filename: str, entry: Optional[Dict[str, Any]], data: bytes,
+                    start: int) -> Dict[str, Any]:
+        """Add the units in `data` (file content from byte `start`) to an entry."""
+        encoding = self.backend.encoding
+
+        if entry is None:
+            entry = {"offsets": [], "lengths": [], "total_length": 0, "postings": {}}
+            if not filename.endswith('.csv'):
+                entry["blocks"] = []
+
+        offsets = entry["offsets"]
+        lengths = entry["lengths"]
+        postings = entry["postings"]
+        blocks = entry.get("blocks")
+        first_unit = entry.get("first_unit", 0)
+
+        def add_unit(offset: int, text: str) -> None:
+            unit = first_unit + len(offsets)
+            tokens = _tokenize(text)
+            offsets.append(offset)
+            lengths.append(len(tokens))
+            entry["total_length"] += len(tokens)
+
+            # Blocks are [first line, header timestamp or None, token count]
+            if blocks is not None:
+                header = SECTION_HEADER_PATTERN.match(text)
+                if header:
+                    blocks.append([unit, header.group(1), 0])
+                if blocks:
+                    blocks[-1][2] += len(tokens)
+
+            term_counts: Dict[str, int] = {}
+            for token in tokens:
+                term_counts[token] = term_counts.get(token, 0) + 1
+            for token, count in term_counts.items():
+                postings.setdefault(token, []).append([unit, count])
+
+        if filename.endswith('.csv'):
+            position = [start]
+
+            def line_source():
+                # csv pulls one physical line at a time, so `position` always
+                # points just past the last record handed out
+                for raw_line in data.splitlines(keepends=True):
+                    position[0] += len(raw_line)
+                    yield raw_line.decode(encoding, errors='replace')
+
+            header = entry.get("header")
+            reader = csv.DictReader(line_source(), fieldnames=header,
+                                    delimiter=self.backend.csv_delimiter)
+            # Reading fieldnames consumes the header line on a full build
+            entry["header"] = reader.fieldnames
+            # Per-row date and phases, so filters never need to read rows back
+            dates = entry.setdefault("dates", [])
+            phases = entry.setdefault("phases", [])
+
+            while True:
+                row_start = position[0]
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    break
+                add_unit(row_start, ' '.join(str(value) for value in row.values()))
+                dates.append(_row_date(row))
+                phases.append(row.get('research_phase') or '')
+        else:
+            for offset, line in _iter_byte_lines(data, start, encoding):
+                add_unit(offset, line)
+
+        return entry
+
+    def lookup(self, view: '_IndexView', keywords: List[str]) -> Dict[int, int]:
+        """
+        Find units containing the keywords.
+
+        Keywords match any indexed token they are a substring of, which is
+        equivalent to the substring test of the linear scan. CJK bigrams are
+        looked up directly in the n-gram postings.
+
+        Returns:
+            Mapping of unit number to the number of distinct keywords it contains
+        """
+        hits: Dict[int, int] = {}
+
+        for keyword in set(keywords):
+            units = set()
+            terms = [keyword] if _is_cjk_ngram(keyword) else view.terms_containing(keyword)
+            for token in terms:
+                units.update(unit for unit, _ in view.postings(token))
+            for unit in units:
+                hits[unit] = hits.get(unit, 0) + 1
+
+        return hits
+
+    def read_units(self, filename: str, entry: Dict[str, Any], first: int, last: int) -> str:
+        """Read the raw text of units first..last (inclusive) from disk."""
+        offsets = entry["offsets"]
+        start = offsets[first]
+        end = offsets[last + 1] if last + 1 < len(offsets) else entry["fingerprint"][0]
+
+        if "data" in entry:
+            data = entry["data"][start:end]
+        else:
+            with open(self.backend.memory_dir / filename, 'rb') as f:
+                f.seek(start)
+                data = f.read(end - start)
+            PROFILER.add_bytes(len(data))
+
+        return data.decode(self.backend.encoding, errors='replace').replace('\r\n', '\n')
+
+    def build_match(self, source_type: str, unit: int, relevance: Union[int, float],
+                    include_context: bool, context_lines: int, pending: bool = False) -> Dict[str, Any]:
+        """
+        Read one indexed unit back from disk and turn it into a search match.
+
+        Matches from journaled text are flagged "pending"; their line and row
+        numbers count from the start of the not yet written text.
+        """
+        filename = SEARCH_SOURCES[source_type]
+        entry = self.pending[filename] if pending else self.files[filename]
+
+        if filename.endswith('.csv'):
+            text = self.read_units(filename, entry, unit, unit)
+            reader = csv.DictReader(io.StringIO(text), fieldnames=entry["header"],
+                                    delimiter=self.backend.csv_delimiter)
+            match = _csv_row_match(next(reader), unit + 2, relevance, source_type)
+        else:
+            match = {
+                "source": source_type,
+                "line_number": unit + 1,
+                "relevance": relevance,
+                "content": self.read_units(filename, entry, unit, unit).strip()
+            }
+
+            if include_context:
+                start = max(0, unit - context_lines)
+                end = min(len(entry["offsets"]) - 1, unit + context_lines)
+                match["context"] = self.read_units(filename, entry, start, end).strip()
+
+        if pending:
+            match["pending"] = True
+        return match
+
+    def build_entry_match(self, source_type: str, block: int, relevance: Union[int, float],
+                          include_context: bool, pending: bool = False) -> Dict[str, Any]:
+        """Turn one indexed entry block into a single search match."""
+        filename = SEARCH_SOURCES[source_type]
+        entry = self.pending[filename] if pending else self.files[filename]
+        blocks = entry["blocks"]
+        first = blocks[block][0]
+        last = (blocks[block + 1][0] if block + 1 < len(blocks) else len(entry["offsets"])) - 1
+
+        match = {
+            "source": source_type,
+            "line_number": first + 1,
+            "end_line": last + 1,
+            "timestamp": blocks[block][1],
+            "relevance": relevance,
+            "content": self.read_units(filename, entry, first, first).strip()
+        }
+
+        if include_context:
+            match["context"] = self.read_units(filename, entry, first, last).strip()
+
+        if pending:
+            match["pending"] = True
+        return match
+
+
+class _StoredEntry(Mapping):
+    """
+    A file entry of the SQLite search index, read lazily.
+
+    Behaves like the entry dicts refresh() builds, so searches use both the
+    same way, but only holds what the file row stores; postings, offsets,
+    lengths, blocks and row dates/phases are queried on first use. Rows
+    saved after the entry was loaded (units numbered from `units` on) are
+    left out, so a concurrent save() cannot tear a search.
+    """
+
+    def __init__(self, index: SearchIndex, filename: str, fingerprint: List[int],
+                 header: Optional[List[str]], units: int, total_length: int):
+        self.index = index
+        self.filename = filename
+        self.units = units
+        self._values: Dict[str, Any] = {
+            "fingerprint": fingerprint,
+            "total_length": total_length,
+            "offsets": _StoredOffsets(self),
+            "postings": _StoredPostings(self)
+        }
+        if filename.endswith('.csv'):
+            self._values["header"] = header
+            self._lazy = ("lengths", "dates", "phases")
+        else:
+            self._lazy = ("lengths", "blocks")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values and key in self._lazy:
+            self._load(key)
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._values) + [key for key in self._lazy if key not in self._values])
+
+    def __len__(self) -> int:
+        return len(set(self._values) | set(self._lazy))
+
+    def _load(self, key: str) -> None:
+        """Read one of the per-unit or per-block lists."""
+        if key == "blocks":
+            self._values["blocks"] = [list(row) for row in self.index.query(
+                'SELECT first_unit, timestamp, length FROM blocks WHERE filename = ? AND first_unit < ? '
+                'ORDER BY block', (self.filename, self.units))]
+            return
+
+        rows = self.index.query('SELECT length, date, phases FROM units WHERE filename = ? AND unit < ? '
+                                'ORDER BY unit', (self.filename, self.units))
+        self._values["lengths"] = [row[0] for row in rows]
+        if self.filename.endswith('.csv'):
+            self._values["dates"] = [row[1] for row in rows]
+            self._values["phases"] = [row[2] for row in rows]
+
+
+class _StoredOffsets(Sequence):
+    """Byte offsets of the units of a stored entry, each read when indexed."""
+
+    def __init__(self, entry: _StoredEntry):
+        self.entry = entry
+
+    def __len__(self) -> int:
+        return self.entry.units
+
+    def __getitem__(self, unit: int) -> int:
+        if not 0 <= unit < self.entry.units:
+            raise IndexError(unit)
+        return self.entry.index.query('SELECT start FROM units WHERE filename = ? AND unit = ?',
+                                      (self.entry.filename, unit))[0][0]
+
+
+class _StoredPostings(Mapping):
+    """Postings of a stored entry: the (unit, frequency) pairs of a term are read when looked up."""
+
+    def __init__(self, entry: _StoredEntry):
+        self.entry = entry
+        self._cache: Dict[str, List[tuple]] = {}
+
+    def __getitem__(self, term: str) -> List[tuple]:
+        if term not in self._cache:
+            flat = array(POSTINGS_TYPECODE)
+            for (units,) in self.entry.index.query(
+                    'SELECT postings.units FROM terms JOIN postings ON postings.term_ref = terms.id '
+                    'WHERE terms.filename = ? AND terms.term = ? ORDER BY postings.rowid',
+                    (self.entry.filename, term)):
+                flat.frombytes(units)
+            # Units ascend, as they were appended in file order
+            units = flat[0::2]
+            end = bisect_left(units, self.entry.units)
+            self._cache[term] = list(zip(units[:end], flat[1::2][:end]))
+        if not self._cache[term]:
+            raise KeyError(term)
+        return self._cache[term]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.containing(''))
+
+    def __len__(self) -> int:
+        return self.entry.index.query('SELECT COUNT(*) FROM terms WHERE filename = ?', (self.entry.filename,))[0][0]
+
+    def containing(self, keyword: str) -> List[str]:
+        """Return the indexed terms `keyword` is a substring of, searching in SQLite."""
+        return [term for (term,) in self.entry.index.query(
+            'SELECT term FROM terms WHERE filename = ? AND instr(term, ?) > 0', (self.entry.filename, keyword))]
+
+
+class _IndexView:
+    """
+    An index entry seen as a collection of search units.
+
+    By default units are the indexed lines or rows. With by_entry set, lines of
+    a markdown file are folded into their dated "## " blocks: term frequencies
+    and lengths are summed per block, and lines outside dated blocks drop out.
+    """
+
+    def __init__(self, entry: Dict[str, Any], by_entry: bool = False):
+        self.entry = entry
+        self.blocks = entry.get("blocks") if by_entry else None
+
+        if self.blocks is not None:
+            self.starts = [block[0] for block in self.blocks]
+            self._block_lengths = [block[2] for block in self.blocks]
+
+    @property
+    def lengths(self) -> Sequence:
+        """Token count of every unit (only BM25 needs these)."""
+        return self._block_lengths if self.blocks is not None else self.entry["lengths"]
+
+    def terms_containing(self, keyword: str) -> List[str]:
+        """Return the indexed tokens `keyword` is a substring of."""
+        postings = self.entry["postings"]
+        if isinstance(postings, _StoredPostings):
+            return postings.containing(keyword)
+        return [token for token in postings if keyword in token]
+
+    def has_term(self, term: str) -> bool:
+        return term in self.entry["postings"]
+
+    def postings(self, term: str) -> List[tuple]:
+        """Return (unit, term frequency) pairs for a token."""
+        token_postings = self.entry["postings"].get(term, ())
+        if self.blocks is None:
+            return token_postings
+
+        frequencies: Dict[int, int] = {}
+        for line, frequency in token_postings:
+            block = bisect_right(self.starts, line) - 1
+            if block >= 0 and self.blocks[block][1] is not None:
+                frequencies[block] = frequencies.get(block, 0) + frequency
+        return list(frequencies.items())
+
+
+def _iter_sections(lines) -> Iterator[List[str]]:
+    """
+    Group markdown lines into sections: the lines from one "## " header to
+    the next, and the lines before the first header. Consumes `lines`
+    lazily, so a stream is read one section at a time.
+    """
+    section: List[str] = []
+    for line in lines:
+        if section and SECTION_HEADER_PATTERN.match(line):
+            yield section
+            section = []
+        section.append(line)
+    yield section
+
+
+class _SearchScope:
+    """
+    Date range and research phase a query is restricted to.
+
+    Filters are resolved per section (the lines from one "## " header to the
+    next, or the lines before the first header) and per CSV row before
+    keywords are matched. A section or row without a date passes the date
+    filter. A section passes the phase filter if its text mentions the
+    phase; a row if its research_phase column lists it.
+    """
+
+    def __init__(self, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                 phase: Optional[str] = None):
+        self.from_date = from_date
+        self.to_date = to_date
+        self.phase = phase.lower() if phase else None
+
+    def active(self) -> bool:
+        return bool(self.from_date or self.to_date or self.phase)
+
+    def allows_date(self, date: Optional[str]) -> bool:
+        """Check a YYYY-MM-DD date (or None) against the date range."""
+        if date is None:
+            return True
+        if self.from_date and date < self.from_date:
+            return False
+        if self.to_date and date > self.to_date:
+            return False
+        return True
+
+    @_profiled("apply_filters")
+    def allows_row(self, date: Optional[str], research_phase: str) -> bool:
+        """Check an experiments.csv row by its date and research_phase column."""
+        if not self.allows_date(date):
+            return False
+        if self.phase:
+            return self.phase in (phase.strip().lower() for phase in research_phase.split(','))
+        return True
+
+    @_profiled("apply_filters")
+    def allows_section(self, section: List[str]) -> bool:
+        """Check the lines of one markdown section (see _iter_sections()) by its header date and text."""
+        header = SECTION_HEADER_PATTERN.match(section[0]) if section else None
+        date = header.group(1)[:10] if header and header.group(1) else None
+        return self.allows_date(date) and (not self.phase or self.phase in ''.join(section).lower())
+
+    def allowed_lines(self, lines: List[str]) -> List[bool]:
+        """Decide for every line of a markdown file whether its section is in scope."""
+        allowed = []
+        for section in _iter_sections(lines):
+            allowed.extend([self.allows_section(section)] * len(section))
+        return allowed
+
+    @_profiled("apply_filters")
+    def index_filter(self, entry: Dict[str, Any], by_entry: bool) -> Optional[Any]:
+        """
+        Build a unit predicate for an index entry, or None if nothing is filtered.
+
+        Uses the entry's section blocks (markdown) or row dates and phases
+        (CSV) without reading the file.
+        """
+        if not self.active():
+            return None
+
+        if "dates" in entry:
+            return lambda unit: self.allows_row(entry["dates"][unit], entry["phases"][unit])
+
+        blocks = entry["blocks"]
+        starts = [block[0] for block in blocks]
+
+        # Sections mentioning the phase (-1 is the text before the first header)
+        phase_sections = None
+        if self.phase:
+            phase_sections = set()
+            view = _IndexView(entry)
+            for term in view.terms_containing(self.phase):
+                phase_sections.update(bisect_right(starts, line) - 1 for line, _ in view.postings(term))
+
+        def allows_section(section: int) -> bool:
+            date = blocks[section][1] if section >= 0 else None
+            if not self.allows_date(date[:10] if date else None):
+                return False
+            return phase_sections is None or section in phase_sections
+
+        allowed = {section for section in range(-1, len(blocks)) if allows_section(section)}
+        if by_entry:
+            return allowed.__contains__
+        return lambda line: bisect_right(starts, line) - 1 in allowed
+
+
+def _row_date(row: Dict[str, Any]) -> Optional[str]:
+    """Return the YYYY-MM-DD date of an experiments.csv row, or None."""
+    return (row.get('timestamp') or '')[:10] or None
+
+
+@_profiled("bm25_scores")
+def _bm25_scores(views: Dict[str, _IndexView], keywords: List[str]) -> Dict[str, Dict[int, float]]:
+    """
+    Score indexed units with Okapi BM25.
+
+    Document frequencies and the average unit length are taken over all given
+    index views together, so scores from different files are comparable.
+    A keyword that is an exact token anywhere (always the case for CJK
+    bigrams) is scored as that token only; otherwise it expands to every
+    token containing it (e.g. a single CJK character, or part of a word).
+
+    Args:
+        views: Index views keyed by filename
+        keywords: Lowercase query keywords
+
+    Returns:
+        Mapping of filename to {unit number: score}, containing only matching units
+    """
+    unit_count = sum(len(view.lengths) for view in views.values())
+    total_length = sum(sum(view.lengths) for view in views.values())
+    scores: Dict[str, Dict[int, float]] = {filename: {} for filename in views}
+
+    if unit_count == 0:
+        return scores
+
+    average_length = total_length / unit_count or 1.0
+
+    for keyword in set(keywords):
+        if _is_cjk_ngram(keyword) or any(view.has_term(keyword) for view in views.values()):
+            terms = {keyword}
+        else:
+            terms = {token for view in views.values() for token in view.terms_containing(keyword)}
+
+        for term in terms:
+            term_postings = {filename: view.postings(term) for filename, view in views.items()}
+            document_frequency = sum(len(postings) for postings in term_postings.values())
+            idf = math.log(1 + (unit_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+            for filename, view in views.items():
+                lengths = view.lengths
+                file_scores = scores[filename]
+                for unit, frequency in term_postings[filename]:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[unit] / average_length)
+                    file_scores[unit] = file_scores.get(unit, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+    return scores
+
+
+def _scan_devlog_headers(devlog_path: Path, start: int = 0) -> List[int]:
+    """Return byte offsets of dated session headers at or after `start`."""
+    # Searching from `start` still sees the byte before it, so "^" only matches at line starts
+    with _mapped_file(devlog_path) as data:
+        return [m.start() for m in DEVLOG_HEADER_PATTERN.finditer(data, start)]
+
+
+@_profiled("update_devlog_sections")
+def update_devlog_sections(backend: MemoryBackend, previous_fingerprint: Optional[List[int]] = None) -> None:
+    """
+    Keep the devlog session-header sidecar in step with devlog.md.
+
+    Args:
+        backend: Memory backend owning the devlog
+        previous_fingerprint: Fingerprint of devlog.md before the caller
+            appended to it; if the sidecar matches it, only the appended
+            bytes are scanned
+    """
+    devlog_path = backend.memory_dir / "devlog.md"
+    sections_path = backend.memory_dir / CACHE_DIRNAME / DEVLOG_SECTIONS_FILENAME
+    current = _file_fingerprint(devlog_path)
+    if current is None:
+        return
+
+    sections = _load_devlog_sections(sections_path)
+    if sections is not None and sections["fingerprint"] == current:
+        return
+
+    if (sections is not None and previous_fingerprint is not None
+            and sections["fingerprint"] == previous_fingerprint
+            and current[0] >= previous_fingerprint[0]):
+        headers = sections["headers"] + _scan_devlog_headers(devlog_path, previous_fingerprint[0])
+    else:
+        headers = _scan_devlog_headers(devlog_path)
+
+    sections_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _temporary_path(sections_path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"fingerprint": current, "headers": headers}, f)
+    os.replace(tmp_path, sections_path)
+
+
+def _load_devlog_sections(sections_path: Path) -> Optional[Dict[str, Any]]:
+    """Load the devlog sections sidecar, or None if missing or unreadable."""
+    try:
+        with open(sections_path, 'r', encoding='utf-8') as f:
+            sections = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(sections, dict) or "fingerprint" not in sections or "headers" not in sections:
+        return None
+    return sections
+
+
+def _devlog_tail_offset(backend: MemoryBackend, count: int) -> int:
+    """
+    Find the byte offset where the last `count` devlog sessions begin.
+
+    Uses the sections sidecar when it matches devlog.md; otherwise scans
+    the memory-mapped file backwards from the end in chunks, so the cost
+    depends on the size of the recent entries rather than the whole log.
+    """
+    if count <= 0:
+        return 0
+
+    devlog_path = backend.memory_dir / "devlog.md"
+    sections = _load_devlog_sections(backend.memory_dir / CACHE_DIRNAME / DEVLOG_SECTIONS_FILENAME)
+    if sections is not None and sections["fingerprint"] == _file_fingerprint(devlog_path):
+        headers = sections["headers"]
+        return headers[-count] if len(headers) >= count else 0
+
+    with _mapped_file(devlog_path) as data:
+        end = len(data)
+        while end > 0:
+            position = max(0, end - TAIL_SCAN_CHUNK_SIZE)
+            # Headers starting in [position, end); one may run past `end`
+            headers = [m.start() for m in DEVLOG_HEADER_PATTERN.finditer(data, position, end + 16)
+                       if m.start() < end]
+            if len(headers) >= count:
+                return headers[-count]
+            count -= len(headers)
+            end = position
+
+    return 0
+
+
+def bootstrap_context(config: Optional[Dict[str, Any]] = None,
+                      backend: Optional[MemoryBackend] = None,
+                      max_chars: Optional[int] = None,
+                      max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Bootstrap project context from memory files.
+
+    Args:
+        config: Optional configuration dictionary
+        backend: Already initialised backend to reuse (e.g. held by the daemon)
+        max_chars: Size budget for the context pack in characters (defaults
+            to bootstrap.max_chars; see _fit_bootstrap_budget())
+        max_tokens: Size budget in tokens, estimated as
+            BOOTSTRAP_CHARS_PER_TOKEN characters each (defaults to
+            bootstrap.max_tokens); the smaller of the two budgets applies
+
+    Returns:
+        Dictionary containing project context, recent progress, and
+        suggestions, plus a "budget" report when a budget is set
+    """
+    if backend is None:
+        backend = create_backend()
+        backend.ensure_memory_directory()
+
+    budget = _bootstrap_budget(backend, max_chars, max_tokens)
+    if backend.storage != "files":
+        result = backend.bootstrap_context()
+        return result if budget is None else _fit_bootstrap_budget(result, budget)
+
+    settings = backend.config["bootstrap"]
+    recent_entries_count = settings["recent_entries_count"]
+
+    result = {
+        "project_context": "",
+        "recent_progress": [],
+        "current_todos": [],
+        "todo_summary": {},
+        "recent_experiments": [],
+        "work_plan_suggestions": [],
+        "timestamp": backend._get_timestamp()
+    }
+
+    # Everything below comes from the snapshot; only a stale one reads the files
+    snapshot = load_bootstrap_snapshot(backend)
+    if snapshot is None:
+        snapshot = update_bootstrap_snapshot(backend)
+
+    # Sessions still waiting in the journal count as already written
+    records = _read_journal(backend)
+    if records:
+        snapshot = _advance_bootstrap_snapshot(backend, snapshot, records)
+
+    result["project_context"] = snapshot["project_context"]
+    result["recent_progress"] = snapshot["recent_progress"][-recent_entries_count:] if recent_entries_count > 0 else []
+    result["todo_summary"] = _summarize_todos(snapshot["todos"])
+    result["recent_experiments"] = snapshot["recent_experiments"]
+
+    if settings["include_todos"]:
+        result["current_todos"] = snapshot["todos"]
+
+    # Generate work plan suggestions (basic implementation)
+    if settings["suggest_work_plan"]:
+        result["work_plan_suggestions"] = _suggest_work_plan(result)
+
+    return result if budget is None else _fit_bootstrap_budget(result, budget)
+
+
+def _suggest_work_plan(result: Dict[str, Any]) -> List[str]:
+    """Suggest next steps from the recent progress and TODOs of a bootstrap result."""
+    suggestions = []
+
+    # Analyze recent progress for patterns
+    if result["recent_progress"]:
+        suggestions.append("Review and analyze recent experimental results")
+
+    # Check for open todos
+    incomplete_todos = [todo for todo in result["current_todos"] if "[ ]" in todo]
+    if incomplete_todos:
+        suggestions.append(f"Address {len(incomplete_todos)} open TODO items")
+
+    if not suggestions:
+        suggestions.append("Continue with planned research activities")
+
+    return suggestions
+
+
+def _bootstrap_budget(backend: MemoryBackend, max_chars: Optional[int],
+                      max_tokens: Optional[int]) -> Optional[int]:
+    """Return the bootstrap size budget in characters, or None for no budget."""
+    settings = backend.config["bootstrap"]
+    if max_chars is None:
+        max_chars = settings.get("max_chars")
+    if max_tokens is None:
+        max_tokens = settings.get("max_tokens")
+
+    budgets = [int(max_chars)] if max_chars is not None else []
+    if max_tokens is not None:
+        budgets.append(int(max_tokens) * BOOTSTRAP_CHARS_PER_TOKEN)
+    if not budgets:
+        return None
+    if min(budgets) < 0:
+        raise ValueError("Bootstrap budget must not be negative")
+    return min(budgets)
+
+
+def _collapse_overview(overview: str) -> str:
+    """Reduce project-overview.md to its headings, one per line."""
+    return ''.join(line for line in overview.splitlines(keepends=True)
+                   if MARKDOWN_HEADING_PATTERN.match(line))
+
+
+def _truncate_text(text: str, size: int) -> str:
+    """
+    Cut text to at most `size` characters ending with TRUNCATION_MARKER,
+    at a line boundary where possible; empty if even the marker does not fit.
+    """
+    keep = size - len(TRUNCATION_MARKER)
+    if keep <= 0:
+        return ""
+    cut = text.rfind('\n', 0, keep + 1)
+    return text[:cut if cut > 0 else keep].rstrip('\n') + TRUNCATION_MARKER
+
+
+def _fit_bootstrap_budget(result: Dict[str, Any], max_chars: int) -> Dict[str, Any]:
+    """
+    Shrink a bootstrap result so its project context, recent progress and
+    TODOs together take at most `max_chars` characters.
+
+    Space is granted in order of usefulness to a session start: the overview
+    collapsed to its headings, the newest session (truncated if it does not
+    fit whole), open TODOs, older sessions newest first, completed TODOs,
+    and finally the full overview text. Every item but the first two is kept
+    whole or dropped. Work plan suggestions are made from the full result
+    beforehand; they, the TODO summary and the recent experiments are not
+    counted.
+
+    Returns:
+        The result with a "budget" entry reporting the characters used and
+        what was elided
+    """
+    overview = result["project_context"]
+    sessions = result["recent_progress"]
+    todos = result["current_todos"]
+    open_todos = [i for i, todo in enumerate(todos) if OPEN_TODO_PATTERN.match(todo)]
+    done_todos = sorted(set(range(len(todos))) - set(open_todos))
+    # TODO lines are joined by newlines when rendered, so each costs one more
+    todo_size = [len(todo) + 1 for todo in todos]
+
+    remaining = max_chars
+    outline = _collapse_overview(overview)
+    if len(outline) > remaining:
+        outline = _truncate_text(outline, remaining)
+    remaining -= len(outline)
+
+    kept_sessions: Dict[int, str] = {}
+    if sessions:
+        newest = len(sessions) - 1
+        text = sessions[newest]
+        kept_sessions[newest] = text if len(text) <= remaining else _truncate_text(text, remaining)
+        remaining -= len(kept_sessions[newest])
+        if not kept_sessions[newest]:
+            del kept_sessions[newest]
+
+    kept_todos = set()
+    for i in open_todos:
+        if todo_size[i] <= remaining:
+            kept_todos.add(i)
+            remaining -= todo_size[i]
+
+    for i in range(len(sessions) - 2, -1, -1):
+        if len(sessions[i]) <= remaining:
+            kept_sessions[i] = sessions[i]
+            remaining -= len(sessions[i])
+
+    for i in done_todos:
+        if todo_size[i] <= remaining:
+            kept_todos.add(i)
+            remaining -= todo_size[i]
+
+    context = outline
+    if len(overview) - len(outline) <= remaining:
+        context = overview
+        remaining -= len(overview) - len(outline)
+
+    result["project_context"] = context
+    result["recent_progress"] = [kept_sessions[i] for i in sorted(kept_sessions)]
+    result["current_todos"] = [todos[i] for i in sorted(kept_todos)]
+
+    full_size = len(overview) + sum(map(len, sessions)) + sum(todo_size)
+    used = max_chars - remaining
+    result["budget"] = {
+        "max_chars": max_chars,
+        "used_chars": used,
+        "elided_chars": full_size - used,
+        "overview_collapsed": context != overview,
+        "sessions_elided": len(sessions) - len(kept_sessions),
+        "sessions_truncated": sum(1 for i, text in kept_sessions.items() if text != sessions[i]),
+        "open_todos_elided": sum(1 for i in open_todos if i not in kept_todos),
+        "completed_todos_elided": sum(1 for i in done_todos if i not in kept_todos)
+    }
+    return result
+
+
+def _summarize_todos(todos: List[str]) -> Dict[str, Any]:
+    """Count TODO lines: open and completed, and open ones per priority and category tag."""
+    summary = {"open": 0, "completed": 0, "open_by_priority": {}, "open_by_category": {}}
+    for todo in todos:
+        tags = TODO_TAGS_PATTERN.match(todo)
+        if tags is None:
+            summary["completed"] += 1
+            continue
+
+        summary["open"] += 1
+        priority = (tags.group(1) or "medium").lower()
+        summary["open_by_priority"][priority] = summary["open_by_priority"].get(priority, 0) + 1
+        if tags.group(2):
+            category = tags.group(2)
+            summary["open_by_category"][category] = summary["open_by_category"].get(category, 0) + 1
+    return summary
+
+
+def _bootstrap_snapshot_settings(backend: MemoryBackend) -> Dict[str, Any]:
+    """Configuration a bootstrap snapshot was built for; other settings need a rebuild."""
+    settings = backend.config["bootstrap"]
+    return {
+        "recent_entries_count": settings["recent_entries_count"],
+        "recent_experiments_count": settings.get("recent_experiments_count", 3),
+        "encoding": backend.encoding,
+        "csv_delimiter": backend.csv_delimiter
+    }
+
+
+def _bootstrap_fingerprints(backend: MemoryBackend) -> Dict[str, Optional[List[int]]]:
+    return {filename: _file_fingerprint(backend.memory_dir / filename) for filename in BOOTSTRAP_SOURCES}
+
+
+@_profiled("read_bootstrap_snapshot")
+def _read_bootstrap_snapshot(backend: MemoryBackend) -> Optional[Dict[str, Any]]:
+    """Load the bootstrap snapshot if it exists and was built with the current settings."""
+    if not backend.config["bootstrap"].get("snapshot", True):
+        return None
+
+    try:
+        with open(backend.memory_dir / CACHE_DIRNAME / BOOTSTRAP_SNAPSHOT_FILENAME, 'r', encoding='utf-8') as f:
+            PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (not isinstance(snapshot, dict) or snapshot.get("version") != BOOTSTRAP_SNAPSHOT_VERSION
+            or snapshot.get("settings") != _bootstrap_snapshot_settings(backend)):
+        return None
+    return snapshot
+
+
+def load_bootstrap_snapshot(backend: MemoryBackend) -> Optional[Dict[str, Any]]:
+    """Return the bootstrap snapshot, or None if it is missing or any memory file changed since."""
+    snapshot = _read_bootstrap_snapshot(backend)
+    if snapshot is None or snapshot.get("fingerprints") != _bootstrap_fingerprints(backend):
+        return None
+    return snapshot
+
+
+def _build_bootstrap_snapshot(backend: MemoryBackend) -> Dict[str, Any]:
+    """Parse the memory files into a bootstrap snapshot."""
+    settings = _bootstrap_snapshot_settings(backend)
+    cache = backend.parsed_cache
+    # Taken before reading, so a file changing meanwhile leaves the snapshot stale
+    fingerprints = _bootstrap_fingerprints(backend)
+
+    overview_path = backend.memory_dir / "project-overview.md"
+    devlog_path = backend.memory_dir / "devlog.md"
+    todos_path = backend.memory_dir / "todos.md"
+    experiments_path = backend.memory_dir / "experiments.csv"
+    experiments_count = settings["recent_experiments_count"]
+
+    recent_experiments = []
+    if experiments_path.exists() and experiments_count > 0:
+        recent_experiments = _recent_experiment_rows(backend, experiments_path, experiments_count)
+
+    snapshot = {
+        "version": BOOTSTRAP_SNAPSHOT_VERSION,
+        "settings": settings,
+        "fingerprints": fingerprints,
+        "project_context": cache.get(overview_path, "text") if overview_path.exists() else "",
+        "recent_progress": _recent_sessions(backend, settings["recent_entries_count"]),
+        "todos": list(cache.get(todos_path, "todo_lines")) if todos_path.exists() else [],
+        "recent_experiments": list(recent_experiments)
+    }
+    cache.save()
+    return snapshot
+
+
+def _recent_experiment_rows(backend: MemoryBackend, experiments_path: Path, count: int) -> List[Dict[str, Any]]:
+    """The last `count` rows of experiments.csv; large files are streamed rather than cached whole."""
+    if not _maps_file(backend, experiments_path):
+        return backend.parsed_cache.get(experiments_path, "csv_rows")[-count:]
+
+    # Quoted fields may span lines, so rows are only found by parsing from the start
+    with open(experiments_path, 'r', encoding=backend.encoding) as f:
+        PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+        return list(deque(csv.DictReader(f, delimiter=backend.csv_delimiter), maxlen=count))
+
+
+def _recent_sessions(backend: MemoryBackend, count: int) -> List[str]:
+    """
+    The last `count` devlog sessions for bootstrap. When devlog.md holds
+    fewer (e.g. after archiving), the newest archived sessions come first.
+    """
+    devlog_path = backend.memory_dir / "devlog.md"
+    sessions = list(backend.parsed_cache.get(devlog_path, "recent_sessions", count)) if devlog_path.exists() else []
+    if len(sessions) < count and (backend.memory_dir / ARCHIVE_DIRNAME).is_dir():
+        sessions = _archived_sessions(backend, count - len(sessions)) + sessions
+    return sessions
+
+
+def _advance_bootstrap_snapshot(backend: MemoryBackend, snapshot: Dict[str, Any],
+                                records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return a snapshot with logged sessions applied to it, without reading
+    the memory files: their devlog entries, TODO changes and experiments are
+    rendered from the session records.
+    """
+    settings = snapshot["settings"]
+    recent_progress = list(snapshot["recent_progress"])
+    todos_content = '\n'.join(snapshot["todos"])
+    recent_experiments = list(snapshot["recent_experiments"])
+
+    for record in records:
+        appends, todos_update = _render_session(backend, record)
+        recent_progress.append(appends["devlog.md"])
+        if todos_update is not None:
+            todos_content = backend._apply_todo_changes(todos_content, *todos_update)
+
+        payload = record["payload"]
+        for exp, experiment_id in zip(payload.get('experiments', []), record["experiment_ids"]):
+            row = _experiment_row(record["timestamp"], experiment_id, exp, payload.get('phases', {}))
+            recent_experiments.append(dict(zip(EXPERIMENT_CSV_HEADER, row)))
+
+    entries_count = settings["recent_entries_count"]
+    experiments_count = settings["recent_experiments_count"]
+    return dict(snapshot,
+                recent_progress=recent_progress[-entries_count:] if entries_count > 0 else [],
+                todos=_todo_lines(todos_content),
+                recent_experiments=recent_experiments[-experiments_count:] if experiments_count > 0 else [])
+
+
+@_profiled("update_bootstrap_snapshot")
+def update_bootstrap_snapshot(backend: MemoryBackend,
+                              previous_fingerprints: Optional[Dict[str, Optional[List[int]]]] = None,
+                              records: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Bring the bootstrap snapshot in step with the memory files and save it.
+
+    Args:
+        backend: Memory backend owning the files
+        previous_fingerprints: Fingerprints of BOOTSTRAP_SOURCES before the
+            caller wrote `records` to the files; if the stored snapshot
+            matches them it is advanced with the records instead of rebuilt
+        records: Session records just written (see log_session())
+
+    Returns:
+        The up-to-date snapshot
+    """
+    snapshot = None
+    if records and previous_fingerprints is not None:
+        previous = _read_bootstrap_snapshot(backend)
+        if previous is not None and previous["fingerprints"] == previous_fingerprints:
+            snapshot = _advance_bootstrap_snapshot(backend, previous, records)
+            snapshot["fingerprints"] = _bootstrap_fingerprints(backend)
+            # Re-read the devlog tail (located via the sections sidecar) so the
+            # entries match what a rebuild would parse, separators included
+            snapshot["recent_progress"] = _recent_sessions(backend, snapshot["settings"]["recent_entries_count"])
+
+    if snapshot is None:
+        snapshot = _build_bootstrap_snapshot(backend)
+
+    if backend.config["bootstrap"].get("snapshot", True):
+        snapshot_path = backend.memory_dir / CACHE_DIRNAME / BOOTSTRAP_SNAPSHOT_FILENAME
+        try:
+            snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            _write_file_atomic(snapshot_path, json.dumps(snapshot, ensure_ascii=False), 'utf-8')
+        except OSError as e:
+            print(f"Warning: Could not save bootstrap snapshot: {e}")
+    return snapshot
+
+
+def rebuild_bootstrap_snapshot(backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """
+    Rebuild the bootstrap snapshot from the memory files, e.g. after they
+    were edited by hand (bootstrap_context() also rebuilds a stale one).
+
+    Returns:
+        Dictionary with the snapshot path and what it holds
+    """
+    if backend is None:
+        backend = MemoryBackend()
+        backend.ensure_memory_directory()
+
+    with backend.lock():
+        snapshot = update_bootstrap_snapshot(backend)
+
+    return {
+        "snapshot_path": str(backend.memory_dir / CACHE_DIRNAME / BOOTSTRAP_SNAPSHOT_FILENAME),
+        "recent_sessions": len(snapshot["recent_progress"]),
+        "todos": len(snapshot["todos"]),
+        "recent_experiments": len(snapshot["recent_experiments"])
+    }
+
+
+def log_session(payload: Dict[str, Any], backend: Optional[MemoryBackend] = None) -> None:
+    """
+    Log a research session to memory files.
+
+    With logging.journal enabled the session is only appended to the journal
+    (one fsync'd JSON line) and rendered into the memory files in batches by
+    compact_journal(), keeping the cost of each call constant.
+
+    Args:
+        payload: Dictionary containing session information including:
+            - session_goal: Main objective
+            - changes_summary: Summary of changes
+            - experiments: List of experiment records
+            - decisions: List of decisions with rationale
+            - todos: List of TODO items
+            - phases: Dict mapping research phases to descriptions
+        backend: Already initialised backend to reuse (e.g. held by the daemon)
+    """
+    if backend is None:
+        backend = create_backend()
+    if backend.storage != "files":
+        backend.log_session(payload)
+        return
+
+    # Timestamps and experiment IDs are fixed now, even if rendered later
+    record = {
+        "timestamp": backend._get_timestamp(),
+        "experiment_ids": [backend._generate_experiment_id() for _ in payload.get('experiments', [])],
+        "payload": payload
+    }
+
+    with backend.lock():
+        if backend.config["logging"].get("journal", False):
+            pending = _append_journal(backend, record)
+            if pending >= backend.config["logging"].get("journal_flush_threshold", 20):
+                _compact_journal_locked(backend)
+            return
+
+        # Sessions still in the journal must land first to keep the order
+        records = _read_journal(backend) + [record]
+        _commit_sessions(backend, records, consume_journal=len(records) > 1)
+
+
+def _render_session(backend: MemoryBackend, record: Dict[str, Any]) -> tuple:
+    """
+    Render one logged session into the text it adds to the memory files.
+
+    Args:
+        backend: Memory backend (for configuration)
+        record: {"timestamp", "experiment_ids", "payload"} as built by log_session()
+
+    Returns:
+        Tuple of (appends keyed by filename, todos update tuple or None)
+    """
+    payload = record["payload"]
+    timestamp = record["timestamp"]
+    date_header = f"## {timestamp[:10]} {timestamp[11:16]}"
+    appends = {}
+
+    # Create session entry for devlog.md
+    session_entry = f"{date_header}\n\n"
+    session_entry += f"**Session Goal**: {payload.get('session_goal', 'Not specified')}\n\n"
+    session_entry += f"**Changes Summary**: {payload.get('changes_summary', 'No changes recorded')}\n\n"
+
+    # Add research phase sections
+    phases = payload.get('phases', {})
+    for phase in backend.config["logging"]["phase_sections"]:
+        if phase in phases and phases[phase]:
+            session_entry += f"### {phase.upper()}\n{phases[phase]}\n\n"
+
+    session_entry += "---\n\n"
+    appends["devlog.md"] = session_entry
+
+    # Rows for experiments.csv
+    experiments = payload.get('experiments', [])
+    if experiments:
+        rows = io.StringIO()
+        writer = csv.writer(rows, delimiter=backend.csv_delimiter)
+
+        for exp, experiment_id in zip(experiments, record["experiment_ids"]):
+            writer.writerow(_experiment_row(timestamp, experiment_id, exp, phases))
+
+        appends["experiments.csv"] = rows.getvalue()
+
+    # Entries for decisions.md
+    decisions = payload.get('decisions', [])
+    if decisions:
+        decision_entries = ""
+        for decision in decisions:
+            decision_entries += f"""## {timestamp}
+
+**Decision**: {decision.get('decision', '')}
+
+**Rationale**: {decision.get('rationale', '')}
+
+**Alternatives Considered**: {', '.join(decision.get('alternatives_considered', []))}
+
+---
+
+"""
+        appends["decisions.md"] = decision_entries
+
+    # Update todos.md with unified TODO management
+    todos_update = None
+    todos = payload.get('todos', [])
+    if todos:
+        # Handle both old format (list of strings) and new format (list of dicts)
+        if todos and isinstance(todos[0], str):
+            # Convert old format to new unified format
+            unified_todos = [{"text": todo, "status": "pending"} for todo in todos]
+        else:
+            # Already in new format
+            unified_todos = todos
+
+        new_todos, completed_todos = backend._process_todos(unified_todos)
+        todos_update = (new_todos, completed_todos, timestamp)
+
+    return appends, todos_update
+
+
+def _experiment_row(timestamp: str, experiment_id: str, exp: Dict[str, Any],
+                    phases: Dict[str, Any]) -> List[str]:
+    """Return the experiments.csv fields for one logged experiment."""
+    return [
+        timestamp,
+        experiment_id,
+        exp.get('hypothesis', ''),
+        exp.get('dataset', ''),
+        exp.get('model', ''),
+        exp.get('spec', ''),
+        json.dumps(exp.get('metrics', {})),
+        exp.get('notes', ''),
+        ','.join(phases.keys()) if phases else ''
+    ]
+
+
+def _render_sessions(backend: MemoryBackend, records: List[Dict[str, Any]]) -> tuple:
+    """Render several sessions into combined appends and an ordered list of todos updates."""
+    appends: Dict[str, str] = {}
+    todos_updates = []
+
+    for record in records:
+        session_appends, todos_update = _render_session(backend, record)
+        for filename, text in session_appends.items():
+            appends[filename] = appends.get(filename, "") + text
+        if todos_update is not None:
+            todos_updates.append(todos_update)
+
+    return appends, todos_updates
+
+
+def _commit_sessions(backend: MemoryBackend, records: List[Dict[str, Any]],
+                     consume_journal: bool = False) -> None:
+    """Write rendered sessions to the memory files and update the derived indexes. Caller must hold lock()."""
+    appends, todos_updates = _render_sessions(backend, records)
+
+    # Recreate missing files with their headers before appending
+    backend.ensure_memory_directory()
+
+    # Remember file states so the search index can be extended incrementally
+    index_baseline = {
+        filename: _file_fingerprint(backend.memory_dir / filename)
+        for filename in SEARCH_SOURCES.values()
+    }
+    snapshot_baseline = _bootstrap_fingerprints(backend)
+
+    backend._write_session(appends, todos_updates, consume_journal)
+
+    # Keep the derived indexes in step with the appended entries
+    try:
+        update_devlog_sections(backend, index_baseline["devlog.md"])
+    except OSError as e:
+        print(f"Warning: Could not update devlog sections: {e}")
+
+    if _maintains_search_index(backend):
+        try:
+            update_search_index(backend, index_baseline)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Could not update search index: {e}")
+
+    if "experiments.csv" in appends:
+        try:
+            update_experiment_store(backend, index_baseline["experiments.csv"])
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Could not update experiment store: {e}")
+
+    if backend.config["bootstrap"].get("snapshot", True):
+        try:
+            update_bootstrap_snapshot(backend, snapshot_baseline, records)
+        except OSError as e:
+            print(f"Warning: Could not update bootstrap snapshot: {e}")
+
+    if backend.config.get("archive", {}).get("auto", False):
+        cutoff = _archive_cutoff(backend)
+        oldest = _oldest_entry_date(backend)
+        if oldest is not None and oldest < cutoff:
+            try:
+                _archive_locked(backend, cutoff, backend.config.get("archive", {}).get("compress", False))
+            except OSError as e:
+                print(f"Warning: Could not archive old entries: {e}")
+
+
+def _append_journal(backend: MemoryBackend, record: Dict[str, Any]) -> int:
+    """
+    Append one session record to the journal and fsync it. Caller must hold lock().
+
+    Returns:
+        Number of sessions now waiting in the journal
+    """
+    journal_path = backend.memory_dir / JOURNAL_FILENAME
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+
+    with open(journal_path, 'ab') as f:
+        # Start on a fresh line if a previous writer died mid-record
+        if f.tell() > 0:
+            with open(journal_path, 'rb') as check:
+                check.seek(-1, os.SEEK_END)
+                if check.read(1) != b'\n':
+                    line = "\n" + line
+        f.write(line.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+    return len(_read_journal(backend))
+
+
+@_profiled("read_journal")
+def _read_journal(backend: MemoryBackend) -> List[Dict[str, Any]]:
+    """Return the session records waiting in the journal, skipping torn lines."""
+    journal_path = backend.memory_dir / JOURNAL_FILENAME
+    if not journal_path.exists():
+        return []
+
+    with open(journal_path, 'rb') as f:
+        data = f.read()
+    PROFILER.add_bytes(len(data))
+
+    records = []
+    for line in data.split(b'\n'):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line.decode('utf-8')))
+        except ValueError:
+            # A record cut short by a crash was never acknowledged to its writer
+            continue
+
+    return records
+
+
+def compact_journal(backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """
+    Render all journaled sessions into the memory files and empty the journal.
+
+    Returns:
+        Dictionary with the number of sessions flushed
+    """
+    if backend is None:
+        backend = MemoryBackend()
+
+    with backend.lock():
+        flushed = _compact_journal_locked(backend)
+
+    return {"flushed_sessions": flushed}
+
+
+def _compact_journal_locked(backend: MemoryBackend) -> int:
+    """Flush the journal in one all-or-nothing batch. Caller must hold lock()."""
+    records = _read_journal(backend)
+    if records:
+        _commit_sessions(backend, records, consume_journal=True)
+    elif (backend.memory_dir / JOURNAL_FILENAME).exists():
+        # Only torn or blank lines left
+        os.truncate(backend.memory_dir / JOURNAL_FILENAME, 0)
+    return len(records)
+
+
+def _maintains_search_index(backend: MemoryBackend) -> bool:
+    """
+    Whether writes keep the search index up to date: with search.use_index,
+    or once BM25 ranking or entry units have built one.
+    """
+    return backend.config["search"].get("use_index", False) or backend.load_search_index() is not None
+
+
+@_profiled("update_search_index")
+def update_search_index(backend: Optional[MemoryBackend] = None,
+                        previous_fingerprints: Optional[Dict[str, Optional[List[int]]]] = None) -> Dict[str, Any]:
+    """
+    Build or refresh the on-disk search index.
+
+    Args:
+        backend: Memory backend to index (defaults to the configured one)
+        previous_fingerprints: File fingerprints from before an append, used to
+            index only the newly written bytes
+
+    Returns:
+        Dictionary with the number of indexed units and terms per file
+    """
+    if backend is None:
+        backend = MemoryBackend()
+        backend.ensure_memory_directory()
+
+    index = backend.load_search_index() or SearchIndex(backend)
+    index.refresh(previous_fingerprints)
+    index.save()
+
+    return {
+        "index_path": str(index.path),
+        "files": {
+            filename: {"units": len(entry["offsets"]), "terms": len(entry["postings"])}
+            for filename, entry in index.files.items()
+        }
+    }
+
+
+def query_history(query: str, filters: Optional[Dict[str, Any]] = None,
+                  backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """
+    Query research history for relevant information.
+
+    Results come in pages: `page_size` (or `limit`) matches starting at
+    `cursor`, and `next_cursor` is the cursor of the following page (None
+    after the last one). Matches before the cursor are skipped without being
+    read back from disk.
+
+    Args:
+        query: Search query string
+        filters: Optional filters (date_range, phase, content_type, limit,
+            ranking, unit, cursor, page_size; top_k is set internally to
+            the number of matches consumed, see _parallel_scan())
+        backend: Already initialised backend to reuse (e.g. held by the daemon)
+
+    Returns:
+        Dictionary containing search results and summaries
+    """
+    if backend is None:
+        backend = create_backend()
+        backend.ensure_memory_directory()
+
+    # Apply filters or use defaults
+    if filters is None:
+        filters = {}
+
+    cursor, page_size = _page_bounds(backend, filters)
+
+    results = {
+        "query": query,
+        "matches": [],
+        "summary": "",
+        "next_cursor": None,
+        "timestamp": backend._get_timestamp()
+    }
+
+    builders = backend.query_candidates(query, dict(filters, top_k=cursor + page_size + 1))
+    results["matches"] = [build() for build in islice(builders, cursor, cursor + page_size)]
+    if next(builders, None) is not None:
+        results["next_cursor"] = cursor + page_size
+    backend.parsed_cache.save()
+
+    results["summary"] = _query_summary(query, len(results["matches"]))
+    return results
+
+
+def _page_bounds(backend: MemoryBackend, filters: Dict[str, Any]) -> tuple:
+    """Return (cursor, page size) of the requested result page."""
+    page_size = filters.get('page_size') or filters.get('limit') or backend.config["search"]["max_results"]
+    return int(filters.get('cursor') or 0), page_size
+
+
+def _query_summary(query: str, count: int) -> str:
+    """Summary line for a page of query results."""
+    if count:
+        return f"Found {count} relevant entries for '{query}'"
+    return f"No entries found matching '{query}'"
+
+
+def iter_query_history(query: str, filters: Optional[Dict[str, Any]] = None,
+                       backend: Optional[MemoryBackend] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every match for a query, most relevant first, building each one lazily.
+
+    Takes the same filters as query_history() except the paging ones; stop
+    iterating as soon as enough matches were seen.
+    """
+    if backend is None:
+        backend = create_backend()
+        backend.ensure_memory_directory()
+
+    for build in backend.query_candidates(query, filters or {}):
+        yield build()
+
+
+def _query_candidates(backend: MemoryBackend, query: str, filters: Dict[str, Any]) -> Iterator[Any]:
+    """
+    Search the memory files and yield match builders in relevance order.
+
+    Candidates are kept in a heap and popped one at a time, so taking the
+    first page only orders (and reads back) what is actually consumed.
+    Matches from archived segments follow those from the current files.
+    """
+    include_context = backend.config["search"]["include_context"]
+    context_lines = backend.config["search"]["context_lines"]
+
+    # Parse date filters
+    from_date = filters.get('from_date')
+    to_date = filters.get('to_date')
+    phase_filter = filters.get('phase')
+    type_filter = filters.get('type')
+    ranking = filters.get('ranking') or backend.config["search"].get("ranking", "count")
+    if ranking not in RANKING_MODES:
+        print(f"Warning: Unknown ranking mode '{ranking}', using 'count'")
+        ranking = "count"
+    unit = filters.get('unit') or backend.config["search"].get("unit", "line")
+    if unit not in SEARCH_UNITS:
+        print(f"Warning: Unknown search unit '{unit}', using 'line'")
+        unit = "line"
+    by_entry = unit == "entry"
+
+    # Word tokens for Latin text, character bigrams for CJK text
+    keywords = _query_keywords(query)
+
+    # Search based on type filter
+    source_types = [source_type for source_type in SEARCH_SOURCES
+                    if not type_filter or type_filter == source_type]
+
+    # Use the inverted index where it is fresh; stale files are scanned
+    index = None
+    scores = None
+    if ranking == "bm25" or by_entry:
+        # BM25 statistics and entry blocks come from the index
+        index = _refreshed_search_index(backend)
+    elif backend.config["search"].get("use_index", False):
+        index = backend.load_search_index()
+
+    # Sessions still waiting in the journal are searched from memory
+    index = _index_journal(backend, index)
+
+    if ranking == "bm25":
+        views = {}
+        for source_type in source_types:
+            filename = SEARCH_SOURCES[source_type]
+            if index.entry(filename) is not None:
+                views[filename] = _IndexView(index.files[filename], by_entry)
+            if filename in index.pending:
+                views[f"pending:{filename}"] = _IndexView(index.pending[filename], by_entry)
+        scores = _bm25_scores(views, keywords)
+
+    # Date and phase filters are applied per section/row while searching
+    scope = _SearchScope(from_date, to_date, phase_filter)
+
+    # Large files the index does not cover may be scanned in worker processes
+    scanned = _parallel_scan(backend, index, source_types, keywords, include_context, context_lines,
+                             scope, filters.get('top_k'))
+
+    candidates = []
+    for source_type in source_types:
+        candidates.extend(_search_source(backend, index, source_type, keywords, include_context,
+                                         context_lines, scores, by_entry, scope, scanned.get(source_type)))
+
+    # Ties keep their original order
+    heap = [(-relevance, order, build) for order, (relevance, build) in enumerate(candidates)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+    # Archived segments are only searched once the current files run out of matches
+    if filters.get('archive', True) and (backend.memory_dir / ARCHIVE_DIRNAME).is_dir():
+        yield from _archive_candidates(backend, query, filters)
+
+
+def _refreshed_search_index(backend: MemoryBackend) -> SearchIndex:
+    """
+    Return the search index with stale files re-indexed, saving it if any
+    were so the next query (and the next entry-mode offsets lookup) starts
+    from the refreshed entries. Entries carry fingerprints, so racing a
+    log_session() at worst leaves one of them stale.
+    """
+    index = backend.load_search_index() or SearchIndex(backend)
+    if index.refresh():
+        try:
+            index.save()
+        except OSError as e:
+            print(f"Warning: Could not save search index: {e}")
+    return index
+
+
+def _index_journal(backend: MemoryBackend, index: Optional[SearchIndex]) -> Optional[SearchIndex]:
+    """
+    Index the text journaled sessions will add, so queries see them before compaction.
+
+    Returns:
+        The given index (or a new in-memory one if there was none and the
+        journal is not empty) with its pending entries filled in
+    """
+    if index is not None:
+        index.pending.clear()
+
+    records = _read_journal(backend)
+    if not records:
+        return index
+
+    if index is None:
+        index = SearchIndex(backend)
+
+    appends, _ = _render_sessions(backend, records)
+    for filename, text in appends.items():
+        index.index_pending(filename, text)
+
+    return index
+
+
+@_profiled("search_in_file")
+def _search_in_file(file_path: Path, keywords: List[str], source_type: str,
+                   include_context: bool, context_lines: int, encoding: str = 'utf-8',
+                   scope: Optional[_SearchScope] = None,
+                   cache: Optional[ParsedMemoryCache] = None) -> List[Dict[str, Any]]:
+    """Search for keywords in a text file, skipping sections outside `scope`."""
+    matches = []
+
+    try:
+        lowered = None
+        if cache is not None:
+            lines = cache.get(file_path, "lines")
+            lowered = cache.get(file_path, "lowered_lines")
+        else:
+            with open(file_path, 'r', encoding=encoding) as f:
+                PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+                lines = f.readlines()
+
+        matches = _search_lines(lines, keywords, source_type, include_context, context_lines, scope, lowered)
+
+    except Exception as e:
+        print(f"Warning: Could not search {file_path}: {e}")
+
+    return matches
+
+
+@_profiled("search_mapped_file")
+def _search_mapped_file(file_path: Path, keywords: List[str], source_type: str, include_context: bool,
+                        context_lines: int, encoding: str,
+                        scope: Optional[_SearchScope] = None) -> List[tuple]:
+    """
+    Search a markdown file of at least cache.mmap_bytes without reading it
+    into memory: it is memory-mapped and matched as bytes (see
+    _search_mapped_lines()), or streamed if its encoding or the keywords
+    rule that out.
+
+    Returns:
+        (relevance, build_match) candidates like _search_source(); the
+        matched lines and their context are only decoded by build_match()
+    """
+    matcher = KeywordMatcher(keywords)
+    pattern = matcher.byte_pattern(encoding)
+
+    try:
+        if pattern is None:
+            with open(file_path, 'r', encoding=encoding) as f:
+                PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+                matches = _search_lines(f, keywords, source_type, include_context, context_lines, scope)
+            return [(match["relevance"], partial(dict, match)) for match in matches]
+
+        with _mapped_file(file_path) as data:
+            PROFILER.add_bytes(len(data))
+            return [(relevance, partial(_mapped_match, file_path, encoding, source_type, line_number, start, end,
+                                        relevance, include_context, context_lines))
+                    for line_number, start, end, relevance
+                    in _search_mapped_lines(data, pattern, matcher, encoding, scope)]
+
+    except Exception as e:
+        print(f"Warning: Could not search {file_path}: {e}")
+        return []
+
+
+def _search_mapped_lines(data, pattern: 're.Pattern', matcher: KeywordMatcher, encoding: str,
+                         scope: Optional[_SearchScope] = None) -> Iterator[tuple]:
+    """
+    Match keywords against the raw bytes of a mapped UTF-8 markdown file.
+
+    `pattern` (KeywordMatcher.byte_pattern()) finds candidate lines; only
+    those lines, and the sections whose scope must be checked, are decoded.
+    Line numbers are counted on the bytes between matches. Lines end at
+    "\n", so a file using bare "\r" line endings is numbered differently
+    from a text-mode read.
+
+    Yields:
+        (line number, start byte, end byte, relevance) of every matching line
+    """
+    size = len(data)
+    scoped = scope is not None and scope.active()
+    decided: Dict[int, bool] = {}
+    position = 0
+    # Line number of the line starting at byte `counted`
+    counted, line_number = 0, 1
+
+    def in_scope(start: int) -> bool:
+        header = start if data[start:start + 3] == b'## ' else data.rfind(b'\n## ', 0, start) + 1
+        if header not in decided:
+            end = data.find(b'\n## ', header)
+            end = size if end < 0 else end + 1
+            section = _decode_span(data, header, end, encoding).splitlines(keepends=True)
+            decided[header] = scope.allows_section(section)
+        return decided[header]
+
+    while position < size:
+        hit = pattern.search(data, position)
+        if hit is None:
+            break
+        start = data.rfind(b'\n', 0, hit.start()) + 1
+        position = data.find(b'\n', hit.end())
+        position = size if position < 0 else position + 1
+
+        relevance = matcher.count(_decode_span(data, start, position, encoding).lower())
+        if relevance == 0 or (scoped and not in_scope(start)):
+            continue
+
+        line_number += _count_newlines(data, counted, start)
+        counted = start
+        yield line_number, start, position, relevance
+
+
+def _mapped_match(file_path: Path, encoding: str, source_type: str, line_number: int, start: int, end: int,
+                  relevance: int, include_context: bool, context_lines: int) -> Dict[str, Any]:
+    """Build the match for bytes [start, end) of a mapped file, decoding only the line and its context window."""
+    with _mapped_file(file_path) as data:
+        match = {
+            "source": source_type,
+            "line_number": line_number,
+            "relevance": relevance,
+            "content": _decode_span(data, start, end, encoding).strip()
+        }
+
+        if include_context:
+            first, last = start, end
+            for _ in range(context_lines):
+                if first > 0:
+                    first = data.rfind(b'\n', 0, first - 1) + 1
+                if last < len(data):
+                    last = data.find(b'\n', last)
+                    last = len(data) if last < 0 else last + 1
+            match["context"] = _decode_span(data, first, last, encoding).strip()
+
+    return match
+
+
+def _search_lines(lines, keywords: List[str], source_type: str, include_context: bool,
+                  context_lines: int, scope: Optional[_SearchScope] = None,
+                  lowered: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Match keywords against markdown lines, skipping sections outside `scope`.
+
+    A list of lines is matched as one document (`lowered`, if given, is its
+    cached _lowered_document()). `lines` may also be a stream: it is then
+    read one section at a time, keeping only the last `context_lines` lines
+    for the context of the next match.
+    """
+    matcher = KeywordMatcher(keywords)
+    if isinstance(lines, list):
+        return _search_line_list(lines, matcher, source_type, include_context, context_lines, scope,
+                                 lowered if lowered is not None else _lowered_document(lines))
+
+    matches = []
+    preceding: deque = deque(maxlen=context_lines)
+    # [context lines so far, lines still to add] of matches awaiting their trailing context
+    waiting: List[list] = []
+    line_number = 0
+
+    for section in _iter_sections(lines):
+        in_scope = scope is None or not scope.active() or scope.allows_section(section)
+
+        for line in section:
+            line_number += 1
+            for context in waiting:
+                context[0].append(line)
+                context[1] -= 1
+            waiting = [context for context in waiting if context[1] > 0]
+
+            if in_scope:
+                keyword_matches = matcher.count(line.lower())
+
+                if keyword_matches > 0:
+                    match = {
+                        "source": source_type,
+                        "line_number": line_number,
+                        "relevance": keyword_matches,
+                        "content": line.strip()
+                    }
+
+                    if include_context:
+                        context = [list(preceding) + [line], context_lines]
+                        match["context"] = context[0]
+                        if context_lines > 0:
+                            waiting.append(context)
+
+                    matches.append(match)
+
+            preceding.append(line)
+
+    for match in matches:
+        if include_context:
+            match["context"] = ''.join(match["context"]).strip()
+    return matches
+
+
+def _search_line_list(lines: List[str], matcher: KeywordMatcher, source_type: str, include_context: bool,
+                      context_lines: int, scope: Optional[_SearchScope],
+                      lowered: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Match a whole markdown file in memory; only lines with a hit are looked at one by one."""
+    hits = matcher.line_hits(lowered)
+    if not hits:
+        return []
+
+    in_scope = None
+    if scope is not None and scope.active():
+        # Sections start at "## " lines (and line 0); each is checked once, when it has a hit
+        starts = lowered["starts"]
+        headers = [bisect_right(starts, m.start()) - 1 for m in SECTION_START_PATTERN.finditer(lowered["text"])]
+        bounds = sorted(set([0] + headers)) + [len(lines)]
+        decided: Dict[int, bool] = {}
+
+        def in_scope(line: int) -> bool:
+            section = bisect_right(bounds, line) - 1
+            if section not in decided:
+                decided[section] = scope.allows_section(lines[bounds[section]:bounds[section + 1]])
+            return decided[section]
+
+    matches = []
+    for i in sorted(hits):
+        if in_scope is not None and not in_scope(i):
+            continue
+
+        match = {
+            "source": source_type,
+            "line_number": i + 1,
+            "relevance": hits[i],
+            "content": lines[i].strip()
+        }
+
+        if include_context:
+            start = max(0, i - context_lines)
+            end = min(len(lines), i + context_lines + 1)
+            match["context"] = ''.join(lines[start:end]).strip()
+
+        matches.append(match)
+
+    return matches
+
+
+@_profiled("search_in_csv")
+def _search_in_csv(file_path: Path, keywords: List[str], source_type: str,
+                   encoding: str = 'utf-8', csv_delimiter: str = ',',
+                   scope: Optional[_SearchScope] = None,
+                   cache: Optional[ParsedMemoryCache] = None,
+                   mapped: bool = False) -> List[Dict[str, Any]]:
+    """
+    Search for keywords in a CSV file, skipping rows outside `scope`.
+
+    With `mapped` (a file of at least cache.mmap_bytes), rows are streamed
+    rather than read whole: quoted fields may span lines, so row numbers
+    cannot be found from raw bytes the way _search_mapped_lines() does.
+    """
+    matches = []
+
+    try:
+        lowered = None
+        if mapped:
+            with open(file_path, 'r', encoding=encoding) as f:
+                PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+                return _search_csv_rows(csv.DictReader(f, delimiter=csv_delimiter), keywords, source_type, scope)
+        if cache is not None:
+            rows = cache.get(file_path, "csv_rows")
+            lowered = cache.get(file_path, "lowered_rows")
+        else:
+            with open(file_path, 'r', encoding=encoding) as f:
+                PROFILER.add_bytes(os.fstat(f.fileno()).st_size)
+                rows = list(csv.DictReader(f, delimiter=csv_delimiter))
+
+        matches = _search_csv_rows(rows, keywords, source_type, scope, lowered)
+
+    except Exception as e:
+        print(f"Warning: Could not search {file_path}: {e}")
+
+    return matches
+
+
+def _search_csv_rows(rows, keywords: List[str], source_type: str,
+                     scope: Optional[_SearchScope] = None,
+                     lowered: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Match keywords against experiments.csv rows: a list, matched as one
+    document (`lowered`, if given, is its cached "lowered_rows"), or a
+    streaming csv.DictReader, matched row by row.
+    """
+    matcher = KeywordMatcher(keywords)
+    matches = []
+
+    if isinstance(rows, list):
+        if lowered is None:
+            lowered = _lowered_document([_row_text(row) + '\n' for row in rows])
+        hits = matcher.line_hits(lowered)
+        candidates = ((i, rows[i], hits[i]) for i in sorted(hits))
+    else:
+        # Search all fields for keywords
+        candidates = ((i, row, matcher.count(_row_text(row).lower())) for i, row in enumerate(rows))
+
+    for i, row, keyword_matches in candidates:
+        if keyword_matches == 0:
+            continue
+        if scope is not None and not scope.allows_row(_row_date(row), row.get('research_phase') or ''):
+            continue
+
+        # +2 because CSV reader is 0-indexed and header is row 1
+        matches.append(_csv_row_match(row, i + 2, keyword_matches, source_type))
+
+    return matches
+
+
+def _csv_row_match(row: Dict[str, Any], row_number: int, relevance: int, source_type: str) -> Dict[str, Any]:
+    """Build a search match for an experiments CSV row."""
+    match = {
+        "source": source_type,
+        "row_number": row_number,
+        "timestamp": row.get('timestamp') or '',
+        "relevance": relevance,
+        "content": f"Experiment: {row.get('experiment_id', 'N/A')} - {row.get('hypothesis', 'N/A')}"
+    }
+
+    # Add relevant fields as context
+    relevant_fields = ['timestamp', 'hypothesis', 'dataset', 'model', 'metrics', 'notes']
+    context = {field: row.get(field, '') for field in relevant_fields if row.get(field)}
+    match["context"] = context
+
+    return match
+
+
+def _search_source(backend: MemoryBackend, index: Optional[SearchIndex], source_type: str,
+                   keywords: List[str], include_context: bool, context_lines: int,
+                   scores: Optional[Dict[str, Dict[int, float]]] = None,
+                   by_entry: bool = False, scope: Optional[_SearchScope] = None,
+                   scanned: Optional[List[Dict[str, Any]]] = None) -> List[tuple]:
+    """
+    Search one memory file, using the inverted index when it is fresh and
+    falling back to a full scan when it is missing or stale. Text for this
+    file still waiting in the journal (indexed in index.pending) is searched too.
+
+    Args:
+        scores: Precomputed BM25 scores per file (pending text under
+            "pending:<filename>"); when given, they replace the keyword-count relevance
+        by_entry: Return whole devlog sessions / decision blocks instead of
+            lines (requires a fresh index entry)
+        scope: Date/phase restriction; sections and rows outside it are
+            skipped before matching
+        scanned: Matches of a parallel scan of the file, used instead of
+            scanning it here when the index does not cover it
+
+    Returns:
+        List of (relevance, build_match) candidates. Index hits are only read
+        back from disk when build_match() is called.
+    """
+    file_path = backend.memory_dir / SEARCH_SOURCES[source_type]
+    candidates = []
+
+    entry = index.entry(file_path.name) if index is not None else None
+    if entry is not None:
+        file_scores = scores.get(file_path.name, {}) if scores is not None else None
+        candidates.extend(_index_candidates(index, source_type, entry, keywords, include_context,
+                                            context_lines, file_scores, by_entry, scope=scope))
+    elif scanned is not None:
+        candidates.extend((match["relevance"], partial(dict, match)) for match in scanned)
+    elif file_path.exists() and source_type != "experiments" and _maps_file(backend, file_path):
+        candidates.extend(_search_mapped_file(file_path, keywords, source_type, include_context,
+                                              context_lines, backend.encoding, scope))
+    elif file_path.exists():
+        if source_type == "experiments":
+            matches = _search_in_csv(file_path, keywords, source_type, backend.encoding, backend.csv_delimiter,
+                                     scope, backend.parsed_cache, _maps_file(backend, file_path))
+        else:
+            matches = _search_in_file(file_path, keywords, source_type, include_context, context_lines,
+                                      backend.encoding, scope, backend.parsed_cache)
+        candidates.extend((match["relevance"], partial(dict, match)) for match in matches)
+
+    pending_entry = index.pending.get(file_path.name) if index is not None else None
+    if pending_entry is not None:
+        pending_scores = scores.get(f"pending:{file_path.name}", {}) if scores is not None else None
+        candidates.extend(_index_candidates(index, source_type, pending_entry, keywords, include_context,
+                                            context_lines, pending_scores, by_entry, pending=True, scope=scope))
+
+    return candidates
+
+
+_SCAN_POOL: Optional[tuple] = None
+
+
+def _scan_pool(workers: int) -> ProcessPoolExecutor:
+    """The process pool of parallel scans, kept for reuse by later queries (e.g. in the daemon)."""
+    global _SCAN_POOL
+    if _SCAN_POOL is None or _SCAN_POOL[0] != workers:
+        if _SCAN_POOL is not None:
+            _SCAN_POOL[1].shutdown(wait=False)
+        _SCAN_POOL = (workers, ProcessPoolExecutor(max_workers=workers))
+    return _SCAN_POOL[1]
+
+
+@_profiled("parallel_scan")
+def _parallel_scan(backend: MemoryBackend, index: Optional[SearchIndex], source_types: List[str],
+                   keywords: List[str], include_context: bool, context_lines: int,
+                   scope: _SearchScope, top_k: Optional[int]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Scan the files the index does not cover in worker processes.
+
+    Only used once those files total search.parallel_scan_bytes and more
+    than one worker is configured. Markdown files are split at "## "
+    headers into chunks; experiments.csv is one task. Each task returns at
+    most its `top_k` best matches (all of them without top_k): the first
+    top_k matches of the merged ranking can only come from these.
+
+    Returns:
+        Matches per source type in file order, as the serial scan returns
+        them; empty (meaning "scan serially") below the threshold
+    """
+    settings = backend.config["search"]
+    workers = settings.get("scan_workers") or os.cpu_count() or 1
+    files = {}
+    for source_type in source_types:
+        file_path = backend.memory_dir / SEARCH_SOURCES[source_type]
+        if (index is None or index.entry(file_path.name) is None) and file_path.exists():
+            files[source_type] = file_path
+
+    total = sum(file_path.stat().st_size for file_path in files.values())
+    if workers <= 1 or not files or total < settings.get("parallel_scan_bytes", 8 * 1024 * 1024):
+        return {}
+
+    chunk_size = max(PARALLEL_SCAN_MIN_CHUNK, total // (workers * 2))
+    try:
+        pool = _scan_pool(workers)
+        tasks = {}
+        for source_type, file_path in files.items():
+            if source_type == "experiments":
+                tasks[source_type] = [pool.submit(_scan_csv_task, file_path, keywords, source_type,
+                                                  backend.encoding, backend.csv_delimiter, scope, top_k)]
+            else:
+                bounds = _section_chunk_bounds(file_path, chunk_size)
+                tasks[source_type] = [pool.submit(_scan_markdown_chunk, file_path, start, end, keywords,
+                                                  source_type, include_context, context_lines,
+                                                  backend.encoding, scope, top_k)
+                                      for start, end in zip(bounds, bounds[1:])]
+
+        scanned = {}
+        for source_type, futures in tasks.items():
+            matches = []
+            line_offset = 0
+            for future in futures:
+                line_count, chunk_matches = future.result()
+                for match in chunk_matches:
+                    if "line_number" in match:
+                        match["line_number"] += line_offset
+                matches.extend(chunk_matches)
+                line_offset += line_count
+            scanned[source_type] = matches
+        return scanned
+    except Exception as e:
+        print(f"Warning: Parallel scan failed, scanning serially: {e}")
+        return {}
+
+
+def _section_chunk_bounds(file_path: Path, chunk_size: int) -> List[int]:
+    """
+    Byte offsets splitting a markdown file into chunks of about `chunk_size`,
+    each starting at a "## " header (except the first); includes 0 and the size.
+    """
+    size = file_path.stat().st_size
+    bounds = [0]
+    with open(file_path, 'rb') as f:
+        target = chunk_size
+        while target < size:
+            f.seek(target - 1)
+            position = target - 1
+            # Find the next "\n## " at or after the target
+            found = None
+            while found is None and position < size:
+                data = f.read(TAIL_SCAN_CHUNK_SIZE + 3)
+                offset = data.find(b'\n## ')
+                if offset >= 0:
+                    found = position + offset + 1
+                elif len(data) < 4:
+                    break
+                else:
+                    position += len(data) - 3
+                    f.seek(position)
+            if found is None:
+                break
+            bounds.append(found)
+            target = found + chunk_size
+    bounds.append(size)
+    return bounds
+
+
+def _decode_lines(data: bytes, encoding: str) -> List[str]:
+    """Split file bytes into lines the way reading the file in text mode does."""
+    return io.TextIOWrapper(io.BytesIO(data), encoding=encoding).readlines()
+
+
+def _top_matches(matches: List[Dict[str, Any]], top_k: Optional[int]) -> List[Dict[str, Any]]:
+    """The `top_k` most relevant matches (earlier ones first among equals), kept in file order."""
+    if top_k is None or len(matches) <= top_k:
+        return matches
+    best = {id(match) for match in heapq.nsmallest(top_k, matches, key=lambda match: -match["relevance"])}
+    return [match for match in matches if id(match) in best]
+
+
+def _scan_markdown_chunk(file_path: Path, start: int, end: int, keywords: List[str], source_type: str,
+                         include_context: bool, context_lines: int, encoding: str,
+                         scope: _SearchScope, top_k: Optional[int]) -> tuple:
+    """
+    Score bytes start..end of a markdown file (runs in a worker process).
+
+    The `context_lines` lines around the chunk are read too, only as context.
+
+    Returns:
+        Tuple of (lines in the chunk, matches numbered from the chunk's first line)
+    """
+    context_lines = context_lines if include_context else 0
+    with open(file_path, 'rb') as f:
+        lead = b''
+        position = start
+        while context_lines > 0 and position > 0 and lead.count(b'\n') <= context_lines:
+            read_size = min(TAIL_SCAN_CHUNK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            lead = f.read(read_size) + lead
+        if position > 0:
+            # Drop the partial line the backward read started in
+            lead = lead[lead.find(b'\n') + 1:]
+
+        f.seek(start)
+        data = f.read(end - start)
+
+        tail = b''
+        while context_lines > 0 and tail.count(b'\n') < context_lines:
+            more = f.read(TAIL_SCAN_CHUNK_SIZE)
+            if not more:
+                break
+            tail += more
+        if tail.count(b'\n') >= context_lines > 0:
+            tail = tail[:tail.rfind(b'\n') + 1]
+
+    lead_lines = _decode_lines(lead, encoding)[-context_lines:] if context_lines > 0 else []
+    lines = _decode_lines(data, encoding)
+    tail_lines = _decode_lines(tail, encoding)[:context_lines]
+
+    matches = _search_lines(lead_lines + lines + tail_lines, keywords, source_type,
+                            include_context, context_lines, scope)
+    first, last = len(lead_lines), len(lead_lines) + len(lines)
+    matches = [match for match in matches if first < match["line_number"] <= last]
+    for match in matches:
+        match["line_number"] -= first
+    return len(lines), _top_matches(matches, top_k)
+
+
+def _scan_csv_task(file_path: Path, keywords: List[str], source_type: str, encoding: str,
+                   csv_delimiter: str, scope: _SearchScope, top_k: Optional[int]) -> tuple:
+    """Score experiments.csv (runs in a worker process); returns (0, matches) like _scan_markdown_chunk()."""
+    with open(file_path, 'r', encoding=encoding) as f:
+        matches = _search_csv_rows(csv.DictReader(f, delimiter=csv_delimiter), keywords, source_type, scope)
+    return 0, _top_matches(matches, top_k)
+
+
+@_profiled("index_lookup")
+def _index_candidates(index: SearchIndex, source_type: str, entry: Dict[str, Any], keywords: List[str],
+                      include_context: bool, context_lines: int, unit_scores: Optional[Dict[int, float]],
+                      by_entry: bool, pending: bool = False,
+                      scope: Optional[_SearchScope] = None) -> List[tuple]:
+    """Turn index hits for one entry into (relevance, build_match) candidates."""
+    view = _IndexView(entry, by_entry)
+    if unit_scores is not None:
+        unit_scores = {unit: round(score, 4) for unit, score in unit_scores.items()}
+    else:
+        unit_scores = index.lookup(view, keywords)
+
+    in_scope = scope.index_filter(entry, by_entry) if scope is not None else None
+    if in_scope is not None:
+        with PROFILER.stage("apply_filters"):
+            unit_scores = {unit: relevance for unit, relevance in unit_scores.items() if in_scope(unit)}
+
+    if view.blocks is not None:
+        return [(relevance, partial(index.build_entry_match, source_type, unit, relevance,
+                                    include_context, pending))
+                for unit, relevance in sorted(unit_scores.items())]
+
+    return [(relevance, partial(index.build_match, source_type, unit, relevance,
+                                include_context, context_lines, pending))
+            for unit, relevance in sorted(unit_scores.items())]
+
+
+def _parse_metrics(text: str) -> Dict[str, Any]:
+    """
+    Parse the metrics cell of experiments.csv into {key: value}.
+
+    Accepts the JSON written by log_session() as well as the loose
+    "{r_squared: 0.42, p_value: 0.000}" form found in hand-written rows.
+    Numeric values become floats, everything else stays text.
+    """
+    text = (text or "").strip()
+    try:
+        metrics = json.loads(text) if text else {}
+    except ValueError:
+        metrics = {key: value.strip().strip('"\'')
+                   for key, value in re.findall(r'["\']?([^{},:"\']+?)["\']?\s*:\s*([^,}]*)', text)}
+    if not isinstance(metrics, dict):
+        return {}
+
+    parsed = {}
+    for key, value in metrics.items():
+        key = str(key).strip()
+        if isinstance(value, bool) or value is None:
+            parsed[key] = None if value is None else int(value)
+        elif isinstance(value, (int, float)):
+            parsed[key] = float(value)
+        else:
+            try:
+                parsed[key] = float(value)
+            except (TypeError, ValueError):
+                parsed[key] = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return parsed
+
+
+def _quote_column(name: str) -> str:
+    """Quote a column name for use in SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _experiment_store_columns(connection: sqlite3.Connection, table: str = "experiments") -> List[str]:
+    """Return the column names of the experiments table (or a table shaped like it)."""
+    return [row[1] for row in connection.execute(f'PRAGMA table_info({table})')]
+
+
+def _store_experiment_rows(connection: sqlite3.Connection, rows, table: str = "experiments") -> int:
+    """
+    Insert parsed experiments.csv rows, adding a column for each new metric key.
+
+    Returns:
+        Number of rows stored
+    """
+    columns = set(_experiment_store_columns(connection, table))
+    count = 0
+
+    for row in rows:
+        if not row.get("experiment_id"):
+            continue
+
+        values = {column: row.get(column) for column in EXPERIMENT_COLUMNS}
+        for key, value in _parse_metrics(row.get("metrics", "")).items():
+            column = METRIC_COLUMN_PREFIX + key
+            if column not in columns:
+                column_type = "REAL" if isinstance(value, (int, float)) else "TEXT"
+                connection.execute(f'ALTER TABLE {table} ADD COLUMN {_quote_column(column)} {column_type}')
+                columns.add(column)
+            values[column] = value
+
+        names = ', '.join(_quote_column(column) for column in values)
+        placeholders = ', '.join('?' for _ in values)
+        connection.execute(f'INSERT OR REPLACE INTO {table} ({names}) VALUES ({placeholders})',
+                           list(values.values()))
+        count += 1
+
+    return count
+
+
+@_profiled("update_experiment_store")
+def update_experiment_store(backend: MemoryBackend,
+                            previous_fingerprint: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Keep the SQLite experiment store in step with experiments.csv.
+
+    Args:
+        backend: Memory backend owning experiments.csv
+        previous_fingerprint: Fingerprint of experiments.csv before the caller
+            appended to it; if the store matches it, only the appended rows
+            are parsed
+
+    Returns:
+        Summary of the update (rows stored and whether it was a full rebuild)
+    """
+    csv_path = backend.memory_dir / "experiments.csv"
+    store_path = backend.memory_dir / CACHE_DIRNAME / EXPERIMENT_STORE_FILENAME
+    current = _file_fingerprint(csv_path)
+    if current is None:
+        return {"rows": 0, "rebuilt": False}
+
+    stored = None
+    if store_path.exists():
+        try:
+            with sqlite3.connect(store_path) as connection:
+                stored = json.loads(connection.execute(
+                    "SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()[0])
+        except (sqlite3.Error, TypeError, ValueError):
+            stored = None
+
+    if stored == current:
+        return {"rows": 0, "rebuilt": False}
+
+    if (stored is not None and previous_fingerprint is not None and stored == previous_fingerprint
+            and current[0] >= previous_fingerprint[0]
+            and SearchIndex(backend)._ends_with_newline(csv_path, previous_fingerprint[0])):
+        with open(csv_path, 'rb') as f:
+            header = next(csv.reader([f.readline().decode(backend.encoding)], delimiter=backend.csv_delimiter))
+            f.seek(previous_fingerprint[0])
+            appended = f.read().decode(backend.encoding)
+
+        connection = sqlite3.connect(store_path)
+        try:
+            with connection:
+                reader = csv.DictReader(io.StringIO(appended, newline=''), fieldnames=header,
+                                        delimiter=backend.csv_delimiter)
+                count = _store_experiment_rows(connection, reader)
+                connection.execute("UPDATE meta SET value = ? WHERE key = 'fingerprint'",
+                                   (json.dumps(current),))
+        finally:
+            connection.close()
+        return {"rows": count, "rebuilt": False}
+
+    # Full rebuild into a private file, swapped in atomically
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _temporary_path(store_path)
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with connection:
+            columns = ', '.join(f'{column} TEXT' if column != "experiment_id" else 'experiment_id TEXT PRIMARY KEY'
+                                for column in EXPERIMENT_COLUMNS)
+            connection.execute(f'CREATE TABLE experiments ({columns})')
+            connection.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+            connection.execute("INSERT INTO meta VALUES ('fingerprint', ?)", (json.dumps(current),))
+            with open(csv_path, 'r', encoding=backend.encoding, newline='') as f:
+                count = _store_experiment_rows(connection, csv.DictReader(f, delimiter=backend.csv_delimiter))
+    finally:
+        connection.close()
+    os.replace(tmp_path, store_path)
+
+    return {"rows": count, "rebuilt": True}
+
+
+def query_experiments(conditions: Optional[List[str]] = None, sort: Optional[str] = None,
+                      descending: bool = False, limit: Optional[int] = None,
+                      backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """
+    Query experiments by typed metric values.
+
+    Conditions compare a metric key (or a column such as dataset or model)
+    with a value, e.g. "r_squared>0.7" or "model=OLS回归"; numeric values are
+    compared numerically. Filtering and sorting run inside SQLite: on the
+    experiment store, which is refreshed first if experiments.csv changed,
+    or in the database of the SQLite backend.
+
+    Args:
+        conditions: Conditions that must all hold ("<key><op><value>", op one
+            of = != < <= > >=)
+        sort: Metric key or column to sort by (rows without it come last)
+        descending: Sort in descending order
+        limit: Maximum number of experiments to return
+        backend: Already initialised backend to reuse (e.g. held by the daemon)
+
+    Returns:
+        Dictionary with the matching experiments, metrics parsed into a dict
+    """
+    if backend is None:
+        backend = create_backend()
+        backend.ensure_memory_directory()
+
+    results = {
+        "conditions": conditions or [],
+        "sort": sort,
+        "experiments": [],
+        "summary": "",
+        "timestamp": backend._get_timestamp()
+    }
+
+    parsed = _parse_experiment_conditions(conditions or [])
+    if backend.storage != "files":
+        experiments = backend.query_experiments(parsed, sort, descending, limit)
+    else:
+        experiments = _query_experiment_store(backend, parsed, sort, descending, limit)
+        if experiments is None:
+            results["summary"] = "No experiments recorded"
+            return results
+
+    results["experiments"] = experiments
+    if results["experiments"]:
+        results["summary"] = f"Found {len(results['experiments'])} matching experiments"
+    else:
+        results["summary"] = "No experiments match the conditions"
+
+    return results
+
+
+def _parse_experiment_conditions(conditions: List[str]) -> List[tuple]:
+    """Split "<key><op><value>" conditions into (key, op, value), values numeric where possible."""
+    parsed = []
+    for condition in conditions:
+        match = EXPERIMENT_CONDITION_PATTERN.match(condition)
+        if not match:
+            raise ValueError(f"Invalid condition '{condition}' (expected e.g. r_squared>0.7)")
+        name, operator, value = match.groups()
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+        parsed.append((name, operator, value))
+    return parsed
+
+
+def _query_experiment_store(backend: MemoryBackend, conditions: List[tuple], sort: Optional[str],
+                            descending: bool, limit: Optional[int]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Run query_experiments() on the file backend's experiment store, together
+    with the experiments of sessions still waiting in the journal.
+
+    Returns:
+        The matching experiments, or None if no experiments were ever recorded
+    """
+    update_experiment_store(backend)
+    store_path = backend.memory_dir / CACHE_DIRNAME / EXPERIMENT_STORE_FILENAME
+    journaled = _journal_experiment_rows(backend)
+    if not store_path.exists() and not journaled:
+        return None
+
+    connection = sqlite3.connect(store_path if store_path.exists() else ':memory:')
+    try:
+        if not store_path.exists():
+            connection.execute(f'CREATE TABLE experiments ({", ".join(EXPERIMENT_COLUMNS)})')
+        table, order = 'experiments', 'rowid'
+        columns = _experiment_store_columns(connection)
+        if journaled:
+            columns = _stage_journal_experiments(connection, columns, journaled)
+            table, order = 'all_experiments', 'row_order'
+
+        def resolve(name: str) -> Optional[str]:
+            for column in (name, METRIC_COLUMN_PREFIX + name):
+                if column in columns:
+                    return column
+            return None
+
+        clauses = []
+        parameters = []
+        for name, operator, value in conditions:
+            column = resolve(name)
+            if column is None:
+                # Nobody recorded this metric, so no experiment can satisfy it
+                return []
+            clauses.append(f'{_quote_column(column)} {operator} ?')
+            parameters.append(value)
+
+        sql = f'SELECT {", ".join(map(_quote_column, columns))} FROM {table}'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sort_column = resolve(sort) if sort else None
+        if sort and sort_column is None:
+            print(f"Warning: Unknown sort key '{sort}', keeping file order")
+        if sort_column is not None:
+            quoted = _quote_column(sort_column)
+            sql += f' ORDER BY {quoted} IS NULL, {quoted} {"DESC" if descending else "ASC"}, {order}'
+        else:
+            sql += f' ORDER BY {order}'
+        if limit:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+        rows = connection.execute(sql, parameters).fetchall()
+    finally:
+        connection.close()
+
+    experiments = []
+    for row in rows:
+        experiment = {}
+        metrics = {}
+        for column, value in zip(columns, row):
+            if column.startswith(METRIC_COLUMN_PREFIX):
+                if value is not None:
+                    metrics[column[len(METRIC_COLUMN_PREFIX):]] = value
+            else:
+                experiment[column] = value
+        experiment["metrics"] = metrics
+        experiments.append(experiment)
+    return experiments
+
+
+def _journal_experiment_rows(backend: MemoryBackend) -> List[Dict[str, Any]]:
+    """experiments.csv rows, as dicts, of the sessions waiting in the journal."""
+    rows = []
+    for record in _read_journal(backend):
+        payload = record["payload"]
+        for exp, experiment_id in zip(payload.get('experiments', []), record["experiment_ids"]):
+            row = _experiment_row(record["timestamp"], experiment_id, exp, payload.get('phases', {}))
+            rows.append(dict(zip(EXPERIMENT_CSV_HEADER, row)))
+    return rows
+
+
+def _stage_journal_experiments(connection: sqlite3.Connection, columns: List[str],
+                               rows: List[Dict[str, Any]]) -> List[str]:
+    """
+    Load journaled experiment rows into a temporary table of the store
+    connection, typed like the store, and create the temporary view
+    all_experiments of both in file order (column row_order). Nothing is
+    written to the store itself.
+
+    Returns:
+        The columns of all_experiments
+    """
+    connection.execute('CREATE TEMP TABLE journal_experiments AS SELECT * FROM main.experiments WHERE 0')
+    _store_experiment_rows(connection, rows, "journal_experiments")
+    journal_columns = _experiment_store_columns(connection, "journal_experiments")
+    all_columns = columns + [column for column in journal_columns if column not in columns]
+
+    def select(present: List[str]) -> str:
+        return ', '.join(_quote_column(column) if column in present else f'NULL AS {_quote_column(column)}'
+                         for column in all_columns)
+
+    connection.execute(
+        f'CREATE TEMP VIEW all_experiments AS '
+        f'SELECT {select(columns)}, rowid AS row_order FROM main.experiments UNION ALL '
+        f'SELECT {select(journal_columns)}, rowid + (SELECT COALESCE(MAX(rowid), 0) FROM main.experiments) '
+        f'FROM journal_experiments')
+    return all_columns
+
+
+def create_backend(memory_dir: Optional[str] = None, project_root: Optional[str] = None) -> MemoryBackend:
+    """
+    Create the storage backend selected by the "backend" config option.
+
+    Args:
+        memory_dir: Memory directory (defaults to the configured one)
+        project_root: Project whose config/config.json and memory directory
+            are used (defaults to the current directory)
+
+    Returns:
+        MemoryBackend for "files", SQLiteMemoryBackend for "sqlite"
+    """
+    backend = MemoryBackend(memory_dir, project_root)
+    storage = backend.config.get("backend", "files")
+
+    if storage == "sqlite":
+        return SQLiteMemoryBackend(memory_dir, project_root)
+    if storage != "files":
+        print(f"Warning: Unknown storage backend '{storage}', using 'files'")
+    return backend
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """
+    Memory backend storing sessions, phases, decisions, TODOs and experiments
+    in one SQLite database (memory/memory.sqlite).
+
+    Each session, decision and experiment is also an FTS5-indexed entry with
+    an indexed date and phase list, so query_history() ranks with BM25 and
+    applies date/phase filters inside SQLite. The text of every entry is kept
+    exactly as the file backend would write it, so export_memory_files()
+    regenerates the human-readable files.
+    """
+
+    storage = "sqlite"
+
+    def __init__(self, memory_dir: Optional[str] = None, project_root: Optional[str] = None):
+        super().__init__(memory_dir, project_root)
+        self.database_path = self.memory_dir / MEMORY_DATABASE_FILENAME
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the database, creating its tables (or upgrading them) if needed."""
+        connection = sqlite3.connect(self.database_path, timeout=DAEMON_TIMEOUT_SECONDS)
+        connection.executescript(MEMORY_DATABASE_SCHEMA)
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version < MEMORY_DATABASE_VERSION:
+            with connection:
+                if version < 1:
+                    self._reindex_fts(connection)
+                if version < 2:
+                    self._reindex_metrics(connection)
+                connection.execute(f'PRAGMA user_version = {MEMORY_DATABASE_VERSION}')
+        return connection
+
+    def _reindex_metrics(self, connection: sqlite3.Connection) -> None:
+        """Rebuild experiment_metrics from the metrics text of every stored experiment."""
+        connection.execute('DELETE FROM experiment_metrics')
+        for experiment_ref, metrics in connection.execute('SELECT id, metrics FROM experiments').fetchall():
+            self._insert_metrics(connection, experiment_ref, metrics)
+
+    def _insert_metrics(self, connection: sqlite3.Connection, experiment_ref: int, metrics: Optional[str]) -> None:
+        """Store the parsed metrics of one experiment, numbers as REAL and everything else as TEXT."""
+        connection.executemany('INSERT INTO experiment_metrics VALUES (?, ?, ?)',
+                               [(experiment_ref, key, value) for key, value in _parse_metrics(metrics).items()])
+
+    def _reindex_fts(self, connection: sqlite3.Connection) -> None:
+        """Rebuild the FTS5 text of every entry from the stored sessions, decisions and experiments."""
+        connection.execute('DELETE FROM entries_fts')
+        texts = {
+            "devlog": 'SELECT text FROM sessions WHERE id = ?',
+            "decisions": 'SELECT text FROM decisions WHERE id = ?',
+            "experiments": f'SELECT {", ".join(EXPERIMENT_CSV_HEADER)} FROM experiments WHERE id = ?'
+        }
+        for entry_id, source, ref in connection.execute('SELECT id, source, ref FROM entries').fetchall():
+            row = connection.execute(texts[source], (ref,)).fetchone()
+            if row is not None:
+                content = ' '.join(str(value) for value in row if value is not None)
+                connection.execute('INSERT INTO entries_fts (rowid, content) VALUES (?, ?)',
+                                   (entry_id, ' '.join(_tokenize(content))))
+
+    @_profiled("ensure_memory_directory")
+    def ensure_memory_directory(self):
+        """Create the memory directory and database, seeding the file headers."""
+        self.memory_dir.mkdir(exist_ok=True)
+
+        connection = self.connect()
+        try:
+            with connection:
+                defaults = {
+                    "project-overview.md": self._get_default_project_overview(),
+                    "devlog.md": "# Development Log\n\n",
+                    "decisions.md": "# Key Decisions\n\n",
+                    "experiments.csv": self._get_default_experiments_csv()
+                }
+                connection.executemany('INSERT OR IGNORE INTO documents VALUES (?, ?)', defaults.items())
+                if connection.execute('SELECT COUNT(*) FROM todo_lines').fetchone()[0] == 0:
+                    self._insert_todo_lines(connection, "# TODO Items and Open Questions\n\n".split('\n'))
+        finally:
+            connection.close()
+
+    def bootstrap_context(self) -> Dict[str, Any]:
+        """Bootstrap project context from the database (see bootstrap_context())."""
+        recent_entries_count = self.config["bootstrap"]["recent_entries_count"]
+
+        recent_experiments_count = self.config["bootstrap"].get("recent_experiments_count", 3)
+
+        result = {
+            "project_context": "",
+            "recent_progress": [],
+            "current_todos": [],
+            "todo_summary": {},
+            "recent_experiments": [],
+            "work_plan_suggestions": [],
+            "timestamp": self._get_timestamp()
+        }
+
+        connection = self.connect()
+        try:
+            row = connection.execute(
+                "SELECT content FROM documents WHERE name = 'project-overview.md'").fetchone()
+            result["project_context"] = row[0] if row else ""
+
+            if recent_entries_count > 0:
+                texts = [text for (text,) in connection.execute(
+                    'SELECT text FROM sessions ORDER BY id DESC LIMIT ?', (recent_entries_count,))]
+                content = ''.join(reversed(texts)).replace('\r\n', '\n')
+                entries = RECENT_SESSION_PATTERN.findall(content)
+                result["recent_progress"] = entries[-recent_entries_count:]
+
+            todos = [line.strip() for (line,) in connection.execute(
+                'SELECT line FROM todo_lines WHERE done IS NOT NULL ORDER BY id')]
+            result["todo_summary"] = _summarize_todos(todos)
+            if self.config["bootstrap"]["include_todos"]:
+                result["current_todos"] = todos
+
+            if recent_experiments_count > 0:
+                rows = connection.execute(
+                    f'SELECT {", ".join(EXPERIMENT_CSV_HEADER)} FROM experiments ORDER BY id DESC LIMIT ?',
+                    (recent_experiments_count,)).fetchall()
+                result["recent_experiments"] = [dict(zip(EXPERIMENT_CSV_HEADER, row)) for row in reversed(rows)]
+        finally:
+            connection.close()
+
+        if self.config["bootstrap"]["suggest_work_plan"]:
+            result["work_plan_suggestions"] = _suggest_work_plan(result)
+
+        return result
+
+    def log_session(self, payload: Dict[str, Any]) -> None:
+        """Log a research session in one transaction (see log_session())."""
+        record = {
+            "timestamp": self._get_timestamp(),
+            "experiment_ids": [self._generate_experiment_id() for _ in payload.get('experiments', [])],
+            "payload": payload
+        }
+        timestamp = record["timestamp"]
+        appends, todos_update = _render_session(self, record)
+        phases = payload.get('phases', {})
+
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+
+                session_phases = {phase: phases[phase] for phase in self.config["logging"]["phase_sections"]
+                                  if phase in phases and phases[phase]}
+                self._insert_session(connection, timestamp, payload.get('session_goal', 'Not specified'),
+                                     payload.get('changes_summary', 'No changes recorded'),
+                                     session_phases, appends["devlog.md"])
+
+                for block, decision in zip(_split_dated_blocks(appends.get("decisions.md", ""))[1],
+                                           payload.get('decisions', [])):
+                    self._insert_decision(connection, timestamp, decision.get('decision', ''),
+                                          decision.get('rationale', ''),
+                                          ', '.join(decision.get('alternatives_considered', [])), block)
+
+                for exp, experiment_id in zip(payload.get('experiments', []), record["experiment_ids"]):
+                    fields = _experiment_row(timestamp, experiment_id, exp, phases)
+                    text = io.StringIO()
+                    csv.writer(text, delimiter=self.csv_delimiter).writerow(fields)
+                    self._insert_experiment(connection, dict(zip(EXPERIMENT_CSV_HEADER, fields)), text.getvalue())
+
+                if todos_update is not None:
+                    self._apply_todos_update(connection, *todos_update)
+        finally:
+            connection.close()
+
+    def query_candidates(self, query: str, filters: Dict[str, Any]) -> Iterator[Any]:
+        """
+        Yield match builders from the FTS5 index (see query_history()).
+
+        Matches are whole sessions, decisions and experiment rows ranked by
+        BM25. The FTS text holds _tokenize() tokens, so CJK bigrams match
+        exactly; other keywords also match words they are a prefix of. The
+        ranking and unit filters do not apply. Rows are fetched from SQLite
+        as the builders are consumed.
+        """
+        include_context = self.config["search"]["include_context"]
+        keywords = _query_keywords(query)
+        if not keywords:
+            return
+
+        sql = ('SELECT entries.source, entries.ref, -bm25(entries_fts) AS score '
+               'FROM entries_fts JOIN entries ON entries.id = entries_fts.rowid '
+               'WHERE entries_fts MATCH ?')
+        parameters = [' OR '.join(f'"{keyword}"' if _is_cjk_ngram(keyword) else f'"{keyword}"*'
+                                  for keyword in keywords)]
+
+        if filters.get('type'):
+            sql += ' AND entries.source = ?'
+            parameters.append(filters['type'])
+        # Entries without a date are kept, as with the file backend
+        if filters.get('from_date'):
+            sql += ' AND (entries.date IS NULL OR entries.date >= ?)'
+            parameters.append(filters['from_date'])
+        if filters.get('to_date'):
+            sql += ' AND (entries.date IS NULL OR entries.date <= ?)'
+            parameters.append(filters['to_date'])
+        if filters.get('phase'):
+            sql += ' AND entries.id IN (SELECT entry_id FROM entry_phases WHERE phase = ?)'
+            parameters.append(filters['phase'].lower())
+
+        sql += ' ORDER BY score DESC, entries.id'
+
+        connection = self.connect()
+        try:
+            for source, ref, score in connection.execute(sql, parameters):
+                yield partial(self._build_match, connection, source, ref, round(score, 4), include_context)
+        finally:
+            connection.close()
+
+    def _build_match(self, connection: sqlite3.Connection, source: str, ref: int,
+                     relevance: float, include_context: bool) -> Dict[str, Any]:
+        """Build a search match for one session, decision or experiment row."""
+        if source == "experiments":
+            connection.row_factory = sqlite3.Row
+            try:
+                row = connection.execute('SELECT * FROM experiments WHERE id = ?', (ref,)).fetchone()
+            finally:
+                connection.row_factory = None
+            return _csv_row_match(dict(row), ref, relevance, source)
+
+        table = "sessions" if source == "devlog" else "decisions"
+        timestamp, text = connection.execute(f'SELECT timestamp, text FROM {table} WHERE id = ?', (ref,)).fetchone()
+        match = {
+            "source": source,
+            "id": ref,
+            "timestamp": timestamp,
+            "relevance": relevance,
+            "content": text.strip().split('\n', 1)[0]
+        }
+        if include_context:
+            match["context"] = text.strip()
+        return match
+
+    def query_experiments(self, conditions: List[tuple], sort: Optional[str], descending: bool,
+                          limit: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Filter and sort experiments on typed metric values (see query_experiments()).
+
+        Metrics are looked up in experiment_metrics, whose values keep the
+        type _parse_metrics() gave them, so comparisons behave as on the
+        typed columns of the file backend's experiment store.
+        """
+        connection = self.connect()
+        try:
+            def resolve(name: str) -> Optional[str]:
+                """"column" for a column, "metric" for a recorded metric key, None if unknown."""
+                if name in EXPERIMENT_COLUMNS:
+                    return "column"
+                if connection.execute('SELECT 1 FROM experiment_metrics WHERE key = ? LIMIT 1',
+                                      (name,)).fetchone():
+                    return "metric"
+                return None
+
+            clauses = []
+            parameters = []
+            for name, operator, value in conditions:
+                kind = resolve(name)
+                if kind is None:
+                    # Nobody recorded this metric, so no experiment can satisfy it
+                    return []
+                if kind == "column":
+                    clauses.append(f'experiments.{_quote_column(name)} {operator} ?')
+                    parameters.append(value)
+                else:
+                    clauses.append('experiments.id IN (SELECT experiment_ref FROM experiment_metrics '
+                                   f'WHERE key = ? AND value {operator} ?)')
+                    parameters.extend([name, value])
+
+            columns = ', '.join(f'experiments.{_quote_column(column)}' for column in EXPERIMENT_COLUMNS)
+            sql = f'SELECT experiments.id, {columns} FROM experiments'
+            sort_kind = resolve(sort) if sort else None
+            if sort and sort_kind is None:
+                print(f"Warning: Unknown sort key '{sort}', keeping file order")
+            if sort_kind == "metric":
+                sql += (' LEFT JOIN experiment_metrics AS sort_metric ON sort_metric.experiment_ref = experiments.id'
+                        ' AND sort_metric.key = ?')
+                parameters.insert(0, sort)
+                sort_value = 'sort_metric.value'
+            elif sort_kind == "column":
+                sort_value = f'experiments.{_quote_column(sort)}'
+            if clauses:
+                sql += ' WHERE ' + ' AND '.join(clauses)
+            if sort_kind is not None:
+                sql += f' ORDER BY {sort_value} IS NULL, {sort_value} {"DESC" if descending else "ASC"}, experiments.id'
+            else:
+                sql += ' ORDER BY experiments.id'
+            if limit:
+                sql += ' LIMIT ?'
+                parameters.append(limit)
+
+            experiments = []
+            for experiment_ref, *values in connection.execute(sql, parameters).fetchall():
+                experiment = dict(zip(EXPERIMENT_COLUMNS, values))
+                experiment["metrics"] = dict(connection.execute(
+                    'SELECT key, value FROM experiment_metrics WHERE experiment_ref = ? ORDER BY rowid',
+                    (experiment_ref,)).fetchall())
+                experiments.append(experiment)
+            return experiments
+        finally:
+            connection.close()
+
+    def _add_entry(self, connection: sqlite3.Connection, source: str, ref: int,
+                   date: Optional[str], phases: List[str], content: str) -> None:
+        """Register a searchable entry with its date, phases and FTS text."""
+        entry_id = connection.execute('INSERT INTO entries (source, ref, date) VALUES (?, ?, ?)',
+                                      (source, ref, date)).lastrowid
+        connection.executemany('INSERT INTO entry_phases VALUES (?, ?)',
+                               [(entry_id, phase.lower()) for phase in phases])
+        # Pre-tokenized, so CJK text is indexed as the same bigrams queries use
+        connection.execute('INSERT INTO entries_fts (rowid, content) VALUES (?, ?)',
+                           (entry_id, ' '.join(_tokenize(content))))
+
+    def _insert_session(self, connection: sqlite3.Connection, timestamp: str, goal: Optional[str],
+                        changes_summary: Optional[str], phases: Dict[str, str], text: str) -> None:
+        """Store one devlog session with its phase sections."""
+        date = timestamp[:10] or None
+        session_id = connection.execute(
+            'INSERT INTO sessions (timestamp, date, goal, changes_summary, text) VALUES (?, ?, ?, ?, ?)',
+            (timestamp, date, goal, changes_summary, text)).lastrowid
+        connection.executemany('INSERT INTO phases VALUES (?, ?, ?)',
+                               [(session_id, phase.lower(), phase_text) for phase, phase_text in phases.items()])
+        self._add_entry(connection, "devlog", session_id, date, list(phases), text)
+
+    def _insert_decision(self, connection: sqlite3.Connection, timestamp: str, decision: Optional[str],
+                         rationale: Optional[str], alternatives: Optional[str], text: str) -> None:
+        """Store one decision block."""
+        date = timestamp[:10] or None
+        decision_id = connection.execute(
+            'INSERT INTO decisions (timestamp, date, decision, rationale, alternatives, text) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (timestamp, date, decision, rationale, alternatives, text)).lastrowid
+        self._add_entry(connection, "decisions", decision_id, date, [], text)
+
+    def _insert_experiment(self, connection: sqlite3.Connection, row: Dict[str, Any], text: str) -> None:
+        """Store one experiments.csv row (`text` is its CSV line)."""
+        fields = [row.get(field) for field in EXPERIMENT_CSV_HEADER]
+        date = (row.get("timestamp") or "")[:10] or None
+        experiment_ref = connection.execute(
+            f'INSERT INTO experiments (date, text, {", ".join(EXPERIMENT_CSV_HEADER)}) '
+            f'VALUES (?, ?, {", ".join("?" for _ in fields)})',
+            [date, text] + fields).lastrowid
+        self._insert_metrics(connection, experiment_ref, row.get("metrics"))
+        phases = [phase.strip() for phase in (row.get("research_phase") or "").split(',') if phase.strip()]
+        content = ' '.join(str(value) for value in row.values() if value is not None)
+        self._add_entry(connection, "experiments", experiment_ref, date, phases, content)
+
+    def _insert_todo_lines(self, connection: sqlite3.Connection, lines: List[str]) -> None:
+        """Append todos.md lines, recording which are open or completed TODO items."""
+        rows = []
+        for line in lines:
+            line_stripped = line.strip()
+            text = None
+            done = None
+            if TODO_LINE_PATTERN.match(line):
+                done = int('[x]' in line_stripped[:line_stripped.index(']') + 1])
+            if OPEN_TODO_PATTERN.match(line_stripped):
+                text = OPEN_TODO_PREFIX_PATTERN.sub('', line_stripped, count=1)
+                done = 0
+            rows.append((line, text, done))
+        connection.executemany('INSERT INTO todo_lines (line, text, done) VALUES (?, ?, ?)', rows)
+
+    def _apply_todos_update(self, connection: sqlite3.Connection, new_todos: List[Dict[str, Any]],
+                            completed_todos: List[Dict[str, Any]], timestamp: str) -> None:
+        """Apply a todos update to the stored lines, as _apply_todo_changes() does to todos.md."""
+        if completed_todos:
+            texts = {completed_todo.get('text', '').strip() for completed_todo in completed_todos}
+            for text in texts:
+                for line_id, line in connection.execute(
+                        'SELECT id, line FROM todo_lines WHERE done = 0 AND text = ?', (text,)).fetchall():
+                    updated = self._apply_todo_changes(line, [], completed_todos, timestamp)
+                    connection.execute('UPDATE todo_lines SET line = ?, text = NULL, done = 1 WHERE id = ?',
+                                       (updated, line_id))
+
+        if new_todos:
+            # The section starts with a newline, i.e. an empty first piece
+            # that continues the current last line
+            lines = self._apply_todo_changes("", new_todos, [], timestamp).split('\n')
+            if connection.execute('SELECT 1 FROM todo_lines LIMIT 1').fetchone():
+                lines = lines[1:]
+            self._insert_todo_lines(connection, lines)
+
+
+# Fields of a devlog session block read back by import_memory_files()
+SESSION_GOAL_PATTERN = re.compile(r'^\*\*Session Goal\*\*: ?(.*)$', re.MULTILINE)
+CHANGES_SUMMARY_PATTERN = re.compile(r'^\*\*Changes Summary\*\*: ?(.*)$', re.MULTILINE)
+PHASE_SECTION_PATTERN = re.compile(r'^### (\S+)[^\n]*\n(.*?)(?=^#{2,3} |^---|\Z)', re.MULTILINE | re.DOTALL)
+
+
+def _split_dated_blocks(content: str) -> tuple:
+    """
+    Split devlog.md / decisions.md content at its dated "## YYYY-MM-DD" headers.
+
+    Returns:
+        Tuple of (text before the first header, list of blocks); joined
+        together they give back `content`
+    """
+    starts = [m.start() for m in DATED_HEADER_PATTERN.finditer(content)]
+    if not starts:
+        return content, []
+    bounds = starts + [len(content)]
+    return content[:starts[0]], [content[bounds[i]:bounds[i + 1]] for i in range(len(starts))]
+
+
+def import_memory_files(backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """
+    Build the SQLite database from the markdown/CSV memory files.
+
+    The database is rebuilt from scratch in a temporary file and swapped in,
+    replacing any existing one.
+
+    Args:
+        backend: File backend owning the memory files
+
+    Returns:
+        Number of records imported per table
+    """
+    if backend is None:
+        backend = MemoryBackend()
+    backend.ensure_memory_directory()
+
+    target = SQLiteMemoryBackend(str(backend.memory_dir))
+    database_path = target.database_path
+    target.database_path = _temporary_path(database_path)
+    if target.database_path.exists():
+        target.database_path.unlink()
+
+    def read(filename: str) -> str:
+        with open(backend.memory_dir / filename, 'r', encoding=backend.encoding, newline='') as f:
+            return f.read()
+
+    phase_names = {phase.lower(): phase for phase in backend.config["logging"]["phase_sections"]}
+    counts = {}
+
+    with backend.lock():
+        connection = target.connect()
+        try:
+            with connection:
+                preamble, blocks = _split_dated_blocks(read("devlog.md"))
+                connection.execute('INSERT INTO documents VALUES (?, ?)', ("project-overview.md", read("project-overview.md")))
+                connection.execute('INSERT INTO documents VALUES (?, ?)', ("devlog.md", preamble))
+                for block in blocks:
+                    goal = SESSION_GOAL_PATTERN.search(block)
+                    summary = CHANGES_SUMMARY_PATTERN.search(block)
+                    phases = {}
+                    for m in PHASE_SECTION_PATTERN.finditer(block):
+                        if m.group(1).lower() in phase_names:
+                            phases[phase_names[m.group(1).lower()]] = m.group(2).strip()
+                    target._insert_session(connection, block.split('\n', 1)[0][3:].strip(),
+                                           goal.group(1) if goal else None,
+                                           summary.group(1) if summary else None, phases, block)
+                counts["sessions"] = len(blocks)
+
+                preamble, blocks = _split_dated_blocks(read("decisions.md"))
+                connection.execute('INSERT INTO documents VALUES (?, ?)', ("decisions.md", preamble))
+                for block in blocks:
+                    fields = [re.search(rf'^\*\*{label}\*\*: ?(.*)$', block, re.MULTILINE)
+                              for label in ("Decision", "Rationale", "Alternatives Considered")]
+                    target._insert_decision(connection, block.split('\n', 1)[0][3:].strip(),
+                                            *[field.group(1) if field else None for field in fields], block)
+                counts["decisions"] = len(blocks)
+
+                # Keep each row's raw CSV text so the export reproduces it
+                consumed = []
+
+                def csv_lines(f):
+                    for line in f:
+                        consumed.append(line)
+                        yield line
+
+                with open(backend.memory_dir / "experiments.csv", 'r', encoding=backend.encoding, newline='') as f:
+                    reader = csv.DictReader(csv_lines(f), delimiter=backend.csv_delimiter)
+                    # Reading fieldnames consumes the header line
+                    reader.fieldnames
+                    header = ''.join(consumed)
+                    consumed.clear()
+                    counts["experiments"] = 0
+                    for row in reader:
+                        target._insert_experiment(connection, row, ''.join(consumed))
+                        consumed.clear()
+                        counts["experiments"] += 1
+                connection.execute('INSERT INTO documents VALUES (?, ?)', ("experiments.csv", header))
+                if consumed:
+                    # Blank lines after the last row
+                    connection.execute("UPDATE experiments SET text = text || ? WHERE id = (SELECT MAX(id) FROM experiments)",
+                                       (''.join(consumed),))
+
+                lines = backend._read_todos_file().split('\n')
+                target._insert_todo_lines(connection, lines)
+                counts["todo_lines"] = len(lines)
+        finally:
+            connection.close()
+        os.replace(target.database_path, database_path)
+
+    return counts
+
+
+def export_memory_files(backend: Optional[MemoryBackend] = None,
+                        output_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Regenerate the markdown/CSV memory files from the SQLite database.
+
+    Args:
+        backend: Backend whose memory directory holds the database
+        output_dir: Directory to write the files to (defaults to the memory
+            directory, replacing the files there)
+
+    Returns:
+        Paths of the files written
+    """
+    if backend is None:
+        backend = MemoryBackend()
+    source = backend if isinstance(backend, SQLiteMemoryBackend) else SQLiteMemoryBackend(str(backend.memory_dir))
+    if not source.database_path.exists():
+        raise RuntimeError(f"No memory database at {source.database_path}")
+
+    output_path = Path(output_dir) if output_dir else source.memory_dir
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    connection = source.connect()
+    try:
+        documents = dict(connection.execute('SELECT name, content FROM documents'))
+        contents = {
+            "project-overview.md": documents.get("project-overview.md", ""),
+            "devlog.md": documents.get("devlog.md", "") + ''.join(
+                text for (text,) in connection.execute('SELECT text FROM sessions ORDER BY id')),
+            "decisions.md": documents.get("decisions.md", "") + ''.join(
+                text for (text,) in connection.execute('SELECT text FROM decisions ORDER BY id')),
+            "experiments.csv": documents.get("experiments.csv", "") + ''.join(
+                text for (text,) in connection.execute('SELECT text FROM experiments ORDER BY id')),
+            "todos.md": '\n'.join(line for (line,) in connection.execute('SELECT line FROM todo_lines ORDER BY id'))
+        }
+    finally:
+        connection.close()
+
+    written = []
+    for filename, content in contents.items():
+        _write_file_atomic(output_path / filename, content, source.encoding)
+        written.append(str(output_path / filename))
+
+    return {"files": written}
+
+
+def _segment_name(date: str) -> str:
+    """Archive segment (calendar quarter, e.g. "2025Q4") of a YYYY-MM-DD date."""
+    return f"{date[:4]}Q{(int(date[5:7]) - 1) // 3 + 1}"
+
+
+def _archive_cutoff(backend: MemoryBackend) -> str:
+    """Date before which entries are archived under the archive.keep_days policy."""
+    keep_days = backend.config.get("archive", {}).get("keep_days", 365)
+    return (datetime.now(timezone.utc) - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+
+
+def _oldest_entry_date(backend: MemoryBackend) -> Optional[str]:
+    """Date of the oldest session, decision or experiment row, reading only the head of each file."""
+    dates = []
+    for filename in SEARCH_SOURCES.values():
+        try:
+            with open(backend.memory_dir / filename, 'rb') as f:
+                head = f.read(ARCHIVE_HEAD_SIZE).decode(backend.encoding, errors='replace')
+        except OSError:
+            continue
+
+        if filename.endswith('.csv'):
+            lines = head.splitlines()
+            date = (lines[1] if len(lines) > 1 else '')[:10]
+            if re.fullmatch(r'\d{4}-\d{2}-\d{2}', date):
+                dates.append(date)
+        else:
+            header = DATED_HEADER_PATTERN.search(head)
+            if header:
+                dates.append(header.group()[3:13])
+    return min(dates) if dates else None
+
+
+def _split_csv_rows(text: str, delimiter: str) -> tuple:
+    """
+    Split experiments.csv content into its header line and rows.
+
+    Returns:
+        Tuple of (header text, list of (row dict, raw row text)); joined
+        together the texts give back `text`
+    """
+    consumed = []
+
+    def csv_lines():
+        for line in io.StringIO(text, newline=''):
+            consumed.append(line)
+            yield line
+
+    reader = csv.DictReader(csv_lines(), delimiter=delimiter)
+    # Reading fieldnames consumes the header line
+    reader.fieldnames
+    header = ''.join(consumed)
+    consumed.clear()
+
+    rows = []
+    for row in reader:
+        rows.append((row, ''.join(consumed)))
+        consumed.clear()
+    if consumed and rows:
+        # Blank lines after the last row
+        rows[-1] = (rows[-1][0], rows[-1][1] + ''.join(consumed))
+    return header, rows
+
+
+def _segment_backend(backend: MemoryBackend, segment_dir: Path) -> MemoryBackend:
+    """
+    A file backend on an archive segment, so it is indexed and searched like
+    the memory directory, with the settings (encoding, CSV delimiter, search
+    options) of the project owning it.
+    """
+    return MemoryBackend(str(segment_dir), backend.project_root, backend.config)
+
+
+def _segment_file(segment_dir: Path, filename: str) -> Optional[Path]:
+    """Path of a segment's copy of a memory file, plain or compressed, or None if it has none."""
+    for file_path in (segment_dir / filename, segment_dir / (filename + COMPRESSED_SUFFIX)):
+        if file_path.exists():
+            return file_path
+    return None
+
+
+def _open_segment_file(file_path: Path, encoding: str):
+    """Open a segment file for reading as text, decompressing gzipped files as they are read."""
+    if file_path.name.endswith(COMPRESSED_SUFFIX):
+        return gzip.open(file_path, 'rt', encoding=encoding)
+    return open(file_path, 'r', encoding=encoding)
+
+
+def _segment_fingerprints(segment_dir: Path) -> Dict[str, Optional[List[int]]]:
+    fingerprints = {}
+    for filename in SEARCH_SOURCES.values():
+        file_path = _segment_file(segment_dir, filename)
+        fingerprints[filename] = _file_fingerprint(file_path) if file_path is not None else None
+    return fingerprints
+
+
+def _bloom_grams(term: str) -> List[str]:
+    """
+    Grams a term is looked up by in a segment's Bloom filter: the term itself
+    if it is short, else its character trigrams. Keywords match every token
+    they are a substring of, and all grams of such a keyword are grams of
+    the token, so a missing gram rules the keyword out.
+    """
+    if len(term) <= BLOOM_GRAM_SIZE:
+        return [term]
+    return [term[i:i + BLOOM_GRAM_SIZE] for i in range(len(term) - BLOOM_GRAM_SIZE + 1)]
+
+
+def _bloom_positions(gram: str, bits: int, hashes: int) -> List[int]:
+    digest = hashlib.blake2b(gram.encode('utf-8'), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], 'little')
+    second = int.from_bytes(digest[8:], 'little') | 1
+    return [(first + i * second) % bits for i in range(hashes)]
+
+
+def _build_bloom_filter(tokens) -> Dict[str, Any]:
+    """Bloom filter over every substring of up to BLOOM_GRAM_SIZE characters of the tokens."""
+    grams = set()
+    for token in tokens:
+        for size in range(1, min(len(token), BLOOM_GRAM_SIZE) + 1):
+            grams.update(token[i:i + size] for i in range(len(token) - size + 1))
+
+    count = max(len(grams), 1)
+    bits = max(64, math.ceil(-count * math.log(BLOOM_FALSE_POSITIVE_RATE) / math.log(2) ** 2))
+    bits += -bits % 8
+    hashes = max(1, round(bits / count * math.log(2)))
+
+    bitmap = bytearray(bits // 8)
+    for gram in grams:
+        for position in _bloom_positions(gram, bits, hashes):
+            bitmap[position >> 3] |= 1 << (position & 7)
+
+    return {"bits": bits, "hashes": hashes, "data": base64.b64encode(bytes(bitmap)).decode('ascii')}
+
+
+def _bloom_may_contain(bloom: Dict[str, Any], keywords: List[str]) -> bool:
+    """Whether any keyword can occur in the text a Bloom filter was built from (false positives aside)."""
+    bitmap = base64.b64decode(bloom["data"])
+    return any(all(bitmap[position >> 3] & (1 << (position & 7))
+                   for gram in _bloom_grams(keyword)
+                   for position in _bloom_positions(gram, bloom["bits"], bloom["hashes"]))
+               for keyword in keywords)
+
+
+def _summarize_segment(backend: MemoryBackend, segment_dir: Path) -> Dict[str, Any]:
+    """
+    Describe an archive segment: its date range, entries per file, the
+    research phases its text mentions (the test the phase filter applies)
+    and a Bloom filter of its terms. Compressed files are read as a stream.
+    """
+    fingerprints = _segment_fingerprints(segment_dir)
+    dates = []
+    entries = {}
+    phases = set()
+    tokens = set()
+    phase_names = [phase.lower() for phase in backend.config["logging"]["phase_sections"]]
+    compressed = False
+
+    for filename in SEARCH_SOURCES.values():
+        file_path = _segment_file(segment_dir, filename)
+        entries[filename] = 0
+        if file_path is None:
+            continue
+        compressed = compressed or file_path.name.endswith(COMPRESSED_SUFFIX)
+
+        with _open_segment_file(file_path, backend.encoding) as f:
+            if filename.endswith('.csv'):
+                for row in csv.DictReader(f, delimiter=backend.csv_delimiter):
+                    entries[filename] += 1
+                    date = _row_date(row)
+                    if date:
+                        dates.append(date)
+                    row_text = ' '.join(str(value) for value in row.values()).lower()
+                    tokens.update(_tokenize(row_text))
+                    phases.update(phase for phase in phase_names if phase in row_text)
+            else:
+                for line in f:
+                    if DATED_HEADER_PATTERN.match(line):
+                        entries[filename] += 1
+                        dates.append(line[3:13])
+                    line_lower = line.lower()
+                    tokens.update(_tokenize(line_lower))
+                    phases.update(phase for phase in phase_names if phase in line_lower)
+
+    return {
+        "segment": segment_dir.name,
+        "from_date": min(dates) if dates else None,
+        "to_date": max(dates) if dates else None,
+        "entries": entries,
+        "phases": sorted(phases),
+        "compressed": compressed,
+        "bloom": _build_bloom_filter(tokens),
+        "fingerprints": fingerprints
+    }
+
+
+def load_segment_summaries(backend: MemoryBackend) -> List[Dict[str, Any]]:
+    """
+    Return the summaries of all archive segments, newest first.
+
+    A summary whose fingerprints no longer match the segment files (e.g.
+    after a hand edit) is recomputed and saved.
+    """
+    archive_dir = backend.memory_dir / ARCHIVE_DIRNAME
+    if not archive_dir.is_dir():
+        return []
+
+    summaries = []
+    for segment_dir in sorted(path for path in archive_dir.iterdir() if path.is_dir()):
+        summary_path = segment_dir / SEGMENT_SUMMARY_FILENAME
+        try:
+            with open(summary_path, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            summary = None
+
+        if not isinstance(summary, dict) or summary.get("fingerprints") != _segment_fingerprints(segment_dir):
+            summary = _summarize_segment(backend, segment_dir)
+            try:
+                _write_file_atomic(summary_path, json.dumps(summary, ensure_ascii=False, indent=2), 'utf-8')
+            except OSError as e:
+                print(f"Warning: Could not save archive segment summary: {e}")
+        summaries.append(summary)
+
+    return sorted(summaries, key=lambda summary: summary["to_date"] or "", reverse=True)
+
+
+def _archive_candidates(backend: MemoryBackend, query: str, filters: Dict[str, Any]) -> Iterator[Any]:
+    """
+    Yield match builders from the archive segments, newest segment first.
+
+    Segments whose date range, phases or files rule out every match under
+    the filters, or whose Bloom filter rules out every keyword, are skipped
+    without being read.
+    """
+    from_date = filters.get('from_date')
+    to_date = filters.get('to_date')
+    phase_filter = filters.get('phase')
+    type_filter = filters.get('type')
+    keywords = _query_keywords(query)
+
+    for summary in load_segment_summaries(backend):
+        if from_date and summary["to_date"] and summary["to_date"] < from_date:
+            continue
+        if to_date and summary["from_date"] and summary["from_date"] > to_date:
+            continue
+        if phase_filter and phase_filter.lower() not in summary["phases"]:
+            continue
+        if type_filter and not summary["entries"].get(SEARCH_SOURCES.get(type_filter), 0):
+            continue
+        if "bloom" in summary and not _bloom_may_contain(summary["bloom"], keywords):
+            continue
+
+        segment_dir = backend.memory_dir / ARCHIVE_DIRNAME / summary["segment"]
+        if summary.get("compressed"):
+            candidates = _compressed_candidates(backend, segment_dir, keywords, filters)
+        else:
+            candidates = _query_candidates(_segment_backend(backend, segment_dir), query, filters)
+        for build in candidates:
+            yield partial(_archived_match, build, summary["segment"])
+
+
+def _compressed_candidates(backend: MemoryBackend, segment_dir: Path, keywords: List[str],
+                           filters: Dict[str, Any]) -> Iterator[Any]:
+    """
+    Scan a compressed segment's files as they are decompressed and yield
+    match builders in relevance order.
+
+    Compressed segments have no search index, so matches are single lines
+    or rows ranked by keyword count whatever the ranking and unit options.
+    """
+    include_context = backend.config["search"]["include_context"]
+    context_lines = backend.config["search"]["context_lines"]
+    type_filter = filters.get('type')
+    scope = _SearchScope(filters.get('from_date'), filters.get('to_date'), filters.get('phase'))
+
+    candidates = []
+    for source_type, filename in SEARCH_SOURCES.items():
+        if type_filter and type_filter != source_type:
+            continue
+        file_path = _segment_file(segment_dir, filename)
+        if file_path is None:
+            continue
+
+        with _open_segment_file(file_path, backend.encoding) as f:
+            if source_type == "experiments":
+                matches = _search_csv_rows(csv.DictReader(f, delimiter=backend.csv_delimiter),
+                                           keywords, source_type, scope)
+            else:
+                matches = _search_lines(f, keywords, source_type, include_context, context_lines, scope)
+        candidates.extend((match["relevance"], partial(dict, match)) for match in matches)
+
+    # sorted() is stable, so ties keep their original order
+    for _, build in sorted(candidates, key=lambda candidate: -candidate[0]):
+        yield build
+
+
+def _archived_sessions(backend: MemoryBackend, count: int) -> List[str]:
+    """
+    The last `count` devlog sessions in the archive, oldest first, read from
+    the newest segments (compressed ones through streaming decompression).
+    """
+    sessions: List[str] = []
+    for summary in load_segment_summaries(backend):
+        if len(sessions) >= count:
+            break
+        file_path = _segment_file(backend.memory_dir / ARCHIVE_DIRNAME / summary["segment"], "devlog.md")
+        if file_path is None:
+            continue
+
+        tail: deque = deque(maxlen=count - len(sessions))
+        with _open_segment_file(file_path, backend.encoding) as f:
+            for section in _iter_sections(f):
+                if DATED_HEADER_PATTERN.match(section[0]):
+                    tail.append(''.join(section))
+        sessions = list(tail) + sessions
+    return sessions
+
+
+def _archived_match(build, segment: str) -> Dict[str, Any]:
+    """Build a match from an archive segment, recording the segment it came from."""
+    match = build()
+    match["archive"] = segment
+    return match
+
+
+def archive_memory(before: Optional[str] = None, backend: Optional[MemoryBackend] = None,
+                   compress: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Move sessions, decisions and experiment rows dated before a cutoff out
+    of the memory files into quarterly archive segments.
+
+    Args:
+        before: Cutoff date (YYYY-MM-DD); defaults to archive.keep_days ago
+        backend: File backend owning the memory files
+        compress: Gzip every segment that is not compressed yet (defaults
+            to archive.compress)
+
+    Returns:
+        Dictionary with the cutoff, entries moved per file, the segments
+        written and the segments compressed
+    """
+    if backend is None:
+        backend = create_backend()
+    if backend.storage != "files":
+        raise ValueError("Archiving is only supported by the files backend")
+
+    if before is None:
+        before = _archive_cutoff(backend)
+    datetime.strptime(before, '%Y-%m-%d')
+    if compress is None:
+        compress = backend.config.get("archive", {}).get("compress", False)
+
+    backend.ensure_memory_directory()
+    with backend.lock():
+        return _archive_locked(backend, before, compress)
+
+
+def _compress_segment(segment_dir: Path) -> bool:
+    """
+    Gzip the plain files of an archive segment, each replacing its plain
+    copy only once fully written.
+
+    Returns:
+        Whether any file was compressed
+    """
+    compressed = False
+    for filename in SEARCH_SOURCES.values():
+        plain_path = segment_dir / filename
+        if not plain_path.exists():
+            continue
+
+        compressed_path = segment_dir / (filename + COMPRESSED_SUFFIX)
+        tmp_path = _temporary_path(compressed_path)
+        with open(plain_path, 'rb') as source, open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(filename=filename, mode='wb', fileobj=raw, mtime=0) as f:
+                shutil.copyfileobj(source, f)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, compressed_path)
+        plain_path.unlink()
+        compressed = True
+
+    if compressed:
+        # The segment's search index points into the plain files
+        shutil.rmtree(segment_dir / CACHE_DIRNAME, ignore_errors=True)
+    return compressed
+
+
+def _expand_segment(segment_dir: Path) -> bool:
+    """
+    Decompress a segment's gzipped files back to plain files, e.g. before appending to them.
+
+    Returns:
+        Whether any file was decompressed
+    """
+    expanded = False
+    for filename in SEARCH_SOURCES.values():
+        compressed_path = segment_dir / (filename + COMPRESSED_SUFFIX)
+        if not compressed_path.exists():
+            continue
+
+        plain_path = segment_dir / filename
+        tmp_path = _temporary_path(plain_path)
+        with gzip.open(compressed_path, 'rb') as source, open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(source, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, plain_path)
+        compressed_path.unlink()
+        expanded = True
+    return expanded
+
+
+def _archive_locked(backend: MemoryBackend, before: str, compress: bool = False) -> Dict[str, Any]:
+    """Archive entries dated before `before`, then compress segments if asked. Caller must hold lock()."""
+    moved: Dict[str, Dict[str, List[str]]] = {}
+    kept: Dict[str, str] = {}
+    headers: Dict[str, str] = {}
+    archived = {filename: 0 for filename in SEARCH_SOURCES.values()}
+
+    for filename in SEARCH_SOURCES.values():
+        file_path = backend.memory_dir / filename
+        if not file_path.exists():
+            continue
+        with open(file_path, 'r', encoding=backend.encoding, newline='') as f:
+            content = f.read()
+
+        if filename.endswith('.csv'):
+            header, rows = _split_csv_rows(content, backend.csv_delimiter)
+            units = [(_row_date(row), text) for row, text in rows]
+        else:
+            header, blocks = _split_dated_blocks(content)
+            units = [(block[3:13], block) for block in blocks]
+        headers[filename] = header
+
+        remaining = [header]
+        for date, text in units:
+            if date is not None and date < before:
+                moved.setdefault(_segment_name(date), {}).setdefault(filename, []).append(text)
+                archived[filename] += 1
+            else:
+                remaining.append(text)
+        if archived[filename]:
+            kept[filename] = ''.join(remaining)
+
+    archive_dir = backend.memory_dir / ARCHIVE_DIRNAME
+    result = {"before": before, "archived": archived, "segments": sorted(moved), "compressed": []}
+    expanded = []
+    if kept:
+        expanded = _move_to_segments(backend, archive_dir, moved, kept, headers, index=not compress)
+
+    # Segments that were compressed before they were appended to stay compressed
+    if compress and archive_dir.is_dir():
+        to_compress = sorted(path for path in archive_dir.iterdir() if path.is_dir())
+    else:
+        to_compress = [archive_dir / segment for segment in expanded]
+    for segment_dir in to_compress:
+        if _compress_segment(segment_dir):
+            result["compressed"].append(segment_dir.name)
+
+    if kept or result["compressed"]:
+        load_segment_summaries(backend)
+
+    if kept:
+        # The memory files shrank, so their derived data is rebuilt
+        try:
+            if _maintains_search_index(backend):
+                update_search_index(backend)
+            update_devlog_sections(backend)
+            update_experiment_store(backend)
+            if backend.config["bootstrap"].get("snapshot", True):
+                update_bootstrap_snapshot(backend)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Could not update derived data after archiving: {e}")
+
+    return result
+
+
+def _move_to_segments(backend: MemoryBackend, archive_dir: Path, moved: Dict[str, Dict[str, List[str]]],
+                      kept: Dict[str, str], headers: Dict[str, str], index: bool = True) -> List[str]:
+    """
+    Append archived entries to their segments, then rewrite the memory files
+    without them and (if `index`) index the plain segments written.
+
+    Returns:
+        The segments that were compressed and had to be decompressed
+    """
+    expanded = []
+    # Segments are written first: a crash before the memory files are
+    # rewritten leaves entries in both places, never in neither
+    for segment, files in sorted(moved.items()):
+        segment_dir = archive_dir / segment
+        segment_dir.mkdir(parents=True, exist_ok=True)
+        if _expand_segment(segment_dir):
+            expanded.append(segment)
+        for filename, texts in files.items():
+            segment_path = segment_dir / filename
+            prefix = backend._append_separator(segment_path) if segment_path.exists() else headers[filename]
+            with open(segment_path, 'a', encoding=backend.encoding, newline='') as f:
+                f.write(prefix + ''.join(texts))
+                f.flush()
+                os.fsync(f.fileno())
+
+    for filename, content in kept.items():
+        _write_file_atomic(backend.memory_dir / filename, content, backend.encoding)
+
+    if not index:
+        return expanded
+    for segment in moved:
+        if segment in expanded:
+            continue
+        segment_backend = _segment_backend(backend, archive_dir / segment)
+        try:
+            update_search_index(segment_backend)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Could not index archive segment {segment}: {e}")
+    return expanded
+
+
+def _registry_path(backend: MemoryBackend) -> Path:
+    """Path of the project registry."""
+    return Path(os.path.expanduser(os.environ.get(REGISTRY_ENV_VAR) or backend.config["projects"]["registry"]))
+
+
+def load_project_registry(backend: Optional[MemoryBackend] = None) -> Dict[str, str]:
+    """Return the registered projects as {name: project root}, in registration order."""
+    if backend is None:
+        backend = MemoryBackend()
+
+    try:
+        with open(_registry_path(backend), 'r', encoding='utf-8') as f:
+            registry = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return dict(registry.get("projects", {}))
+
+
+def _save_project_registry(backend: MemoryBackend, projects: Dict[str, str]) -> Dict[str, Any]:
+    """Write the registry and describe it like register_project() does."""
+    registry_path = _registry_path(backend)
+    registry_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_file_atomic(registry_path, json.dumps({"projects": projects}, ensure_ascii=False, indent=2), 'utf-8')
+    return {"registry": str(registry_path), "projects": projects}
+
+
+def register_project(root: Optional[str] = None, name: Optional[str] = None,
+                     backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """
+    Add a project to the registry, or point an existing name at a new root.
+
+    Args:
+        root: Project root holding config/ and the memory directory
+            (defaults to the current directory)
+        name: Name to register it under (defaults to the root's directory name)
+        backend: Backend whose config names the registry
+
+    Returns:
+        Dictionary with the registry path and the registered projects
+    """
+    if backend is None:
+        backend = MemoryBackend()
+
+    root_path = Path(root or '.').resolve()
+    if not root_path.is_dir():
+        raise ValueError(f"Project root {root_path} is not a directory")
+
+    projects = load_project_registry(backend)
+    projects[name or root_path.name] = str(root_path)
+    return _save_project_registry(backend, projects)
+
+
+def unregister_project(name: str, backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """Remove a project from the registry (its memory files are left alone)."""
+    if backend is None:
+        backend = MemoryBackend()
+
+    projects = load_project_registry(backend)
+    if name not in projects:
+        raise ValueError(f"Unknown project: {name}")
+    del projects[name]
+    return _save_project_registry(backend, projects)
+
+
+def query_all_projects(query: str, filters: Optional[Dict[str, Any]] = None,
+                       projects: Optional[List[str]] = None,
+                       backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """
+    Query every registered project at once and merge the results.
+
+    Each project is searched in its own worker (projects.pool, at most
+    projects.workers at a time) and returns only its best cursor + page_size
+    matches, in its own order. A k-way merge on relevance then picks the
+    requested page, so a search takes about as long as the slowest project.
+
+    Args:
+        query: Search query string
+        filters: Filters as for query_history(), applied in every project
+        projects: Names of the registered projects to search (default: all)
+        backend: Backend whose config names the registry and the pool
+
+    Returns:
+        query_history()'s result with a "project" field on every match, the
+        "projects" searched and the "errors" of projects that failed
+    """
+    if backend is None:
+        backend = MemoryBackend()
+    filters = filters or {}
+
+    registry = load_project_registry(backend)
+    if projects:
+        unknown = [name for name in projects if name not in registry]
+        if unknown:
+            raise ValueError(f"Unknown project(s): {', '.join(unknown)}")
+        registry = {name: registry[name] for name in projects}
+
+    settings = backend.config["projects"]
+    pool_name = settings.get("pool", "process")
+    if pool_name not in PROJECT_POOLS:
+        print(f"Warning: Unknown pool '{pool_name}', using 'process'")
+        pool_name = "process"
+    cursor, page_size = _page_bounds(backend, filters)
+    depth = cursor + page_size
+
+    results = {
+        "query": query,
+        "matches": [],
+        "summary": "",
+        "next_cursor": None,
+        "projects": list(registry),
+        "errors": {},
+        "timestamp": backend._get_timestamp()
+    }
+    if not registry:
+        results["summary"] = _query_summary(query, 0)
+        return results
+
+    ranked = []
+    more = False
+    workers = max(1, min(settings.get("workers", 8), len(registry)))
+    with PROJECT_POOLS[pool_name](max_workers=workers) as pool:
+        futures = [(name, pool.submit(_project_matches, root, query, filters, depth))
+                   for name, root in registry.items()]
+        for name, future in futures:
+            try:
+                matches, project_more = future.result()
+            except Exception as e:
+                results["errors"][name] = str(e)
+                continue
+            for match in matches:
+                match["project"] = name
+            ranked.append(matches)
+            more = more or project_more
+
+    # Ties keep the registry order; each project's own order is kept as is
+    merged = list(islice(heapq.merge(*ranked, key=lambda match: -match["relevance"]), depth + 1))
+    results["matches"] = merged[cursor:depth]
+    if len(merged) > depth or more:
+        results["next_cursor"] = depth
+
+    results["summary"] = _query_summary(query, len(results["matches"]))
+    return results
+
+
+def _project_matches(root: str, query: str, filters: Dict[str, Any], depth: int) -> tuple:
+    """
+    Build the first `depth` matches of one project (runs in a pool worker).
+
+    Returns:
+        Tuple of (matches, whether the project has more)
+    """
+    backend = create_backend(project_root=root)
+    if not backend.memory_dir.is_dir():
+        raise ValueError(f"No memory directory at {backend.memory_dir}")
+
+    builders = backend.query_candidates(query, dict(filters, top_k=depth + 1))
+    matches = [build() for build in islice(builders, depth)]
+    more = next(builders, None) is not None
+    backend.parsed_cache.save()
+    return matches, more
+
+
+def _async_lock(*key) -> asyncio.Lock:
+    """The asyncio lock for `key` on the running event loop."""
+    locks = _ASYNC_LOCKS.setdefault(asyncio.get_running_loop(), {})
+    lock = locks.get(key)
+    if lock is None:
+        lock = locks[key] = asyncio.Lock()
+    return lock
+
+
+def _amemory_lock(backend: MemoryBackend) -> asyncio.Lock:
+    """
+    The asyncio lock for the backend's memory directory.
 
-    return filtered_matches
+    Keyed on the resolved path rather than the backend object, so separate
+    backends for one directory wait for each other.
+    """
+    return _async_lock("memory_dir", str(backend.memory_dir.resolve()))
+
+
+async def _abackend(backend: Optional[MemoryBackend]) -> MemoryBackend:
+    """The given backend, or a new one for the current project created in the executor."""
+    if backend is None:
+        backend = await asyncio.to_thread(create_backend)
+        await asyncio.to_thread(backend.ensure_memory_directory)
+    return backend
+
+
+async def _aprefetch(backend: MemoryBackend, jobs: List[tuple]) -> None:
+    """
+    Read and parse memory files into the parsed-memory cache concurrently,
+    one executor job per (file path, parser, *args), so the synchronous
+    handler that runs next finds them parsed.
+    """
+    cache = backend.parsed_cache
+    if not cache.enabled:
+        return
+    await asyncio.gather(*(asyncio.to_thread(cache.get, file_path, parser, *args)
+                           for file_path, parser, *args in jobs if file_path.exists()))
+
+
+async def abootstrap_context(config: Optional[Dict[str, Any]] = None,
+                             backend: Optional[MemoryBackend] = None,
+                             max_chars: Optional[int] = None,
+                             max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Async counterpart of bootstrap_context().
+
+    Runs in the default executor. When the bootstrap snapshot is stale, the
+    four memory files it is rebuilt from are read and parsed concurrently
+    first.
+    """
+    backend = await _abackend(backend)
+    async with _amemory_lock(backend):
+        if backend.storage == "files" and await asyncio.to_thread(load_bootstrap_snapshot, backend) is None:
+            settings = _bootstrap_snapshot_settings(backend)
+            memory_dir = backend.memory_dir
+            jobs = [
+                (memory_dir / "project-overview.md", "text"),
+                (memory_dir / "devlog.md", "recent_sessions", settings["recent_entries_count"]),
+                (memory_dir / "todos.md", "todo_lines")
+            ]
+            if not _maps_file(backend, memory_dir / "experiments.csv"):
+                jobs.append((memory_dir / "experiments.csv", "csv_rows"))
+            await _aprefetch(backend, jobs)
+        return await asyncio.to_thread(bootstrap_context, config, backend, max_chars, max_tokens)
+
+
+async def alog_session(payload: Dict[str, Any], backend: Optional[MemoryBackend] = None) -> None:
+    """
+    Async counterpart of log_session().
+
+    Writes to one memory directory wait for each other on an asyncio lock
+    instead of blocking executor threads on the file lock, which still
+    serializes them against other processes.
+    """
+    backend = await _abackend(backend)
+    async with _amemory_lock(backend):
+        await asyncio.to_thread(log_session, payload, backend)
+
+
+async def aquery_history(query: str, filters: Optional[Dict[str, Any]] = None,
+                         backend: Optional[MemoryBackend] = None) -> Dict[str, Any]:
+    """
+    Async counterpart of query_history().
+
+    The search index is loaded in the executor, then the memory files it
+    does not cover (or all of them without an index) are read and parsed
+    concurrently before the search runs. BM25 ranking and entry units
+    refresh (and save) the index there first, so they prefetch nothing.
+    """
+    backend = await _abackend(backend)
+    filters = filters or {}
+    async with _amemory_lock(backend):
+        if backend.storage == "files":
+            index = None
+            ranking = filters.get('ranking') or backend.config["search"].get("ranking", "count")
+            unit = filters.get('unit') or backend.config["search"].get("unit", "line")
+            if ranking == "bm25" or unit == "entry":
+                index = await asyncio.to_thread(_refreshed_search_index, backend)
+            elif backend.config["search"].get("use_index", False):
+                index = await asyncio.to_thread(backend.load_search_index)
+
+            jobs = []
+            for source_type, filename in SEARCH_SOURCES.items():
+                if filters.get('type') and filters['type'] != source_type:
+                    continue
+                file_path = backend.memory_dir / filename
+                if (index is None or index.entry(filename) is None) and not _maps_file(backend, file_path):
+                    jobs.append((file_path, "csv_rows" if source_type == "experiments" else "lines"))
+            await _aprefetch(backend, jobs)
+
+        return await asyncio.to_thread(query_history, query, filters, backend)
+
+
+def execute_request(request: Dict[str, Any], backend: Optional[MemoryBackend] = None) -> Any:
+    """
+    Run one bootstrap / log-session / query / query-experiments request.
+
+    Shared by the CLI (in-process) and the daemon, so both produce identical
+    results.
+
+    Args:
+        request: {"command": ..., optionally "profile": true, plus
+            "max_chars"/"max_tokens" for bootstrap, "payload" for
+            log-session, "question"/"filters" (and "all_projects"/"projects")
+            for query, or
+            "conditions"/"sort"/"descending"/"limit" for query-experiments}
+        backend: Already initialised backend to reuse
+
+    Returns:
+        The entry point's result (None for log-session). With "profile" in
+        the request or RESEARCH_MEMORY_PROFILE set, a "profile" entry with
+        the per-stage timings of this request is added (log-session then
+        returns {"profile": ...})
+    """
+    if not _profiling_requested(request):
+        return _execute_request(request, backend)
+
+    PROFILER.start()
+    try:
+        result = _execute_request(request, backend)
+        with PROFILER.stage("serialize_json"):
+            json.dumps(result, ensure_ascii=False)
+    finally:
+        profile = PROFILER.stop()
+
+    return dict(result or {}, profile=profile)
+
+
+def _execute_request(request: Dict[str, Any], backend: Optional[MemoryBackend]) -> Any:
+    command = request.get("command")
+
+    if command == "bootstrap":
+        return bootstrap_context(backend=backend, max_chars=request.get("max_chars"),
+                                 max_tokens=request.get("max_tokens"))
+    if command == "log-session":
+        log_session(request["payload"], backend=backend)
+        return None
+    if command == "query":
+        if request.get("all_projects"):
+            return query_all_projects(request["question"], request.get("filters"),
+                                      request.get("projects"), backend=backend)
+        return query_history(request["question"], request.get("filters"), backend=backend)
+    if command == "query-experiments":
+        return query_experiments(request.get("conditions"), request.get("sort"),
+                                 request.get("descending", False), request.get("limit"), backend=backend)
+
+    raise ValueError(f"Unknown command: {command}")
+
+
+def _daemon_socket_path() -> str:
+    """Socket path of the memory daemon for the current project."""
+    return os.environ.get("RESEARCH_MEMORY_SOCKET", DEFAULT_DAEMON_SOCKET)
+
+
+def request_daemon(request: Dict[str, Any], socket_path: Optional[str] = None,
+                   timeout: float = DAEMON_TIMEOUT_SECONDS) -> Optional[Dict[str, Any]]:
+    """
+    Send a request to a running memory daemon.
+
+    Args:
+        request: Request dictionary (see execute_request)
+        socket_path: Daemon socket (defaults to the project's socket)
+        timeout: Seconds to wait for the daemon
+
+    Returns:
+        The daemon's response ({"ok": ..., "result" or "error": ...}), or None
+        if no daemon is listening and the caller should run the request itself
+    """
+    socket_path = socket_path or _daemon_socket_path()
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            # Stale socket file left behind by a daemon that is gone
+            return None
+
+        # Once the request is sent, errors propagate: falling back to
+        # in-process execution could log the same session twice
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        sock.shutdown(socket.SHUT_WR)
+        response = b''.join(iter(lambda: sock.recv(65536), b''))
+
+    return json.loads(response.decode('utf-8'))
+
+
+class _MemoryDaemonHandler(socketserver.StreamRequestHandler):
+    """Answers one newline-terminated JSON request per connection."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            command = request.get("command")
+
+            if command == "ping":
+                result = {"pid": os.getpid()}
+            elif command == "shutdown":
+                self.server.stop_requested = True
+                result = None
+            else:
+                result = execute_request(request, self.server.get_backend())
+
+            response = {"ok": True, "result": result}
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+
+
+class MemoryDaemon(socketserver.UnixStreamServer):
+    """
+    Long-lived process serving memory requests over a Unix domain socket.
+
+    Keeps one MemoryBackend (parsed configuration, loaded search index) for
+    all requests and only rebuilds it when config/config.json changes.
+    Requests are handled one at a time, which also serializes writers.
+    """
+
+    # Wake up periodically so a shutdown request is noticed
+    timeout = 1.0
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.stop_requested = False
+        self._backend: Optional[MemoryBackend] = None
+        self._config_fingerprint = None
+        super().__init__(socket_path, _MemoryDaemonHandler)
+
+    def get_backend(self) -> MemoryBackend:
+        """Return the shared backend, reloading it if the configuration changed."""
+        fingerprint = _file_fingerprint(CONFIG_PATH)
+        if (self._backend is None or fingerprint != self._config_fingerprint
+                or not self._backend.memory_dir.is_dir()):
+            backend = create_backend()
+            backend.ensure_memory_directory()
+            self._backend = backend
+            self._config_fingerprint = fingerprint
+        return self._backend
+
+    def serve_until_stopped(self) -> None:
+        """Handle requests until a shutdown request or signal arrives."""
+        try:
+            while not self.stop_requested:
+                self.handle_request()
+        finally:
+            self.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+
+def serve_daemon(socket_path: Optional[str] = None) -> None:
+    """
+    Run the memory daemon in the foreground.
+
+    Args:
+        socket_path: Socket to listen on (defaults to the project's socket)
+    """
+    socket_path = socket_path or _daemon_socket_path()
+
+    if request_daemon({"command": "ping"}, socket_path) is not None:
+        raise RuntimeError(f"A memory daemon is already listening on {socket_path}")
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    daemon = MemoryDaemon(socket_path)
+    daemon.get_backend()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"Research memory daemon listening on {socket_path} (pid {os.getpid()})", flush=True)
+    try:
+        daemon.serve_until_stopped()
+    except KeyboardInterrupt:
+        pass
+
+
+def _print_query_ndjson(request: Dict[str, Any], use_daemon: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Print a page of query results as NDJSON: one match per line, then a
+    {"summary", "next_cursor"} line (plus "profile" when profiling).
+
+    In-process, each match is printed as soon as it is built. A daemon
+    answers with the whole page at once.
+
+    Returns:
+        The profile of the request, or None when not profiling
+    """
+    query = request["question"]
+    filters = request.get("filters") or {}
+
+    if use_daemon:
+        response = request_daemon(request)
+        if response is not None:
+            if not response.get("ok"):
+                raise RuntimeError(response.get("error", "Unknown daemon error"))
+            result = response["result"]
+            for match in result["matches"]:
+                print(json.dumps(match, ensure_ascii=False))
+            summary = {"summary": result["summary"], "next_cursor": result.get("next_cursor")}
+            if "profile" in result:
+                summary["profile"] = result["profile"]
+            print(json.dumps(summary, ensure_ascii=False))
+            return result.get("profile")
+
+    profiling = _profiling_requested(request)
+    if profiling:
+        PROFILER.start()
+
+    try:
+        backend = create_backend()
+        backend.ensure_memory_directory()
+        cursor, page_size = _page_bounds(backend, filters)
+
+        builders = backend.query_candidates(query, dict(filters, top_k=cursor + page_size + 1))
+        count = 0
+        for build in islice(builders, cursor, cursor + page_size):
+            print(json.dumps(build(), ensure_ascii=False), flush=True)
+            count += 1
+
+        next_cursor = cursor + page_size if next(builders, None) is not None else None
+    finally:
+        profile = PROFILER.stop() if profiling else None
+
+    summary = {"summary": _query_summary(query, count), "next_cursor": next_cursor}
+    if profile is not None:
+        summary["profile"] = profile
+    print(json.dumps(summary, ensure_ascii=False))
+    return profile
+
+
+def _append_metrics(metrics_log: str, command: str, profile: Dict[str, Any]) -> None:
+    """Append a request's profile to a JSON-lines metrics log."""
+    entry = {"timestamp": datetime.now(timezone.utc).isoformat(), "command": command, "profile": profile}
+    with open(metrics_log, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def _run_request(request: Dict[str, Any], use_daemon: bool = True) -> Any:
+    """Run a request through the daemon when one is up, otherwise in-process."""
+    if use_daemon:
+        response = request_daemon(request)
+        if response is not None:
+            if not response.get("ok"):
+                raise RuntimeError(response.get("error", "Unknown daemon error"))
+            return response.get("result")
+
+    return execute_request(request)
+
+
+# CLI interface
+def main():
+    """Command-line interface for the research memory skill."""
+    parser = argparse.ArgumentParser(description='Research Memory Skill CLI')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Run in-process even if a memory daemon is running')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'Add per-stage timings and bytes read to the result (or set {PROFILE_ENV_VAR}=1)')
+    parser.add_argument('--metrics-log', default=os.environ.get(METRICS_LOG_ENV_VAR), metavar='PATH',
+                        help=f'Profile the request and append the timings to this JSON-lines file '
+                             f'(or set {METRICS_LOG_ENV_VAR})')
+    parser.add_argument('--profile-dump', default=os.environ.get(PROFILE_DUMP_ENV_VAR), metavar='PATH',
+                        help=f'Run in-process under cProfile and write the stats to this file '
+                             f'(or set {PROFILE_DUMP_ENV_VAR})')
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+
+    # Bootstrap command
+    bootstrap_parser = subparsers.add_parser('bootstrap', help='Bootstrap project context')
+    bootstrap_parser.add_argument('--max-chars', type=int,
+                                  help='Fit the context into this many characters, eliding the least recent content')
+    bootstrap_parser.add_argument('--max-tokens', type=int,
+                                  help=f'Fit the context into about this many tokens ({BOOTSTRAP_CHARS_PER_TOKEN} characters each)')
+
+    # Log session command
+    log_parser = subparsers.add_parser('log-session', help='Log a research session')
+    log_parser.add_argument('--payload-json', required=True, help='JSON payload for session logging')
+
+    # Query command
+    query_parser = subparsers.add_parser('query', help='Query research history')
+    query_parser.add_argument('--question', required=True, help='Search query')
+    query_parser.add_argument('--from-date', help='Filter from date (YYYY-MM-DD)')
+    query_parser.add_argument('--to-date', help='Filter to date (YYYY-MM-DD)')
+    query_parser.add_argument('--phase', choices=RESEARCH_PHASES, help='Filter by research phase')
+    query_parser.add_argument('--type', choices=['devlog', 'decisions', 'experiments'], help='Filter by content type')
+    query_parser.add_argument('--limit', type=int, help='Maximum number of results')
+    query_parser.add_argument('--ranking', choices=RANKING_MODES, help='Relevance ranking (keyword count or BM25)')
+    query_parser.add_argument('--unit', choices=SEARCH_UNITS, help='Match single lines or whole session/decision entries')
+    query_parser.add_argument('--page-size', type=int, help='Matches per page (defaults to --limit)')
+    query_parser.add_argument('--cursor', type=int, help='Start at this match (next_cursor of the previous page)')
+    query_parser.add_argument('--no-archive', action='store_true',
+                              help='Do not search archived segments when the memory files run out of matches')
+    query_parser.add_argument('--all-projects', action='store_true',
+                              help='Search every registered project in parallel (see the projects command)')
+    query_parser.add_argument('--projects', nargs='+', metavar='NAME',
+                              help='With --all-projects, only search these registered projects')
+    query_parser.add_argument('--format', choices=['json', 'ndjson'], default='json',
+                              help='Output one JSON document, or one line per match streamed as found')
+
+    # Query experiments command
+    experiments_parser = subparsers.add_parser('query-experiments', help='Filter and sort experiments by metric values')
+    experiments_parser.add_argument('--where', action='append', default=[], metavar='CONDITION',
+                                    help='Condition such as "r_squared>0.7" (repeatable, all must hold)')
+    experiments_parser.add_argument('--sort', help='Metric key or column to sort by')
+    experiments_parser.add_argument('--desc', action='store_true', help='Sort in descending order')
+    experiments_parser.add_argument('--limit', type=int, help='Maximum number of experiments')
+
+    # Index command
+    subparsers.add_parser('index', help='Build or refresh the search index')
+
+    # Projects command
+    projects_parser = subparsers.add_parser('projects', help='List, add or remove projects searched by query --all-projects')
+    projects_parser.add_argument('action', choices=['list', 'add', 'remove'], nargs='?', default='list')
+    projects_parser.add_argument('--path', help='Project root to add (default: the current directory)')
+    projects_parser.add_argument('--name', help='Project name (default: the root directory name; required for remove)')
+
+    # Archive command
+    archive_parser = subparsers.add_parser('archive', help='Move old entries into quarterly archive segments')
+    archive_parser.add_argument('--before', help='Archive entries dated before this day (YYYY-MM-DD)')
+    archive_parser.add_argument('--older-than', type=int, metavar='DAYS',
+                                help='Archive entries older than this many days (default: archive.keep_days)')
+    archive_parser.add_argument('--compress', action='store_true', default=None,
+                                help='Gzip all archive segments not compressed yet (default: archive.compress)')
+
+    # Snapshot command
+    subparsers.add_parser('snapshot', help='Rebuild the bootstrap snapshot (e.g. after editing memory files by hand)')
+
+    # SQLite import / export commands
+    subparsers.add_parser('sqlite-import', help='Build the SQLite memory database from the memory files')
+    export_parser = subparsers.add_parser('sqlite-export', help='Regenerate the memory files from the SQLite database')
+    export_parser.add_argument('--output', help='Directory to write the files to (default: the memory directory)')
+
+    # Compact command
+    subparsers.add_parser('compact', help='Write journaled sessions into the memory files')
+
+    # Serve command
+    serve_parser = subparsers.add_parser('serve', help='Run a memory daemon that answers the other commands')
+    serve_parser.add_argument('--socket', help=f'Unix socket path (default: {DEFAULT_DAEMON_SOCKET})')
+    serve_parser.add_argument('--stop', action='store_true', help='Stop the running daemon')
+
+    args = parser.parse_args()
+    # A cProfile dump must cover the work, so it is done in this process
+    use_daemon = not args.no_daemon and not args.profile_dump
+    profile = args.profile or bool(args.metrics_log)
+
+    def run(request: Dict[str, Any]) -> Any:
+        request["profile"] = profile or _profiling_requested(request)
+        result = _run_request(request, use_daemon)
+        if args.metrics_log and isinstance(result, dict) and "profile" in result:
+            _append_metrics(args.metrics_log, request["command"], result["profile"])
+        return result
+
+    profiler = None
+    if args.profile_dump:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        if args.command == 'bootstrap':
+            request = {"command": "bootstrap", "max_chars": args.max_chars, "max_tokens": args.max_tokens}
+            result = run(request)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'log-session':
+            try:
+                payload = json.loads(args.payload_json)
+            except json.JSONDecodeError as e:
+                print(f"Error: Invalid JSON payload - {e}")
+                sys.exit(1)
+
+            result = run({"command": "log-session", "payload": payload})
+            print("Session logged successfully")
+            if result is not None:
+                print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'query':
+            # Build filters from arguments
+            filters = {}
+            if hasattr(args, 'from_date') and args.from_date:
+                filters['from_date'] = args.from_date
+            if hasattr(args, 'to_date') and args.to_date:
+                filters['to_date'] = args.to_date
+            if hasattr(args, 'phase') and args.phase:
+                filters['phase'] = args.phase
+            if hasattr(args, 'type') and args.type:
+                filters['type'] = args.type
+            if hasattr(args, 'limit') and args.limit:
+                filters['limit'] = args.limit
+            if hasattr(args, 'ranking') and args.ranking:
+                filters['ranking'] = args.ranking
+            if hasattr(args, 'unit') and args.unit:
+                filters['unit'] = args.unit
+            if hasattr(args, 'page_size') and args.page_size:
+                filters['page_size'] = args.page_size
+            if hasattr(args, 'cursor') and args.cursor:
+                filters['cursor'] = args.cursor
+            if args.no_archive:
+                filters['archive'] = False
+
+            request = {"command": "query", "question": args.question, "filters": filters}
+            if args.all_projects:
+                request.update(all_projects=True, projects=args.projects)
+
+            if args.format == 'ndjson' and args.all_projects:
+                # The merged page is only known once every project answered
+                result = run(request)
+                for match in result["matches"]:
+                    print(json.dumps(match, ensure_ascii=False))
+                summary = {key: result[key] for key in ("summary", "next_cursor", "errors", "profile") if key in result}
+                print(json.dumps(summary, ensure_ascii=False))
+            elif args.format == 'ndjson':
+                request["profile"] = profile or _profiling_requested(request)
+                query_profile = _print_query_ndjson(request, use_daemon)
+                if args.metrics_log and query_profile is not None:
+                    _append_metrics(args.metrics_log, "query", query_profile)
+            else:
+                result = run(request)
+                print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'query-experiments':
+            request = {"command": "query-experiments", "conditions": args.where,
+                       "sort": args.sort, "descending": args.desc, "limit": args.limit}
+            result = run(request)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'index':
+            backend = MemoryBackend()
+            backend.ensure_memory_directory()
+            with backend.lock():
+                result = update_search_index(backend)
+                update_devlog_sections(backend)
+                update_experiment_store(backend)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'projects':
+            if args.action == 'add':
+                result = register_project(args.path, args.name)
+            elif args.action == 'remove':
+                if not args.name:
+                    raise ValueError("projects remove needs --name")
+                result = unregister_project(args.name)
+            else:
+                backend = MemoryBackend()
+                result = {"registry": str(_registry_path(backend)), "projects": load_project_registry(backend)}
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'archive':
+            before = args.before
+            if before is None and args.older_than is not None:
+                before = (datetime.now(timezone.utc) - timedelta(days=args.older_than)).strftime('%Y-%m-%d')
+            result = archive_memory(before, compress=args.compress)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'snapshot':
+            result = rebuild_bootstrap_snapshot()
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'sqlite-import':
+            result = import_memory_files()
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'sqlite-export':
+            result = export_memory_files(output_dir=args.output)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'compact':
+            result = compact_journal()
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+
+        elif args.command == 'serve':
+            if args.stop:
+                if request_daemon({"command": "shutdown"}, args.socket) is None:
+                    print("No memory daemon is running")
+                    sys.exit(1)
+                print("Memory daemon stopped")
+            else:
+                serve_daemon(args.socket)
+
+        else:
+            parser.print_help()
+            sys.exit(1)
+
+    except (RuntimeError, OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile_dump)
 
 
 if __name__ == '__main__':
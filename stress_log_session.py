@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for research-memory session logging
+
+Runs many writer processes that call log_session() at the same time against
+one scratch memory directory, then checks that nothing was lost or torn:
+- every session header, decision and experiment row landed exactly once
+- experiments.csv parses cleanly with one record per row
+- every TODO added by a writer is present once, and completions were not lost
+
+Usage:
+    python stress_log_session.py --writers 8 --sessions 25
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import handlers  # noqa: E402
+
+
+def writer(project_dir: str, writer_id: int, sessions: int) -> None:
+    """Log `sessions` sessions, completing the previous session's TODO each time."""
+    os.chdir(project_dir)
+
+    for session in range(sessions):
+        todos = [{"text": f"stress-w{writer_id}-t{session}", "status": "pending"}]
+        if session > 0:
+            todos.append({"text": f"stress-w{writer_id}-t{session - 1}", "status": "completed"})
+
+        handlers.log_session({
+            "session_goal": f"stress-w{writer_id}-s{session}",
+            "changes_summary": "并发写入测试",
+            "phases": {"notes": f"writer {writer_id} session {session}"},
+            "experiments": [{"hypothesis": f"stress-w{writer_id}-s{session}", "metrics": {"session": session}}],
+            "decisions": [{"decision": f"stress-w{writer_id}-s{session}", "rationale": "stress"}],
+            "todos": todos
+        })
+
+
+def verify(memory_dir: Path, writers: int, sessions: int) -> list:
+    """Return a list of problems found in the memory files."""
+    problems = []
+    expected = {f"stress-w{w}-s{s}" for w in range(writers) for s in range(sessions)}
+
+    devlog = (memory_dir / "devlog.md").read_text(encoding="utf-8")
+    goals = re.findall(r'^\*\*Session Goal\*\*: (\S+)$', devlog, re.MULTILINE)
+    if sorted(goals) != sorted(expected):
+        problems.append(f"devlog.md: expected {len(expected)} sessions, found {len(goals)}")
+    if len(re.findall(r'^## \d{4}-\d{2}-\d{2}', devlog, re.MULTILINE)) != len(expected):
+        problems.append("devlog.md: session headers are missing or glued to other lines")
+
+    decisions = (memory_dir / "decisions.md").read_text(encoding="utf-8")
+    found = re.findall(r'^\*\*Decision\*\*: (\S+)$', decisions, re.MULTILINE)
+    if sorted(found) != sorted(expected):
+        problems.append(f"decisions.md: expected {len(expected)} decisions, found {len(found)}")
+
+    with open(memory_dir / "experiments.csv", newline='', encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if sorted(row["hypothesis"] for row in rows) != sorted(expected):
+        problems.append(f"experiments.csv: expected {len(expected)} rows, found {len(rows)}")
+    if any(None in row or None in row.values() for row in rows):
+        problems.append("experiments.csv: rows with the wrong number of fields")
+
+    todos = (memory_dir / "todos.md").read_text(encoding="utf-8")
+    for w in range(writers):
+        for s in range(sessions):
+            text = f"stress-w{w}-t{s}"
+            open_count = len(re.findall(rf'^- \[ \] {text}$', todos, re.MULTILINE))
+            done_count = len(re.findall(rf'^- \[x\] {text} \(completed', todos, re.MULTILINE))
+            want_done = s < sessions - 1
+            if (open_count, done_count) != ((0, 1) if want_done else (1, 0)):
+                problems.append(f"todos.md: {text} open={open_count} completed={done_count}")
+
+    if (memory_dir / handlers.ROLLBACK_FILENAME).exists():
+        problems.append("rollback record left behind")
+
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent log_session stress test')
+    parser.add_argument('--writers', type=int, default=8, help='Number of writer processes')
+    parser.add_argument('--sessions', type=int, default=25, help='Sessions logged by each writer')
+    args = parser.parse_args()
+
+    print("🔒 Concurrent Logging Stress Test")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as project_dir:
+        processes = [
+            multiprocessing.Process(target=writer, args=(project_dir, w, args.sessions))
+            for w in range(args.writers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        failed = [p.exitcode for p in processes if p.exitcode != 0]
+        problems = verify(Path(project_dir) / "memory", args.writers, args.sessions)
+        if failed:
+            problems.append(f"{len(failed)} writer processes exited with errors")
+
+    total = args.writers * args.sessions
+    if problems:
+        print(f"❌ {len(problems)} problems after {total} concurrent sessions:")
+        for problem in problems[:20]:
+            print(f"  - {problem}")
+        sys.exit(1)
+
+    print(f"✅ {args.writers} writers x {args.sessions} sessions = {total} sessions logged without loss")
+
+
+if __name__ == '__main__':
+    main()
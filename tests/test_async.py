@@ -0,0 +1,36 @@
+"""Async API: locking of memory directories shared by several backends."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import handlers  # noqa: E402
+
+
+def test_backends_for_one_directory_share_a_lock(tmp_path):
+    first = handlers.MemoryBackend(str(tmp_path / "memory"), project_root=str(tmp_path))
+    second = handlers.MemoryBackend(str(tmp_path / "memory" / ".." / "memory"), project_root=str(tmp_path))
+    other = handlers.MemoryBackend(str(tmp_path / "other"), project_root=str(tmp_path))
+
+    async def locks():
+        return handlers._amemory_lock(first), handlers._amemory_lock(second), handlers._amemory_lock(other)
+
+    first_lock, second_lock, other_lock = asyncio.run(locks())
+    assert first_lock is second_lock
+    assert first_lock is not other_lock
+
+
+def test_concurrent_writes_through_separate_backends(tmp_path):
+    backends = [handlers.MemoryBackend(str(tmp_path / "memory"), project_root=str(tmp_path)) for _ in range(4)]
+    backends[0].ensure_memory_directory()
+
+    async def log_all():
+        await asyncio.gather(*(handlers.alog_session({"session_goal": f"session {i}"}, backend)
+                               for i, backend in enumerate(backends)))
+
+    asyncio.run(log_all())
+    devlog = (tmp_path / "memory" / "devlog.md").read_text(encoding="utf-8")
+    for i in range(4):
+        assert f"session {i}" in devlog
@@ -0,0 +1,32 @@
+"""Atomic file writes from concurrent threads of one process."""
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import handlers  # noqa: E402
+
+
+def test_concurrent_atomic_writes_from_threads(tmp_path):
+    target = tmp_path / "notes.md"
+    contents = [f"writer {i}\n" * 1000 for i in range(8)]
+    errors = []
+
+    def write(content):
+        try:
+            for _ in range(50):
+                handlers._write_file_atomic(target, content)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(content,)) for content in contents]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert target.read_text(encoding='utf-8') in contents
+    assert list(tmp_path.glob(".*.tmp")) == []
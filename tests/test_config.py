@@ -0,0 +1,45 @@
+"""Configuration loading: every project keeps its own settings in one process."""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import handlers  # noqa: E402
+
+
+def _project(root: Path, config: dict) -> Path:
+    (root / "config").mkdir(parents=True)
+    (root / "config" / "config.json").write_text(json.dumps(config), encoding="utf-8")
+    return root
+
+
+def test_backends_keep_their_own_config(tmp_path):
+    project_a = _project(tmp_path / "a", {"search": {"include_context": False, "max_results": 3}})
+    project_b = _project(tmp_path / "b", {"search": {"context_lines": 5}})
+
+    backend_a = handlers.MemoryBackend(project_root=str(project_a))
+    backend_b = handlers.MemoryBackend(project_root=str(project_b))
+
+    assert backend_a.config["search"]["include_context"] is False
+    assert backend_a.config["search"]["max_results"] == 3
+    assert backend_a.config["search"]["context_lines"] == 3
+    assert backend_b.config["search"]["include_context"] is True
+    assert backend_b.config["search"]["max_results"] == 10
+    assert backend_b.config["search"]["context_lines"] == 5
+    assert handlers.DEFAULT_CONFIG["search"]["include_context"] is True
+    assert handlers.DEFAULT_CONFIG["search"]["context_lines"] == 3
+
+
+def test_query_results_do_not_depend_on_the_first_project_loaded(tmp_path):
+    project_a = _project(tmp_path / "a", {"search": {"include_context": False}})
+    project_b = _project(tmp_path / "b", {})
+    backend_b = handlers.MemoryBackend(project_root=str(project_b))
+    backend_b.ensure_memory_directory()
+    handlers.log_session({"session_goal": "estimate the spillover model"}, backend=backend_b)
+
+    handlers.MemoryBackend(project_root=str(project_a))
+    matches = handlers.query_history("spillover", {}, handlers.MemoryBackend(project_root=str(project_b)))["matches"]
+
+    assert matches and all("context" in match for match in matches)
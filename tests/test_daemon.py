@@ -0,0 +1,37 @@
+"""Memory daemon: reloading the configuration of the long-lived backend."""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import handlers  # noqa: E402
+
+
+def _write_config(config: dict, mtime_ns: int) -> None:
+    path = Path("config/config.json")
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(json.dumps(config), encoding="utf-8")
+    # Distinct mtimes, so the daemon sees every rewrite as a change
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_reload_reverts_removed_keys_to_defaults(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_config({"search": {"max_results": 3, "include_context": False}}, 1_000_000_000)
+    daemon = handlers.MemoryDaemon(str(tmp_path / "daemon.sock"))
+    try:
+        backend = daemon.get_backend()
+        assert backend.config["search"]["max_results"] == 3
+        assert backend.config["search"]["include_context"] is False
+
+        _write_config({"search": {"context_lines": 5}}, 2_000_000_000)
+        reloaded = daemon.get_backend()
+        assert reloaded is not backend
+        assert reloaded.config["search"]["max_results"] == 10
+        assert reloaded.config["search"]["include_context"] is True
+        assert reloaded.config["search"]["context_lines"] == 5
+    finally:
+        daemon.server_close()